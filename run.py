@@ -3,6 +3,7 @@ if __name__ == "__main__":
     import sys
     import time
     from watdo import main
+    from watdo.cluster import main as cluster_main
     from watdo.environ import IS_DEV
 
     if IS_DEV and os.name != "nt":
@@ -10,6 +11,6 @@ if __name__ == "__main__":
         time.tzset()
 
     try:
-        sys.exit(main())
+        sys.exit(cluster_main() if sys.argv[1:] == ["cluster"] else main())
     except KeyboardInterrupt:
         sys.exit(130)
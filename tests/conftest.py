@@ -0,0 +1,55 @@
+import json
+from typing import Any, Callable
+import pytest
+import fakeredis
+from watdo.database import Database
+from watdo.models import Profile, Task
+
+MakeTask = Callable[..., Task]
+
+
+class FakeRedisDatabase(Database):
+    def __init__(self) -> None:
+        self._conn = fakeredis.FakeAsyncRedis()
+
+
+@pytest.fixture
+def db() -> Database:
+    """A database of its own for every test."""
+    return FakeRedisDatabase()
+
+
+@pytest.fixture
+def profile(db: Database) -> Profile:
+    return Profile(
+        db,
+        utc_offset=0,
+        uuid="b" * 32,
+        created_at=1700000000,
+        created_by=10000000000000000,
+        channel_id=10000000000000000,
+    )
+
+
+@pytest.fixture
+def make_task(profile: Profile) -> MakeTask:
+    """Make the `i`th task of `profile`, with the fields in `data` changed."""
+
+    def make_task(i: int = 0, title: str = "laundry", **data: Any) -> Task:
+        raw_data = {
+            "title": title,
+            "category": "home",
+            "importance": 0,
+            "energy": 0,
+            "description": None,
+            "last_done": None,
+            "profile_id": profile.uuid.value,
+            "uuid": f"{i:032}",
+            "created_at": 1700000000 + i,
+            "created_by": 10000000000000000,
+            "channel_id": 10000000000000000,
+            **data,
+        }
+        return Task.from_json_str(profile.db, profile, json.dumps(raw_data))
+
+    return make_task
@@ -0,0 +1,41 @@
+import asyncio
+from watdo.database import Database
+from watdo.indexes import TitleIndex
+from watdo.discord.autocomplete import CompletionsCache, PrefixIndex
+
+loop = asyncio.new_event_loop()
+
+
+class TestPrefixIndex:
+    def test_search_is_case_insensitive(self) -> None:
+        index = PrefixIndex(["Buy milk", "buy eggs", "Walk dog", "Bus"])
+
+        assert index.search("bu") == ["Bus", "buy eggs", "Buy milk"]
+        assert index.search("BUY M") == ["Buy milk"]
+        assert index.search("x") == []
+
+    def test_search_limit(self) -> None:
+        index = PrefixIndex(f"task {i:03}" for i in range(100))
+
+        assert index.search("task", limit=25) == [f"task {i:03}" for i in range(25)]
+        assert len(index.search("")) == 25
+
+
+class TestCompletionsCache:
+    def test_warm_up(self, db: Database) -> None:
+        cache = CompletionsCache(db, max_profiles=2)
+
+        async def main() -> None:
+            for i in range(3):
+                await db.set(f"profile:channel.{i}", f"{i:032}")
+                await db.hset(TitleIndex.key(f"{i:032}"), key=f"task {i}", value="")
+
+            # The channel without a profile counts towards the limit
+            assert await cache.warm_up([10, 0, 1, 2]) == 1
+
+            completions = await cache.get(0)
+            assert completions is not None
+            assert completions.titles.search("task") == ["task 0"]
+            assert cache.hits == 1
+
+        loop.run_until_complete(main())
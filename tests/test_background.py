@@ -0,0 +1,68 @@
+import asyncio
+from watdo.background import BackgroundTasks, CategoryLimits
+
+loop = asyncio.new_event_loop()
+
+
+class TestBackgroundTasks:
+    def test_concurrency_is_limited_per_category(self) -> None:
+        tasks = BackgroundTasks({"db": CategoryLimits(concurrency=2)})
+        running = 0
+        max_running = 0
+
+        async def job() -> None:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        async def main() -> None:
+            for _ in range(10):
+                tasks.spawn(job(), category="db")
+
+            await tasks.drain()
+
+        loop.run_until_complete(main())
+
+        assert max_running == 2
+        assert tasks.metrics["db"].completed == 10
+        assert tasks.metrics["db"].pending == 0
+
+    def test_full_category_drops_spawns_and_blocks_submits(self) -> None:
+        tasks = BackgroundTasks({"log": CategoryLimits(max_pending=2)})
+        release = asyncio.Event()
+
+        async def job() -> None:
+            await release.wait()
+
+        async def main() -> None:
+            tasks.spawn(job(), category="log")
+            tasks.spawn(job(), category="log")
+            assert tasks.spawn(job(), category="log") is None
+
+            submit = loop.create_task(tasks.submit(job(), category="log"))
+            await asyncio.sleep(0.01)
+            assert not submit.done()
+
+            release.set()
+            await submit
+            await tasks.drain()
+
+        loop.run_until_complete(main())
+        metrics = tasks.metrics["log"]
+
+        assert (metrics.submitted, metrics.completed, metrics.dropped) == (3, 3, 1)
+
+    def test_drain_cancels_what_does_not_finish_in_time(self) -> None:
+        tasks = BackgroundTasks({"slow": CategoryLimits(log_failures=False)})
+
+        async def main() -> int:
+            tasks.spawn(asyncio.sleep(0.001), category="slow")
+            tasks.spawn(asyncio.sleep(60), category="slow")
+            return await tasks.drain(timeout=0.05)
+
+        assert loop.run_until_complete(main()) == 1
+        assert tasks.metrics["slow"].completed == 1
+        assert tasks.metrics["slow"].cancelled == 1
+        assert len(tasks) == 0
@@ -0,0 +1,30 @@
+import discord
+from discord import app_commands
+from watdo.discord import Bot
+
+
+def make_tree(*names: str) -> app_commands.CommandTree[discord.Client]:
+    tree = app_commands.CommandTree(discord.Client(intents=discord.Intents.none()))
+
+    for name in names:
+
+        async def callback(interaction: discord.Interaction) -> None:
+            pass
+
+        tree.add_command(
+            app_commands.Command(name=name, description=name, callback=callback)
+        )
+
+    return tree
+
+
+class TestBot:
+    def test_app_commands_hash_ignores_order(self) -> None:
+        assert Bot.app_commands_hash(make_tree("add", "list")) == Bot.app_commands_hash(
+            make_tree("list", "add")
+        )
+
+    def test_app_commands_hash_changes_with_commands(self) -> None:
+        assert Bot.app_commands_hash(make_tree("add")) != Bot.app_commands_hash(
+            make_tree("add", "list")
+        )
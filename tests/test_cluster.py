@@ -0,0 +1,445 @@
+import gc
+import sys
+import json
+import time
+import socket
+import asyncio
+import tracemalloc
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import yarl
+import pytest
+import discord
+from aiohttp import web, WSMsgType
+from watdo.database import Database
+from watdo.lease import Lease
+from watdo import cluster
+from watdo.cluster import Supervisor, assign_shards, parse_shards
+from watdo.discord import ShardedBot
+from watdo.discord.runtime import get_runtime_profile
+
+loop = asyncio.new_event_loop()
+
+BOT_USER = {
+    "id": "1000",
+    "username": "watdo",
+    "discriminator": "0",
+    "avatar": None,
+    "global_name": None,
+    "bot": True,
+}
+
+
+class MemoryDatabase(Database):
+    """Keeps leases in memory and has no profiles or tasks."""
+
+    def __init__(self) -> None:
+        self.leases: Dict[str, Tuple[str, float]] = {}
+
+    async def hold_lease(self, key: str, owner: str, *, ttl: float) -> bool:
+        holder, expires_at = self.leases.get(key, ("", 0))
+
+        if holder != owner and expires_at > time.monotonic():
+            return False
+
+        self.leases[key] = (owner, time.monotonic() + ttl)
+        return True
+
+    async def release_lease(self, key: str, owner: str) -> bool:
+        if self.leases.get(key, ("", 0))[0] != owner:
+            return False
+
+        del self.leases[key]
+        return True
+
+    async def get(self, key: str) -> Optional[str]:
+        return None
+
+    async def iter_keys(self, match: str) -> AsyncIterator[str]:
+        keys: List[str] = []
+
+        for key in keys:
+            yield key
+
+
+def json_response(data: Dict[str, Any]) -> web.Response:
+    # discord.py only decodes responses with this exact content type
+    return web.Response(body=json.dumps(data).encode(), content_type="application/json")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+class FakeGateway:
+    """Enough of Discord's API and gateway for shards to log in and get ready.
+
+    Every guild has `channels` text channels and `members` members besides
+    the bot, all sent with the guild so that it never needs chunking.
+    """
+
+    def __init__(
+        self,
+        guild_ids: List[int],
+        shard_count: int,
+        *,
+        channels: int = 0,
+        members: int = 0,
+    ) -> None:
+        self.guild_ids = guild_ids
+        self.shard_count = shard_count
+        self.channels = channels
+        self.members = members
+        self.port = free_port()
+        self.identified: List[int] = []
+        self._runner: Optional[web.AppRunner] = None
+
+    def shard_of(self, guild_id: int) -> int:
+        return (guild_id >> 22) % self.shard_count
+
+    def guild_data(self, guild_id: int) -> Dict[str, Any]:
+        users = [BOT_USER] + [
+            {
+                "id": str(guild_id + i),
+                "username": f"user{guild_id + i}",
+                "discriminator": "0",
+                "avatar": None,
+                "global_name": None,
+            }
+            for i in range(1, self.members + 1)
+        ]
+        return {
+            "id": str(guild_id),
+            "name": f"guild {guild_id}",
+            "unavailable": False,
+            "owner_id": BOT_USER["id"],
+            "member_count": len(users),
+            "channels": [
+                {
+                    "id": str(guild_id + i),
+                    "type": 0,
+                    "name": f"channel{i}",
+                    "position": i,
+                    "permission_overwrites": [],
+                }
+                for i in range(1, self.channels + 1)
+            ],
+            "threads": [],
+            "roles": [],
+            "members": [
+                {
+                    "user": user,
+                    "roles": [],
+                    "joined_at": "2024-01-01T00:00:00+00:00",
+                    "deaf": False,
+                    "mute": False,
+                    "flags": 0,
+                }
+                for user in users
+            ],
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+        }
+
+    async def handle_user(self, request: web.Request) -> web.Response:
+        return json_response(BOT_USER)
+
+    async def handle_application(self, request: web.Request) -> web.Response:
+        return json_response(
+            {
+                "id": BOT_USER["id"],
+                "name": "watdo",
+                "description": "",
+                "icon": None,
+                "bot_public": True,
+                "bot_require_code_grant": False,
+                "owner": BOT_USER,
+                "verify_key": "",
+                "flags": 0,
+            }
+        )
+
+    async def handle_gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"op": 10, "d": {"heartbeat_interval": 45000}})
+
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                break
+
+            payload = json.loads(message.data)
+
+            if payload["op"] == 1:
+                await ws.send_json({"op": 11})
+            elif payload["op"] == 2:
+                shard_id, shard_count = payload["d"]["shard"]
+                self.identified.append(shard_id)
+                await self.send_ready(ws, shard_id, shard_count)
+
+        return ws
+
+    async def send_ready(
+        self, ws: web.WebSocketResponse, shard_id: int, shard_count: int
+    ) -> None:
+        guild_ids = [g for g in self.guild_ids if self.shard_of(g) == shard_id]
+        await ws.send_json(
+            {
+                "op": 0,
+                "t": "READY",
+                "s": 1,
+                "d": {
+                    "v": 10,
+                    "user": BOT_USER,
+                    "guilds": [{"id": str(g), "unavailable": True} for g in guild_ids],
+                    "session_id": f"session{shard_id}",
+                    "resume_gateway_url": f"ws://127.0.0.1:{self.port}/",
+                    "shard": [shard_id, shard_count],
+                    "application": {"id": BOT_USER["id"], "flags": 0},
+                },
+            }
+        )
+
+        for sequence, guild_id in enumerate(guild_ids, 2):
+            await ws.send_json(
+                {
+                    "op": 0,
+                    "t": "GUILD_CREATE",
+                    "s": sequence,
+                    "d": self.guild_data(guild_id),
+                }
+            )
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/api/v10/users/@me", self.handle_user)
+        app.router.add_get("/api/v10/oauth2/applications/@me", self.handle_application)
+        app.router.add_get("/", self.handle_gateway)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class FastShardedBot(ShardedBot):
+    async def before_identify_hook(
+        self, shard_id: Optional[int], *, initial: bool = False
+    ) -> None:
+        # Discord allows an identify every 5 seconds, the fake gateway doesn't care
+        pass
+
+
+async def wait_until_ready(bot: discord.Client) -> None:
+    for _ in range(200):
+        if bot.is_ready():
+            return
+
+        await asyncio.sleep(0.05)
+
+    raise AssertionError("The bot didn't get ready")
+
+
+async def memory_after_startup(gateway: FakeGateway, runtime: str) -> int:
+    """Bytes allocated while the bot started and still held once it's ready."""
+    gc.collect()
+    tracemalloc.start()
+    bot = FastShardedBot(
+        loop=loop,
+        database=MemoryDatabase(),
+        shard_ids=list(range(gateway.shard_count)),
+        shard_count=gateway.shard_count,
+        runtime=get_runtime_profile(runtime),
+    )
+    bot._connection.guild_ready_timeout = 0.1
+    task = asyncio.create_task(bot.start("token"))
+
+    try:
+        await wait_until_ready(bot)
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+        return size
+    finally:
+        tracemalloc.stop()
+        await bot.close()
+        await task
+
+
+class TestShards:
+    def test_parse_shards(self) -> None:
+        assert parse_shards("0-3,8") == [0, 1, 2, 3, 8]
+        assert parse_shards("5") == [5]
+
+    def test_assign_shards(self) -> None:
+        assert assign_shards(range(10), 3) == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+        assert assign_shards([4, 5], 4) == [[4], [5]]
+
+    def test_cluster_shards_require_shard_count(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        async def recommended_shard_count(token: str) -> int:
+            raise AssertionError("Asked Discord for the shard count")
+
+        monkeypatch.setattr(cluster, "CLUSTER_SHARDS", "0-3")
+        monkeypatch.setattr(cluster, "SHARD_COUNT", 0)
+        monkeypatch.setattr(cluster, "recommended_shard_count", recommended_shard_count)
+
+        assert loop.run_until_complete(cluster.async_main(loop)) == 1
+
+    def test_sharded_bot(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        # Guild IDs whose shards are their index modulo 4
+        guild_ids = [i << 22 for i in range(12)]
+        gateway = FakeGateway(guild_ids, shard_count=4)
+        monkeypatch.setattr(
+            discord.http.Route, "BASE", f"http://127.0.0.1:{gateway.port}/api/v10"
+        )
+        monkeypatch.setattr(
+            discord.gateway.DiscordWebSocket,
+            "DEFAULT_GATEWAY",
+            yarl.URL(f"ws://127.0.0.1:{gateway.port}/"),
+        )
+
+        async def main() -> None:
+            await gateway.start()
+            bot = FastShardedBot(
+                loop=loop,
+                database=MemoryDatabase(),
+                shard_ids=[1, 3],
+                shard_count=4,
+                runtime=get_runtime_profile("lean"),
+            )
+            bot._connection.guild_ready_timeout = 0.1
+            task = asyncio.create_task(bot.start("token"))
+
+            try:
+                await wait_until_ready(bot)
+                assert sorted(gateway.identified) == [1, 3]
+                assert sorted(g.id for g in bot.guilds) == [
+                    g for g in guild_ids if gateway.shard_of(g) in (1, 3)
+                ]
+                assert {g.shard_id for g in bot.guilds} == {1, 3}
+                assert not bot.sees_every_guild
+
+                # Counted from the guilds, members aren't listed without `deep`
+                members = next(u for u in bot.memory_usage() if u.name == "members")
+                assert members.count == len(bot.guilds)
+                assert members.roots == []
+            finally:
+                await bot.close()
+                await task
+                await gateway.stop()
+
+        loop.run_until_complete(main())
+
+    def test_lean_profile_holds_less_memory(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        gateway = FakeGateway(
+            [i << 22 for i in range(200)], shard_count=2, channels=5, members=50
+        )
+        monkeypatch.setattr(
+            discord.http.Route, "BASE", f"http://127.0.0.1:{gateway.port}/api/v10"
+        )
+        monkeypatch.setattr(
+            discord.gateway.DiscordWebSocket,
+            "DEFAULT_GATEWAY",
+            yarl.URL(f"ws://127.0.0.1:{gateway.port}/"),
+        )
+
+        async def main() -> Dict[str, int]:
+            await gateway.start()
+
+            try:
+                return {
+                    runtime: await memory_after_startup(gateway, runtime)
+                    for runtime in ("full", "lean")
+                }
+            finally:
+                await gateway.stop()
+
+        memory = loop.run_until_complete(main())
+
+        # The 10000 members and their users are only cached by the full profile
+        assert memory["lean"] < memory["full"] / 2
+
+
+class TestSupervisor:
+    def test_restarts_crashed_workers(self, tmp_path: Path) -> None:
+        # Crashes on its first start, then runs until it's terminated
+        script = (
+            "import os, sys, time\n"
+            f"path = os.path.join({str(tmp_path)!r}, os.environ['SHARD_IDS'])\n"
+            "crashed = os.path.exists(path)\n"
+            "open(path, 'a').write(os.environ['SHARD_COUNT'] + '\\n')\n"
+            "if not crashed:\n"
+            "    sys.exit(1)\n"
+            "time.sleep(60)\n"
+        )
+        supervisor = Supervisor(
+            range(4),
+            4,
+            2,
+            command=(sys.executable, "-c", script),
+            min_backoff=0.01,
+        )
+
+        async def main() -> None:
+            task = asyncio.create_task(supervisor.run())
+
+            for _ in range(200):
+                starts = [p.read_text().count("\n") for p in tmp_path.iterdir()]
+
+                if starts == [2, 2]:
+                    break
+
+                await asyncio.sleep(0.05)
+
+            await supervisor.stop(timeout=5)
+            await asyncio.wait_for(task, timeout=5)
+
+        loop.run_until_complete(main())
+
+        assert [w.restarts for w in supervisor.workers] == [1, 1]
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["0,1", "2,3"]
+        assert (tmp_path / "0,1").read_text() == "4\n4\n"
+        # Terminated rather than exited by themselves
+        assert all(w.process and w.process.returncode for w in supervisor.workers)
+
+    def test_worker_env(self) -> None:
+        supervisor = Supervisor([4, 5, 6, 7], 8, 2)
+        first, second = (supervisor.worker_env(w) for w in supervisor.workers)
+
+        assert first["SHARD_IDS"] == "4,5"
+        assert second["SHARD_IDS"] == "6,7"
+        assert first["SHARD_COUNT"] == "8"
+        # Only the process running shard 0 syncs slash commands
+        assert first["SYNC_SLASH_COMMANDS"] == "0"
+
+
+class TestLease:
+    def test_single_holder(self) -> None:
+        db = MemoryDatabase()
+        first = Lease(db, "reminder", ttl=0.2)
+        second = Lease(db, "reminder", ttl=0.2)
+
+        async def main() -> None:
+            assert await first.hold()
+            assert not await second.hold()
+            assert await first.keep()
+
+            await first.release()
+            assert await second.hold()
+            assert not first.is_held
+
+            # Taken over once the holder stops renewing
+            await asyncio.sleep(0.25)
+            assert not second.is_held
+            assert await first.hold()
+
+        loop.run_until_complete(main())
@@ -0,0 +1,19 @@
+from watdo.discord.cogs import BaseCog
+
+
+class TestBaseCog:
+    def test_chunk_lines_keeps_every_line(self) -> None:
+        lines = [f"{i + 1}. 📝 [category] task number {i}" for i in range(500)]
+        chunks = list(BaseCog.chunk_lines(lines, limit=2000))
+
+        assert len(chunks) > 1
+        assert all(len(c) <= 2000 for c in chunks)
+        assert "\n".join(chunks).split("\n") == lines
+
+    def test_chunk_lines_splits_only_oversized_lines(self) -> None:
+        chunks = list(BaseCog.chunk_lines(["a" * 25, "b", "c"], limit=10))
+
+        assert chunks == ["a" * 10, "a" * 10, "aaaaa\nb\nc"]
+
+    def test_chunk_lines_without_lines(self) -> None:
+        assert list(BaseCog.chunk_lines([])) == []
@@ -0,0 +1,65 @@
+import asyncio
+import functools
+from typing import List
+from watdo.discord.dispatch import Dispatcher, Priority
+
+loop = asyncio.new_event_loop()
+
+
+class TestDispatcher:
+    def test_queued_requests_are_served_by_priority(self) -> None:
+        dispatcher = Dispatcher(concurrency=1)
+        served: List[Priority] = []
+
+        async def request(priority: Priority) -> Priority:
+            await asyncio.sleep(0.01)
+            served.append(priority)
+            return priority
+
+        async def main() -> None:
+            priorities = (
+                Priority.EDIT,
+                Priority.EDIT,
+                Priority.LOG,
+                Priority.COMMAND,
+                Priority.REMINDER,
+            )
+            await asyncio.gather(
+                *(
+                    dispatcher.submit(1, p, functools.partial(request, p))
+                    for p in priorities
+                )
+            )
+
+        loop.run_until_complete(main())
+
+        # The first request starts right away, the rest wait for the slot
+        assert served == [
+            Priority.EDIT,
+            Priority.REMINDER,
+            Priority.COMMAND,
+            Priority.LOG,
+            Priority.EDIT,
+        ]
+        assert dispatcher.depth == 0
+
+    def test_channels_do_not_block_each_other(self) -> None:
+        dispatcher = Dispatcher(concurrency=1)
+        blocker = asyncio.Event()
+
+        async def blocked() -> None:
+            await blocker.wait()
+
+        async def free() -> str:
+            return "sent"
+
+        async def main() -> str:
+            task = loop.create_task(dispatcher.submit(1, Priority.EDIT, blocked))
+            res = await asyncio.wait_for(
+                dispatcher.submit(2, Priority.EDIT, free), timeout=1
+            )
+            blocker.set()
+            await task
+            return res
+
+        assert loop.run_until_complete(main()) == "sent"
@@ -0,0 +1,79 @@
+import asyncio
+import datetime
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, List
+from watdo import dt
+from watdo.due_parser import DueParser, parse_fast
+
+loop = asyncio.new_event_loop()
+now = datetime.datetime(2023, 7, 1, 10, 30, 15, tzinfo=dt.utc_offset_to_tz(8))
+
+
+class TestParseFast:
+    def test_relative(self) -> None:
+        assert (
+            parse_fast("in 3 hours", now)
+            == (now + datetime.timedelta(hours=3)).timestamp()
+        )
+        assert (
+            parse_fast("in a day", now)
+            == (now + datetime.timedelta(days=1)).timestamp()
+        )
+
+    def test_day_with_time(self) -> None:
+        tomorrow_5pm = now.replace(day=2, hour=17, minute=0, second=0)
+        assert parse_fast("tomorrow at 5pm", now) == tomorrow_5pm.timestamp()
+        assert parse_fast("tomorrow at 17:00", now) == tomorrow_5pm.timestamp()
+        assert parse_fast("tomorrow at 13pm", now) is None
+
+    def test_iso_date(self) -> None:
+        date = datetime.datetime(2024, 5, 1, 13, 30, tzinfo=now.tzinfo)
+        assert parse_fast("2024-05-01 13:30", now) == date.timestamp()
+        assert parse_fast("2024-02-30", now) is None
+
+    def test_daily(self) -> None:
+        assert parse_fast("every morning", now) == (
+            "DTSTART:20230701T103015\n"
+            "RRULE:BYHOUR=9;BYMINUTE=0;INTERVAL=1;FREQ=DAILY"
+        )
+        assert parse_fast("every day at 9:15pm", now) == (
+            "DTSTART:20230701T103015\n"
+            "RRULE:BYHOUR=21;BYMINUTE=15;INTERVAL=1;FREQ=DAILY"
+        )
+
+    def test_unsupported(self) -> None:
+        assert parse_fast("next friday", now) is None
+        assert parse_fast("in 3 fortnights", now) is None
+
+
+class BrokenPool(ThreadPoolExecutor):
+    def submit(self, *args: Any, **kwargs: Any) -> "Future[Any]":
+        raise BrokenProcessPool("A worker died")
+
+
+class RestartedParser(DueParser):
+    def __init__(self) -> None:
+        super().__init__()
+        # Threads instead of processes, to keep the test fast
+        self.pools: List[Any] = [BrokenPool(), ThreadPoolExecutor(max_workers=1)]
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = self.pools.pop(0)
+
+        return self._executor
+
+
+class TestDueParser:
+    def test_broken_pool_is_restarted(self) -> None:
+        parser = RestartedParser()
+
+        try:
+            res = loop.run_until_complete(parser.parse("next friday", 8))
+        finally:
+            parser.shutdown()
+
+        assert isinstance(res, float)
+        assert parser.pools == []
@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List, cast
+import discord
+from watdo.discord.edits import EditCoalescer
+
+loop = asyncio.new_event_loop()
+
+
+class FakeMessage:
+    def __init__(self, message_id: int, *, failures: int = 0) -> None:
+        self.id = message_id
+        self.channel = SimpleNamespace(id=message_id)
+        self.failures = failures
+        self.edits: List[Dict[str, Any]] = []
+
+    async def edit(self, **kwargs: Any) -> None:
+        # Like a request waiting for its rate limit
+        await asyncio.sleep(0.01)
+
+        if self.failures:
+            self.failures -= 1
+            response = SimpleNamespace(status=500, reason="Internal Server Error")
+            raise discord.HTTPException(response, "failed")
+
+        self.edits.append(kwargs)
+
+
+async def wait_for_edits(coalescer: EditCoalescer) -> None:
+    for _ in range(100):
+        if not coalescer._workers:
+            return
+
+        await asyncio.sleep(0.01)
+
+    raise TimeoutError("Edits still running")
+
+
+class TestEditCoalescer:
+    def test_edits_in_one_window_are_sent_once(self) -> None:
+        coalescer = EditCoalescer(loop)
+        message = FakeMessage(1)
+
+        async def main() -> None:
+            for page in range(5):
+                coalescer.edit(cast(discord.Message, message), content=f"page {page}")
+
+            await wait_for_edits(coalescer)
+
+        loop.run_until_complete(main())
+
+        assert message.edits == [{"content": "page 4"}]
+        assert coalescer.coalesced_count == 4
+
+    def test_edits_during_an_edit_wait_for_it(self) -> None:
+        coalescer = EditCoalescer(loop)
+        message = FakeMessage(1)
+
+        async def main() -> None:
+            coalescer.edit(cast(discord.Message, message), content="page 0")
+            await asyncio.sleep(0.005)
+
+            # Sent after the edit in flight, only the latest of them
+            for page in range(1, 4):
+                coalescer.edit(cast(discord.Message, message), content=f"page {page}")
+
+            await wait_for_edits(coalescer)
+
+        loop.run_until_complete(main())
+
+        assert message.edits == [{"content": "page 0"}, {"content": "page 3"}]
+
+    def test_failed_edit_does_not_block_later_ones(self) -> None:
+        coalescer = EditCoalescer(loop)
+        message = FakeMessage(1, failures=1)
+        other = FakeMessage(2)
+
+        async def main() -> None:
+            coalescer.edit(cast(discord.Message, message), content="page 0")
+            coalescer.edit(cast(discord.Message, other), content="other")
+            await asyncio.sleep(0.005)
+            coalescer.edit(cast(discord.Message, message), content="page 1")
+            await wait_for_edits(coalescer)
+
+            coalescer.edit(cast(discord.Message, message), content="page 2")
+            await wait_for_edits(coalescer)
+
+        loop.run_until_complete(main())
+
+        assert message.edits == [{"content": "page 1"}, {"content": "page 2"}]
+        assert other.edits == [{"content": "other"}]
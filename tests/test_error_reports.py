@@ -0,0 +1,90 @@
+import logging
+from typing import Any, List, Optional, Tuple
+import discord
+from watdo.discord.embeds import ErrorDigestEmbed, ErrorEmbed
+from watdo.discord.error_reports import ErrorReporter
+
+formatter = logging.Formatter("%(asctime)s %(message)s")
+
+
+def make_record(
+    lineno: int = 10, exc_type: Optional[str] = "ConnectionError"
+) -> logging.LogRecord:
+    record = logging.LogRecord(
+        "Reminder.run",
+        logging.ERROR,
+        "watdo/reminder.py",
+        lineno,
+        "Redis is down",
+        None,
+        None,
+    )
+    record.exc_type = exc_type
+    formatter.format(record)
+    return record
+
+
+class TestErrorReporter:
+    def make_reporter(self, **kwargs: Any) -> Tuple[ErrorReporter, List[discord.Embed]]:
+        sent: List[discord.Embed] = []
+        return ErrorReporter(sent.append, **kwargs), sent
+
+    def test_repeats_go_to_digest(self) -> None:
+        reporter, sent = self.make_reporter()
+
+        for _ in range(100):
+            reporter.add(make_record())
+
+        assert len(sent) == 1
+        assert isinstance(sent[0], ErrorEmbed)
+        assert reporter.send_digest() == 99
+        assert isinstance(sent[1], ErrorDigestEmbed)
+        assert reporter.send_digest() == 0
+        assert len(sent) == 2
+
+    def test_fingerprints(self) -> None:
+        reporter, sent = self.make_reporter()
+        reporter.add(make_record(lineno=10))
+        reporter.add(make_record(lineno=20))
+        reporter.add(make_record(lineno=10, exc_type="TimeoutError"))
+        reporter.add(make_record(lineno=10))
+
+        assert len(reporter) == 3
+        assert len(sent) == 3
+        assert [g.total for g in reporter.report()] == [2, 1, 1]
+
+    def test_budget(self) -> None:
+        reporter, sent = self.make_reporter(max_messages=5)
+
+        for lineno in range(100):
+            reporter.add(make_record(lineno=lineno))
+
+        # The last message is kept for a digest
+        assert len(sent) == 4
+        assert reporter.send_digest() == 96
+        assert len(sent) == 5
+
+        reporter.add(make_record(lineno=1000))
+        assert reporter.send_digest() == 0
+        assert len(sent) == 5
+
+    def test_paused(self) -> None:
+        reporter, sent = self.make_reporter()
+        reporter.pause()
+        reporter.add(make_record())
+
+        assert sent == []
+        assert reporter.send_digest() == 1
+
+    def test_digest_embed_fits(self) -> None:
+        reporter, sent = self.make_reporter(max_messages=1)
+
+        for lineno in range(50):
+            reporter.add(make_record(lineno=lineno))
+
+        reporter.send_digest()
+        embed = sent[0]
+
+        assert isinstance(embed, ErrorDigestEmbed)
+        assert len(embed.fields) == ErrorDigestEmbed.max_groups
+        assert len(embed) <= 6000
@@ -0,0 +1,292 @@
+import time
+import asyncio
+from typing import Callable, Iterable, List, Tuple, cast
+import pytest
+from watdo.database import Database
+from watdo.errors import TitleTaken
+from watdo.models import Profile, Task, ScheduledTask
+from watdo.writer import ProfileWriter
+from watdo.indexes import (
+    CategoryIndex,
+    TitleIndex,
+    DueIndex,
+    StatsIndex,
+    TaskStats,
+    SearchIndex,
+    TaskIndexes,
+    tokenize,
+    trigrams,
+    similarity,
+)
+
+loop = asyncio.new_event_loop()
+PROFILE_ID = "b" * 32
+MakeTask = Callable[..., Task]
+
+
+def recount(tasks: Iterable[Task]) -> TaskStats:
+    stats = TaskStats()
+
+    for task in tasks:
+        for name in StatsIndex._fields(task):
+            if name.startswith("category."):
+                category = name.removeprefix("category.")
+                stats.categories[category] = stats.categories.get(category, 0) + 1
+            else:
+                setattr(stats, name, getattr(stats, name) + 1)
+
+        if isinstance(task, ScheduledTask) and task.due_date.timestamp() < time.time():
+            stats.overdue += 1
+
+    stats.categories = dict(sorted(stats.categories.items()))
+    return stats
+
+
+class TestTitleIndex:
+    def test_titles_are_unique(self, db: Database, make_task: MakeTask) -> None:
+        writer = ProfileWriter()
+        first = make_task(1, "laundry")
+        second = make_task(2, "laundry", category="chores")
+
+        async def main() -> None:
+            await writer.save(first)
+
+            with pytest.raises(TitleTaken):
+                await writer.save(second)
+
+            records = await db.hgetall(f"task_records:profile.{PROFILE_ID}")
+            assert list(records) == [first.uuid.value]
+            assert await db.hgetall(TitleIndex.key(PROFILE_ID)) == {
+                "laundry": first.uuid.value
+            }
+            assert await db.smembers(CategoryIndex.key(PROFILE_ID, "chores")) == set()
+
+        loop.run_until_complete(main())
+
+    def test_concurrent_new_tasks_saved_last_takes_the_title(
+        self, db: Database, make_task: MakeTask
+    ) -> None:
+        writer = ProfileWriter()
+        tasks = [make_task(i, "laundry") for i in range(3)]
+
+        async def main() -> None:
+            # Applied in order in a single batch
+            await asyncio.gather(*(writer.save(t) for t in tasks))
+
+            assert writer.flushes == 1
+            assert await db.hgetall(TitleIndex.key(PROFILE_ID)) == {
+                "laundry": tasks[-1].uuid.value
+            }
+            records = await db.hgetall(f"task_records:profile.{PROFILE_ID}")
+            assert list(records) == [tasks[-1].uuid.value]
+
+        loop.run_until_complete(main())
+
+    def test_remove_keeps_the_title_of_another_task(
+        self, db: Database, make_task: MakeTask
+    ) -> None:
+        index = TitleIndex()
+        old = make_task(1, "laundry")
+        new = make_task(2, "laundry")
+
+        async def main() -> None:
+            async with db.batch() as batch:
+                index.add(batch, new)
+
+            # A stale version of a task that used to have the title
+            async with db.batch() as batch:
+                index.remove(batch, old)
+
+            assert await db.hget(TitleIndex.key(PROFILE_ID), "laundry") == (
+                new.uuid.value
+            )
+
+            async with db.batch() as batch:
+                index.remove(batch, new)
+
+            assert await db.hget(TitleIndex.key(PROFILE_ID), "laundry") is None
+
+        loop.run_until_complete(main())
+
+
+class TestCounterIndexes:
+    def test_deltas_match_a_full_recount(
+        self, db: Database, profile: Profile, make_task: MakeTask
+    ) -> None:
+        now = time.time()
+        recurring = make_task(
+            1,
+            "water plants",
+            due="DTSTART:20240101T090000\nRRULE:FREQ=DAILY",
+        )
+        overdue = make_task(2, "pay rent", due=now - 60, importance=1)
+        plain = make_task(3, "read", category="books")
+
+        async def check() -> TaskStats:
+            tasks = (await Task.get_tasks_of_profile(db, profile)).items
+            stats = await StatsIndex().get(db, profile)
+            due = cast(
+                List[Tuple[bytes, float]],
+                await db._conn.zrange(DueIndex.key(PROFILE_ID), 0, -1, withscores=True),
+            )
+
+            assert stats == recount(tasks)
+            assert {uuid.decode(): score for uuid, score in due} == {
+                task.uuid.value: task.due_date.timestamp()
+                for task in tasks
+                if isinstance(task, ScheduledTask)
+            }
+            return stats
+
+        async def main() -> None:
+            for task in (recurring, overdue, plain):
+                await task.save()
+                await check()
+
+            # Replaced: done, moved, rescheduled and made one-time
+            for task in (
+                make_task(3, "read", category="books", last_done=now),
+                make_task(3, "read", last_done=now),
+                make_task(2, "pay rent", due=now + 3600),
+                make_task(1, "water plants", due=now + 60),
+            ):
+                await task.save()
+                await check()
+
+            await plain.delete()
+            stats = await check()
+
+            assert (stats.total, stats.one_time, stats.done) == (2, 2, 0)
+            assert (stats.recurring, stats.important, stats.overdue) == (0, 0, 0)
+            assert stats.categories == {"home": 2}
+
+        loop.run_until_complete(main())
+
+
+class TestSearchIndex:
+    def test_tokenize(self) -> None:
+        assert tokenize("Buy MILK, eggs & buy_bread!") == {
+            "buy",
+            "milk",
+            "eggs",
+            "buy_bread",
+        }
+        assert tokenize("  ") == set()
+
+    def test_trigrams(self) -> None:
+        assert trigrams("Ab") == {"  a", " ab", "ab "}
+        assert trigrams("a b") == {"  a", " a ", "  b", " b "}
+        assert trigrams("") == set()
+
+    def test_similarity(self) -> None:
+        laundry = trigrams("laundry")
+
+        assert similarity(laundry, laundry) == 1
+        assert similarity(laundry, trigrams("pay rent")) == 0
+        assert similarity(laundry, set()) == 0
+        assert similarity(laundry, trigrams("lundry")) > similarity(
+            laundry, trigrams("laundromat")
+        )
+
+    def test_ranking_and_typos(
+        self, db: Database, profile: Profile, make_task: MakeTask
+    ) -> None:
+        index = SearchIndex()
+        tasks = [
+            make_task(1, "laundromat"),
+            make_task(2, "laundry", description="whites and darks"),
+            make_task(3, "pay rent", category="bills"),
+            make_task(4, "pay phone bill", category="bills"),
+        ]
+
+        async def titles(query: str) -> List[str]:
+            return [t.title.value for t in await index.search(db, profile, query)]
+
+        async def main() -> None:
+            for task in tasks:
+                await task.save()
+
+            # Every term has to match, in the title, category or description
+            assert await titles("pay bills") == ["pay phone bill", "pay rent"]
+            assert await titles("PAY rent") == ["pay rent"]
+            assert await titles("darks") == ["laundry"]
+            # Typos fall back to fuzzy titles, most similar first
+            assert await titles("laundr") == ["laundry", "laundromat"]
+            assert await titles("laundromt") == ["laundromat", "laundry"]
+            # Too far from "laundromat" to be suggested
+            assert await titles("lundry") == ["laundry"]
+            assert await titles("zzz") == []
+            assert await titles("!?") == []
+
+            fuzzy = await index.fuzzy_titles(db, profile, "laundri", limit=1)
+            assert [t.title.value for t in fuzzy] == ["laundry"]
+
+        loop.run_until_complete(main())
+
+    def test_remove_clears_terms_and_trigrams(
+        self, db: Database, make_task: MakeTask
+    ) -> None:
+        kept = make_task(1, "pay rent")
+        removed = make_task(2, "pay phone", description="before friday")
+
+        async def keys(match: str) -> List[str]:
+            return sorted([key async for key in db.iter_keys(match)])
+
+        async def main() -> None:
+            await kept.save()
+            kept_keys = await keys("task_terms:profile.*") + await keys(
+                "task_trigrams:profile.*"
+            )
+
+            await removed.save()
+            await removed.delete()
+
+            assert (
+                await keys("task_terms:profile.*")
+                + await keys("task_trigrams:profile.*")
+                == kept_keys
+            )
+
+            for key in kept_keys:
+                assert await db.smembers(key) == {kept.uuid.value}
+
+        loop.run_until_complete(main())
+
+    def test_clear_deletes_the_tracked_keys(
+        self, db: Database, make_task: MakeTask
+    ) -> None:
+        task = make_task(1, "pay rent", category="bills")
+
+        async def main() -> None:
+            await task.save()
+            await make_task(1, "pay rent").save()
+
+            async with db.batch() as batch:
+                await CategoryIndex().clear(db, batch, PROFILE_ID)
+                await SearchIndex().clear(db, batch, PROFILE_ID)
+
+            for match in ("task_category:*", "task_terms:*", "task_trigrams:*"):
+                assert [key async for key in db.iter_keys(match)] == []
+
+            assert await db.smembers(SearchIndex.keys_key(PROFILE_ID)) == set()
+
+        loop.run_until_complete(main())
+
+
+class TestTaskIndexes:
+    def test_listeners(self, db: Database, make_task: MakeTask) -> None:
+        indexes = TaskIndexes(TitleIndex())
+        written: List[str] = []
+        indexes.add_listener(written.append)
+
+        async def write() -> None:
+            async with db.batch() as batch:
+                indexes.add(batch, make_task())
+
+        loop.run_until_complete(write())
+        indexes.remove_listener(written.append)
+        # Removing twice is fine, like closing twice
+        indexes.remove_listener(written.append)
+        loop.run_until_complete(write())
+
+        assert written == [PROFILE_ID]
@@ -0,0 +1,59 @@
+import queue
+import logging
+import threading
+from logging.handlers import QueueListener
+from typing import List
+from watdo.logging import Formatter, LogQueueHandler, get_logger, queue_handler
+
+
+class TestLogging:
+    def test_loggers_share_one_queue_handler(self) -> None:
+        for name in ("TestLogging.a", "TestLogging.b"):
+            assert get_logger(name).handlers == [queue_handler]
+
+    def test_emit_does_not_wait_for_the_listener(self) -> None:
+        released = threading.Event()
+        records: List[logging.LogRecord] = []
+
+        class StalledHandler(logging.Handler):
+            """Like a stdout or a log file that stopped being read."""
+
+            def emit(self, record: logging.LogRecord) -> None:
+                released.wait()
+                records.append(record)
+
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        listener = QueueListener(log_queue, StalledHandler())
+        logger = logging.getLogger("TestLogging.stalled")
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(LogQueueHandler(log_queue))
+        logger.propagate = False
+        listener.start()
+
+        def log() -> None:
+            for i in range(1000):
+                logger.debug(f"Record {i}")
+
+        thread = threading.Thread(target=log)
+
+        try:
+            thread.start()
+            thread.join(timeout=5)
+
+            # Only formatting the message and a queue put happen on the caller
+            assert not thread.is_alive()
+        finally:
+            released.set()
+            listener.stop()
+
+        assert [r.getMessage() for r in records] == [f"Record {i}" for i in range(1000)]
+
+    def test_formatters_are_built_once_per_variant(self) -> None:
+        formatter = Formatter(colored=False)
+
+        for i in range(100):
+            name = "A" if i % 3 else "B"
+            record = logging.LogRecord(name, logging.INFO, __file__, 1, "x", None, None)
+            formatter.format(record)
+
+        assert len(formatter._formatters) == 2
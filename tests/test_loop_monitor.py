@@ -0,0 +1,65 @@
+import time
+import asyncio
+from typing import List
+from watdo.metrics import metrics
+from watdo.loop_monitor import LoopMonitor
+
+loop = asyncio.new_event_loop()
+
+
+class RecordingMonitor(LoopMonitor):
+    def __init__(self) -> None:
+        super().__init__(interval=0.01, threshold=0.1)
+        self.stacks: List[str] = []
+
+    def format_stacks(self) -> str:
+        stacks = super().format_stacks()
+        self.stacks.append(stacks)
+        return stacks
+
+
+def parse_slowly() -> None:
+    time.sleep(0.5)
+
+
+class TestLoopMonitor:
+    def test_reports_blocked_loop(self) -> None:
+        monitor = RecordingMonitor()
+        stalls = metrics.loop_stalls
+        lag_count = metrics.loop_lag.count
+
+        async def command() -> None:
+            await asyncio.sleep(0.05)
+            parse_slowly()
+            await asyncio.sleep(0.05)
+
+        async def main() -> None:
+            monitor.start()
+
+            try:
+                await asyncio.create_task(command(), name="command")
+            finally:
+                await monitor.stop()
+
+        loop.run_until_complete(main())
+
+        # Reported once even though the watchdog checked several times
+        assert metrics.loop_stalls == stalls + 1
+        assert len(monitor.stacks) == 1
+        assert "parse_slowly" in monitor.stacks[0]
+        assert "command" in monitor.stacks[0]
+        assert metrics.loop_lag.count > lag_count
+        assert (metrics.loop_lag.max or 0) >= 400_000
+        assert not monitor.is_running
+
+    def test_quiet_loop(self) -> None:
+        monitor = RecordingMonitor()
+
+        async def main() -> None:
+            monitor.start()
+            await asyncio.sleep(0.3)
+            await monitor.stop()
+
+        loop.run_until_complete(main())
+
+        assert monitor.stacks == []
@@ -0,0 +1,92 @@
+import logging
+import asyncio
+import tracemalloc
+from typing import Dict, List
+from watdo.memory import Usage, deep_sizeof, measure
+from watdo.metrics import Metrics
+from watdo.tracing import Tracer
+from watdo.due_parser import DueParser
+from watdo.discord.error_reports import ErrorReporter
+
+loop = asyncio.new_event_loop()
+formatter = logging.Formatter("%(asctime)s %(message)s")
+
+
+class TestMeasure:
+    def test_deep_sizeof(self) -> None:
+        data = {"tasks": [bytes(1000) for _ in range(10)]}
+        size, truncated = deep_sizeof([data])
+
+        assert size > 10_000
+        assert not truncated
+        assert deep_sizeof([data], limit=5)[1]
+
+    def test_boundaries(self) -> None:
+        shared = bytes(100_000)
+        members = [[shared, bytes(1000)] for _ in range(10)]
+        guild = {"members": members, "shared": shared}
+        usages = [
+            Usage(name="guilds", count=1, roots=[guild]),
+            Usage(name="members", count=len(members), roots=list(members)),
+        ]
+        measure(usages, exclude=[shared])
+
+        guilds, members_usage = usages
+
+        assert guilds.size is not None and guilds.size < 2000
+        assert members_usage.size is not None
+        assert 10_000 < members_usage.size < 20_000
+
+
+class TestSoak:
+    """Caches and buffers stay bounded under sustained load."""
+
+    def run(self, iterations: int, parser: DueParser, tracer: Tracer) -> None:
+        metrics = Metrics()
+        sent: List[object] = []
+        reporter = ErrorReporter(sent.append, max_messages=10)
+
+        async def main() -> None:
+            for i in range(iterations):
+                with tracer.span("command", command="add"):
+                    metrics.start_command(i, f"command{i % 20}")
+                    metrics.record_redis_call("HSET", 0.001)
+                    await parser.parse(f"in {i % 5000 + 1} minutes", 0)
+                    metrics.finish_command(i)
+
+                record = logging.LogRecord(
+                    "Soak", logging.ERROR, "soak.py", i % 50, "error", None, None
+                )
+                record.exc_type = None
+                formatter.format(record)
+                reporter.add(record)
+
+                if i % 1000 == 0:
+                    reporter.send_digest()
+
+        loop.run_until_complete(main())
+
+    def test_bounded_growth(self) -> None:
+        parser = DueParser(cache_size=1000)
+        tracer = Tracer(capacity=100)
+        # Started before warming up so that evicted entries count as freed
+        tracemalloc.start()
+
+        try:
+            self.run(5000, parser, tracer)
+            before = tracemalloc.take_snapshot()
+            self.run(10000, parser, tracer)
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+
+        growth: Dict[str, int] = {}
+
+        for stat in after.compare_to(before, "filename"):
+            growth[stat.traceback[0].filename] = stat.size_diff
+
+        total = sum(growth.values())
+
+        assert len(parser) == 1000
+        assert len(tracer) == 100
+        assert total < 128 * 1024, sorted(growth.items(), key=lambda i: -i[1])[:5]
@@ -0,0 +1,98 @@
+import random
+import asyncio
+from watdo.metrics import Histogram, Metrics, RateCounter
+
+loop = asyncio.new_event_loop()
+
+
+class TestHistogram:
+    def test_quantiles(self) -> None:
+        histogram = Histogram()
+        values = [random.uniform(0.001, 5) for _ in range(10000)]
+
+        for value in values:
+            histogram.record(value)
+
+        values.sort()
+
+        for q in (0.5, 0.95, 0.99):
+            expected = values[int(q * len(values)) - 1]
+            actual = histogram.quantile(q)
+
+            assert actual is not None
+            assert abs(actual - expected) / expected < 1 / 2**histogram.precision
+
+        assert histogram.count == 10000
+        # Log-linear buckets grow with the range, not the count
+        assert len(histogram._counts) < 400
+
+    def test_empty(self) -> None:
+        histogram = Histogram()
+
+        assert histogram.quantile(0.5) is None
+        assert histogram.mean is None
+
+    def test_single_value(self) -> None:
+        histogram = Histogram()
+        histogram.record(0.25)
+
+        assert histogram.quantile(0.01) == 0.25
+        assert histogram.quantile(0.99) == 0.25
+
+
+class TestRateCounter:
+    def test_rate(self) -> None:
+        counter = RateCounter(window=10)
+
+        for _ in range(50):
+            counter.add()
+
+        assert counter.rate() == 5
+        assert counter.total == 50
+
+
+class TestMetrics:
+    def test_redis_calls_per_command(self) -> None:
+        metrics = Metrics()
+
+        async def command(ctx_id: int, name: str, calls: int) -> None:
+            metrics.start_command(ctx_id, name)
+
+            for _ in range(calls):
+                await asyncio.sleep(0)
+                metrics.record_redis_call("GET", 0.001)
+
+            metrics.finish_command(ctx_id)
+
+        async def main() -> None:
+            await asyncio.gather(
+                asyncio.create_task(command(1, "list", 3)),
+                asyncio.create_task(command(2, "add", 5)),
+                asyncio.create_task(command(3, "list", 1)),
+            )
+            # Not made by a command
+            metrics.record_redis_call("GET", 0.001)
+
+        loop.run_until_complete(main())
+
+        assert metrics.commands["list"].calls == 2
+        assert metrics.commands["list"].redis_calls == 4
+        assert metrics.commands["add"].redis_calls == 5
+        assert metrics.redis.total == 10
+        assert metrics.redis_commands["GET"].count == 10
+
+    def test_errors(self) -> None:
+        metrics = Metrics()
+        metrics.start_command(1, "add")
+        assert metrics.finish_command(1) is not None
+        metrics.count_error("add")
+        # Finished already by the after invoke hook
+        assert metrics.finish_command(1) is None
+
+        assert metrics.commands["add"].calls == 1
+        assert metrics.commands["add"].errors == 1
+
+        rows = metrics.command_rows()
+
+        assert len(rows) == 2
+        assert rows[1].split()[:3] == ["add", "1", "1"]
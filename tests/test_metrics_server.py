@@ -0,0 +1,76 @@
+import socket
+import asyncio
+import aiohttp
+from watdo.database import Database
+from watdo.metrics import metrics
+from watdo.discord import Bot
+from watdo.discord.metrics_server import MetricsServer
+
+loop = asyncio.new_event_loop()
+
+
+class UnreachableDatabase(Database):
+    async def ping(self) -> bool:
+        raise ConnectionError("Redis is down")
+
+
+class ReachableDatabase(Database):
+    async def ping(self) -> bool:
+        return True
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+class TestMetricsServer:
+    def test_metrics(self) -> None:
+        bot = Bot(loop=loop, database=ReachableDatabase())
+        server = MetricsServer(bot, port=free_port())
+        metrics.start_command(1, "list")
+        metrics.record_redis_call("HGETALL", 0.002)
+        metrics.finish_command(1)
+
+        async def scrape() -> str:
+            await server.start()
+
+            try:
+                async with aiohttp.ClientSession() as session:
+                    url = f"http://{server.host}:{server.port}/metrics"
+
+                    async with session.get(url) as response:
+                        assert response.status == 200
+                        assert response.content_type == "text/plain"
+                        return await response.text()
+            finally:
+                await server.stop()
+
+        text = loop.run_until_complete(scrape())
+        lines = text.splitlines()
+        families = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+
+        assert 'watdo_command_duration_seconds_count{command="list"} 1' in lines
+        assert (
+            'watdo_redis_command_duration_seconds_count{command="HGETALL"} 1' in lines
+        )
+        assert "watdo_event_loop_lag_seconds" in families
+        assert "watdo_event_loop_stalls_total" in families
+        assert "watdo_send_queue_depth" in families
+        assert 'watdo_memory_objects{subsystem="paginators"} 0' in lines
+        # Every metric is declared once, with its samples right after
+        assert len(families) == len(set(families))
+
+    def test_healthz(self) -> None:
+        bot = Bot(loop=loop, database=UnreachableDatabase())
+        server = MetricsServer(bot)
+
+        health = loop.run_until_complete(server.check_health())
+        assert health == {"gateway": False, "redis": False}
+
+        bot.db = ReachableDatabase()
+        bot.gateway_connected = True
+
+        health = loop.run_until_complete(server.check_health())
+        assert health == {"gateway": True, "redis": True}
@@ -0,0 +1,163 @@
+import json
+import time
+import asyncio
+from typing import Any, Dict, List
+from watdo.database import Database
+from watdo.models import Profile, Task
+from watdo.safe_data import TaskCategory
+from watdo.indexes import CategoryIndex, task_indexes
+from watdo.migrations import migrate, migrate_task_lists, rebuild_task_indexes
+
+loop = asyncio.new_event_loop()
+PROFILE_ID = "c" * 32
+
+
+def legacy_task(i: int, category: str, **data: Any) -> Dict[str, Any]:
+    return {
+        "title": f"task {i}",
+        "category": category,
+        "description": None,
+        "last_done": None,
+        "profile_id": PROFILE_ID,
+        "uuid": f"{i:032}",
+        "created_at": 1700000000 + i,
+        "created_by": 10000000000000000,
+        "channel_id": 10000000000000000,
+        **data,
+    }
+
+
+async def setup_legacy_profile(db: Database) -> Profile:
+    profile = Profile(
+        db,
+        utc_offset=0,
+        uuid=PROFILE_ID,
+        created_at=time.time(),
+        created_by=10000000000000000,
+        channel_id=10000000000000000,
+    )
+    await profile.save()
+    # Tasks used to be stored newest first in a list, from before importance
+    # and energy existed
+    tasks = [
+        legacy_task(2, "work", importance=0.5, energy=0.8),
+        legacy_task(1, "home", is_important=True),
+        legacy_task(0, "home", importance=0),
+    ]
+    await db._conn.rpush(f"tasks:profile.{PROFILE_ID}", *(json.dumps(t) for t in tasks))
+    return profile
+
+
+async def category_titles(db: Database, profile: Profile, category: str) -> List[str]:
+    tasks = await Task.get_tasks_of_profile(db, profile, category=category)
+    return [task.title.value for task in tasks.items]
+
+
+class TestMigrations:
+    def test_migrate_task_lists(self, db: Database) -> None:
+
+        async def main() -> None:
+            profile = await setup_legacy_profile(db)
+
+            assert await migrate_task_lists(db) == 3
+            assert await db.lrange(f"tasks:profile.{PROFILE_ID}") == []
+
+            records = await db.hgetall(f"task_records:profile.{PROFILE_ID}")
+            data = {uuid: json.loads(d) for uuid, d in records.items()}
+
+            assert sorted(data) == [f"{i:032}" for i in range(3)]
+            assert all("is_important" not in d for d in data.values())
+            assert data[f"{1:032}"]["importance"] == 1
+            assert data[f"{0:032}"]["importance"] == 0
+            assert data[f"{0:032}"]["energy"] == 0
+            assert data[f"{2:032}"]["importance"] == 0.5
+            assert data[f"{2:032}"]["energy"] == 0.8
+
+            tasks = await Task.get_tasks_of_profile(db, profile)
+            assert [t.title.value for t in tasks.items] == [
+                "task 2",
+                "task 1",
+                "task 0",
+            ]
+            assert await category_titles(db, profile, "home") == ["task 1", "task 0"]
+
+        loop.run_until_complete(main())
+
+    def test_migrate_twice(self, db: Database) -> None:
+
+        async def main() -> None:
+            profile = await setup_legacy_profile(db)
+            await migrate(db)
+            records = await db.hgetall(f"task_records:profile.{PROFILE_ID}")
+            work = await db.smembers(CategoryIndex.key(PROFILE_ID, "work"))
+
+            await migrate(db)
+
+            assert await migrate_task_lists(db) == 0
+            assert await db.get("task_indexes_version") == str(task_indexes.version)
+            assert await db.hgetall(f"task_records:profile.{PROFILE_ID}") == records
+            assert await db.smembers(CategoryIndex.key(PROFILE_ID, "work")) == work
+            assert await category_titles(db, profile, "home") == ["task 1", "task 0"]
+
+        loop.run_until_complete(main())
+
+    def test_rebuild_clears_untracked_index_keys(self, db: Database) -> None:
+
+        async def main() -> None:
+            profile = await setup_legacy_profile(db)
+            await migrate(db)
+
+            # Written by version 4, before index keys were tracked
+            stale = f"task_terms:profile.{PROFILE_ID}.stale"
+            await db._conn.sadd(stale, f"{0:032}")
+            await db.set("task_indexes_version", "4")
+
+            await rebuild_task_indexes(db)
+
+            assert await db.smembers(stale) == set()
+            assert await category_titles(db, profile, "home") == ["task 1", "task 0"]
+
+        loop.run_until_complete(main())
+
+    def test_category_after_save_and_delete(self, db: Database) -> None:
+
+        async def main() -> None:
+            profile = await setup_legacy_profile(db)
+            await migrate(db)
+
+            task = await Task.from_uuid(db, profile, f"{1:032}")
+            assert task is not None
+
+            task.category = TaskCategory("work")
+            await task.save()
+
+            assert await category_titles(db, profile, "home") == ["task 0"]
+            assert await category_titles(db, profile, "work") == ["task 2", "task 1"]
+
+            await task.delete()
+
+            assert await category_titles(db, profile, "work") == ["task 2"]
+            assert await category_titles(db, profile, "home") == ["task 0"]
+
+        loop.run_until_complete(main())
+
+    def test_rename_and_delete_category(self, db: Database) -> None:
+
+        async def main() -> None:
+            profile = await setup_legacy_profile(db)
+            await migrate(db)
+
+            renamed = await Task.rename_category(db, profile, "home", "chores")
+
+            assert len(renamed) == 2
+            assert await category_titles(db, profile, "home") == []
+            assert await category_titles(db, profile, "chores") == ["task 1", "task 0"]
+
+            deleted = await Task.delete_category(db, profile, "chores")
+
+            assert len(deleted) == 2
+            assert await category_titles(db, profile, "chores") == []
+            tasks = await Task.get_tasks_of_profile(db, profile)
+            assert [t.title.value for t in tasks.items] == ["task 2"]
+
+        loop.run_until_complete(main())
@@ -0,0 +1,73 @@
+import time
+import marshal
+import asyncio
+import pytest
+from typing import List
+from watdo.errors import ProfilerBusy
+from watdo.profiling import Capture, Profiler
+
+loop = asyncio.new_event_loop()
+
+
+def busy_work() -> None:
+    time.sleep(0.02)
+
+
+async def work(seconds: float, garbage: List[bytes]) -> None:
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        busy_work()
+        garbage.append(bytes(10_000))
+        await asyncio.sleep(0)
+
+
+def capture(profiler: Profiler, mode: str) -> Capture:
+    garbage: List[bytes] = []
+
+    async def main() -> Capture:
+        task = asyncio.create_task(work(0.3, garbage))
+        res = await profiler.capture(mode, 0.4)
+        await task
+        return res
+
+    return loop.run_until_complete(main())
+
+
+class TestProfiler:
+    def test_cpu(self) -> None:
+        res = capture(Profiler(), "cpu")
+        stats = marshal.loads(res.files["profile.pstats"])
+
+        assert any(func[2] == "busy_work" for func in stats)
+        assert "busy_work" in res.files["profile.txt"].decode()
+
+    def test_sample(self) -> None:
+        res = capture(Profiler(), "sample")
+        report = res.files["samples.txt"].decode()
+        folded = res.files["samples.folded"].decode()
+
+        assert "busy_work" in report
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines())
+
+    def test_memory(self) -> None:
+        res = capture(Profiler(), "memory")
+
+        assert "test_profiling.py" in res.files["memory.txt"].decode()
+
+    def test_one_at_a_time(self) -> None:
+        profiler = Profiler()
+
+        async def main() -> None:
+            first = asyncio.create_task(profiler.capture("sample", 0.1))
+            await asyncio.sleep(0)
+
+            with pytest.raises(ProfilerBusy):
+                await profiler.capture("cpu", 0.1)
+
+            await first
+
+        loop.run_until_complete(main())
+
+        with pytest.raises(ValueError):
+            loop.run_until_complete(profiler.capture("heap", 0.1))
@@ -0,0 +1,62 @@
+import time
+import asyncio
+from typing import Any, Callable, List, cast
+from watdo.database import Database
+from watdo.models import Profile, Task, ScheduledTask
+from watdo.reminder import Reminder
+from watdo.background import background
+from watdo.write_behind import write_behind
+
+loop = asyncio.new_event_loop()
+MakeTask = Callable[..., Task]
+
+
+class SlowReminder(Reminder):
+    def __init__(self, database: Database) -> None:
+        super().__init__(database, cast(Any, None))
+        self.sent: List[str] = []
+
+    async def remind(self, task: ScheduledTask[str] | ScheduledTask[float]) -> None:
+        # Like sends held back by the rate limits of the dispatcher
+        await asyncio.sleep(0.2)
+        self.sent.append(task.uuid.value)
+
+
+class TestReminder:
+    def test_due_tasks_are_sent_once(
+        self, db: Database, profile: Profile, make_task: MakeTask
+    ) -> None:
+        now = time.time()
+        # Half of them due, more than the concurrency of the reminder category
+        tasks = [
+            make_task(
+                i,
+                f"task {i}",
+                due=now - 60,
+                next_reminder=now - 60 if i % 2 else now + 3600,
+            )
+            for i in range(40)
+        ]
+        reminder = SlowReminder(db)
+
+        async def main() -> None:
+            await profile.save()
+
+            for task in tasks:
+                await task.save()
+
+            # Sweeps keep running while the first reminders are being sent
+            for _ in range(3):
+                await reminder.sweep()
+                await asyncio.sleep(0.05)
+
+            while background.metrics["reminder"].pending:
+                await asyncio.sleep(0.05)
+
+        try:
+            loop.run_until_complete(main())
+        finally:
+            write_behind._pending.pop(profile.uuid.value, None)
+            write_behind._profiles.pop(profile.uuid.value, None)
+
+        assert sorted(reminder.sent) == [f"{i:032}" for i in range(1, 40, 2)]
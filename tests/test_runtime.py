@@ -0,0 +1,145 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+import discord
+import pytest
+from watdo.database import Database
+from watdo.discord import Bot
+from watdo.discord.runtime import UserCache, get_runtime_profile
+
+loop = asyncio.new_event_loop()
+
+
+class FakeUsers:
+    def __init__(self, existing: List[int]) -> None:
+        self.existing = existing
+        self.cached: Dict[int, Any] = {}
+        self.fetched: List[int] = []
+        self.fetching = 0
+        self.max_fetching = 0
+
+    def lookup(self, user_id: int) -> Optional[Any]:
+        return self.cached.get(user_id)
+
+    async def fetch(self, user_id: int) -> Any:
+        self.fetched.append(user_id)
+        self.fetching += 1
+        self.max_fetching = max(self.max_fetching, self.fetching)
+
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.fetching -= 1
+
+        if user_id not in self.existing:
+            response = SimpleNamespace(status=404, reason="Not Found")
+            raise discord.NotFound(response, "Unknown User")
+
+        return SimpleNamespace(id=user_id)
+
+
+class TestRuntimeProfile:
+    def test_lean(self) -> None:
+        runtime = get_runtime_profile("lean")
+
+        assert not runtime.intents.members
+        assert not runtime.intents.presences
+        assert runtime.intents.message_content
+        assert runtime.intents.dm_reactions
+
+        bot = Bot(loop=loop, database=Database(), runtime=runtime)
+
+        assert bot.intents == runtime.intents
+        assert not bot._connection._chunk_guilds
+        assert bot._connection.max_messages == runtime.max_messages
+
+    def test_unknown(self) -> None:
+        with pytest.raises(ValueError):
+            get_runtime_profile("huge")
+
+
+class TestUserCache:
+    def test_fetches_on_miss(self) -> None:
+        users = FakeUsers([1, 2, 3])
+        cache = UserCache(users.lookup, users.fetch, max_users=2)
+
+        async def main() -> None:
+            for user_id in (1, 1, 2, 3, 1):
+                user = await cache.resolve(user_id)
+                assert user is not None and user.id == user_id
+
+        loop.run_until_complete(main())
+
+        # 1 got evicted by 3 and had to be fetched again
+        assert users.fetched == [1, 2, 3, 1]
+        assert len(cache) == 2
+        assert cache.hits == 1
+        assert cache.misses == 4
+
+    def test_keeps_cached_users_alive(self) -> None:
+        users = FakeUsers([])
+        users.cached[1] = SimpleNamespace(id=1)
+        cache = UserCache(users.lookup, users.fetch)
+
+        assert cache.get(1) is users.cached[1]
+
+        # Dropped by discord.py, still held by the cache
+        user = users.cached.pop(1)
+
+        assert cache.get(1) is user
+        assert users.fetched == []
+
+    def test_remembers_missing_users(self) -> None:
+        users = FakeUsers([])
+        cache = UserCache(users.lookup, users.fetch)
+
+        async def main() -> None:
+            assert await cache.resolve(1) is None
+            assert await cache.resolve(1) is None
+
+        loop.run_until_complete(main())
+
+        assert users.fetched == [1]
+
+    def test_concurrent_lookups_share_a_fetch(self) -> None:
+        users = FakeUsers([1])
+        cache = UserCache(users.lookup, users.fetch)
+
+        async def main() -> None:
+            found = await asyncio.gather(*(cache.resolve(1) for _ in range(5)))
+            assert [u.id for u in found if u is not None] == [1] * 5
+
+            missing = await asyncio.gather(cache.resolve(2), cache.resolve(2))
+            assert list(missing) == [None, None]
+
+        loop.run_until_complete(main())
+
+        assert users.fetched == [1, 2]
+        assert cache._fetching == {}
+
+    def test_cancelled_lookup_keeps_fetching(self) -> None:
+        users = FakeUsers([1])
+        cache = UserCache(users.lookup, users.fetch)
+
+        async def main() -> None:
+            first = asyncio.create_task(cache.resolve(1))
+            second = asyncio.create_task(cache.resolve(1))
+            await asyncio.sleep(0)
+            first.cancel()
+
+            user = await second
+            assert user is not None and user.id == 1
+
+        loop.run_until_complete(main())
+
+        assert users.fetched == [1]
+
+    def test_fetches_are_bounded(self) -> None:
+        users = FakeUsers(list(range(20)))
+        bot = Bot(loop=loop, database=Database(), runtime=get_runtime_profile("lean"))
+        bot.user_cache = UserCache(users.lookup, users.fetch, max_fetches=3)
+
+        loop.run_until_complete(bot.resolve_users([*range(20), *range(20)]))
+
+        assert sorted(users.fetched) == list(range(20))
+        assert users.max_fetching == 3
@@ -0,0 +1,81 @@
+import asyncio
+from typing import List
+from watdo.services import Service, ServiceRegistry
+
+loop = asyncio.new_event_loop()
+
+
+class CrashingService(Service):
+    def __init__(self, crashes: int) -> None:
+        super().__init__("crashing")
+        self.crashes = crashes
+        self.runs = 0
+
+    async def run(self) -> None:
+        self.runs += 1
+
+        if self.runs <= self.crashes:
+            raise RuntimeError(f"crash {self.runs}")
+
+
+class CountingService(Service):
+    def __init__(self) -> None:
+        super().__init__("counting")
+        self.runs = 0
+        self.steps: List[int] = []
+
+    async def run(self) -> None:
+        self.runs += 1
+
+        while True:
+            await self.checkpoint()
+            self.steps.append(len(self.steps))
+            await asyncio.sleep(0)
+
+
+class TestServiceRegistry:
+    def test_crashed_service_is_restarted(self) -> None:
+        registry = ServiceRegistry(min_backoff=0.001, max_backoff=0.002)
+        service = CrashingService(crashes=3)
+        registry.register(service)
+
+        async def main() -> None:
+            registry.start()
+            await asyncio.sleep(0.1)
+
+        loop.run_until_complete(main())
+        status = registry.status()[0]
+
+        assert service.runs == 4
+        assert status.restarts == 3
+        assert status.state == "stopped"
+        assert status.last_error == "RuntimeError('crash 3')"
+
+    def test_start_is_idempotent_and_pause_stops_work(self) -> None:
+        registry = ServiceRegistry()
+        service = CountingService()
+        registry.register(service)
+
+        async def main() -> None:
+            registry.start()
+            registry.start()
+            await asyncio.sleep(0.01)
+
+            registry.pause()
+            await asyncio.sleep(0)
+            steps = len(service.steps)
+            await asyncio.sleep(0.01)
+            assert len(service.steps) == steps
+            assert registry.status()[0].state == "paused"
+
+            registry.resume()
+            await asyncio.sleep(0.01)
+            assert len(service.steps) > steps
+
+            registry.start()
+            await registry.stop()
+
+        loop.run_until_complete(main())
+
+        assert service.runs == 1
+        assert registry.status()[0].state == "stopped"
@@ -0,0 +1,126 @@
+import io
+import json
+import asyncio
+import pytest
+from watdo.logging import debug_wall_time
+from watdo.tracing import Tracer, tracer
+
+loop = asyncio.new_event_loop()
+
+
+class TestTracer:
+    def test_children_across_awaits(self) -> None:
+        t = Tracer()
+
+        async def query() -> None:
+            with t.span("redis"):
+                await asyncio.sleep(0.01)
+
+        async def command() -> None:
+            with t.span("command", command="list"):
+                await query()
+                await asyncio.gather(query(), asyncio.create_task(query()))
+
+                with t.span("render"):
+                    pass
+
+        loop.run_until_complete(command())
+
+        assert len(t) == 1
+        trace = t.traces[0]
+        root = trace.root
+
+        assert root.attributes == {"command": "list"}
+        assert len(trace.spans) == 5
+        assert all(s.trace_id == root.span_id for s in trace.spans)
+        assert all(s.parent_id == root.span_id for s in trace.spans[1:])
+        assert set(trace.breakdown()) == {"redis", "render"}
+        assert trace.breakdown()["redis"] >= 30
+        assert root.duration_ms >= 20
+
+    def test_sampling(self) -> None:
+        t = Tracer(sample_rate=0)
+
+        with t.span("command") as root:
+            with t.span("redis") as child:
+                pass
+
+        assert root is None and child is None
+        assert len(t) == 0
+        assert t.roots == 1
+
+    def test_error(self) -> None:
+        t = Tracer()
+
+        with pytest.raises(ValueError):
+            with t.span("command"):
+                raise ValueError("bad")
+
+        assert t.traces[0].root.error == "ValueError('bad')"
+
+    def test_limits(self) -> None:
+        t = Tracer(background_sample_rate=1, background_capacity=2, max_spans=3)
+
+        for _ in range(3):
+            with t.span("sweep"):
+                for _ in range(5):
+                    with t.span("redis"):
+                        pass
+
+        assert len(t) == 2
+        assert len(t.background_traces[0].spans) == 3
+        assert t.background_traces[0].dropped == 3
+
+    def test_background_roots(self) -> None:
+        t = Tracer(background_sample_rate=1, capacity=2, background_capacity=2)
+
+        with t.span("command", command="list"):
+            pass
+
+        for _ in range(10):
+            with t.span("reminder.sweep"):
+                with t.span("redis"):
+                    pass
+
+        # Frequent background work doesn't evict the traces of commands
+        assert [trace.root.name for trace in t.traces] == ["command"]
+        assert len(t.background_traces) == 2
+        assert len(t) == 3
+
+        t = Tracer(background_sample_rate=0)
+
+        with t.span("command"):
+            pass
+
+        with t.span("redis"):
+            pass
+
+        assert len(t.traces) == 1
+        assert len(t.background_traces) == 0
+        assert t.roots == 2
+
+    def test_export_jsonl(self) -> None:
+        t = Tracer()
+
+        with t.span("command"):
+            with t.span("redis", command="HGETALL"):
+                pass
+
+        file = io.StringIO()
+
+        assert t.export_jsonl(file) == 2
+
+        lines = [json.loads(line) for line in file.getvalue().splitlines()]
+
+        assert [line["name"] for line in lines] == ["command", "redis"]
+        assert lines[1]["parent_id"] == lines[0]["span_id"]
+        assert lines[1]["attributes"] == {"command": "HGETALL"}
+
+    def test_debug_wall_time(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(tracer, "background_sample_rate", 1)
+
+        with debug_wall_time("TestTracer", "block") as res:
+            pass
+
+        assert res["delta"] is not None
+        assert tracer.find("block")[0].root.end_ns is not None
@@ -0,0 +1,112 @@
+import json
+import asyncio
+import pytest
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from watdo.database import Database
+from watdo.models import Task
+from watdo.writer import ProfileTransaction
+from watdo.write_behind import Updates, WriteBehindBuffer, write_behind
+
+loop = asyncio.new_event_loop()
+MakeTask = Callable[..., Task]
+
+
+async def unreachable(name: str, keys: Iterable[str]) -> List[Optional[str]]:
+    raise ConnectionError("Redis is down")
+
+
+class TestWriteBehindBuffer:
+    def test_reads_see_merged_updates_before_flush(self, make_task: MakeTask) -> None:
+        task = make_task()
+        write_behind.update(task, channel_id=10000000000000001)
+        write_behind.update(task, channel_id=10000000000000002)
+
+        try:
+            raw_data = task.as_json_str()
+            assert len(write_behind) == 1
+            assert (
+                Task.from_json_str(task.db, task.profile, raw_data).channel_id.value
+                == 10000000000000002
+            )
+            assert (
+                Task.from_json_str(
+                    task.db, task.profile, raw_data, buffered=False
+                ).channel_id.value
+                == 10000000000000000
+            )
+        finally:
+            write_behind.discard(task)
+
+        assert len(write_behind) == 0
+
+    def test_only_metadata_fields_are_buffered(self, make_task: MakeTask) -> None:
+        with pytest.raises(ValueError):
+            WriteBehindBuffer().update(make_task(), title="renamed")
+
+    def test_failed_flush_keeps_updates_and_newer_ones_win(
+        self, db: Database, make_task: MakeTask, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(db, "hmget", unreachable)
+        buffer = WriteBehindBuffer()
+        task = make_task()
+        buffer.update(task, next_reminder=1.0, channel_id=10000000000000001)
+
+        assert loop.run_until_complete(buffer.flush()) == 0
+
+        buffer.update(task, next_reminder=2.0)
+        data: Dict[str, Any] = {
+            "profile_id": task.profile.uuid.value,
+            "uuid": task.uuid.value,
+        }
+        buffer.apply(data)
+
+        assert data["next_reminder"] == 2.0
+        assert data["channel_id"] == 10000000000000001
+
+    def test_updates_of_deleted_tasks_are_dropped(self, make_task: MakeTask) -> None:
+        buffer = WriteBehindBuffer()
+        # Never saved
+        buffer.update(make_task(), next_reminder=1.0)
+
+        assert loop.run_until_complete(buffer.flush()) == 0
+        assert len(buffer) == 0
+
+    def test_updates_are_written_again_after_a_conflict(
+        self, db: Database, make_task: MakeTask
+    ) -> None:
+        task = make_task()
+        key = f"task_records:profile.{task.profile.uuid.value}"
+        attempts = 0
+
+        class ConflictingBuffer(WriteBehindBuffer):
+            async def _write(
+                self,
+                profile_id: str,
+                taken: List[Updates],
+                transaction: ProfileTransaction,
+            ) -> int:
+                nonlocal attempts
+                attempts += 1
+                count = await super()._write(profile_id, taken, transaction)
+
+                # Another process writes the profile before the first flush
+                if attempts == 1:
+                    await db._conn.hset(key, f"{1:032}", "{}")
+
+                return count
+
+        buffer = ConflictingBuffer()
+
+        async def main() -> None:
+            await task.save()
+            buffer.update(task, channel_id=10000000000000001)
+
+            assert await buffer.flush() == 1
+
+        loop.run_until_complete(main())
+        raw_data = loop.run_until_complete(db.hget(key, task.uuid.value))
+
+        assert attempts == 2
+        assert raw_data is not None
+        assert json.loads(raw_data)["channel_id"] == 10000000000000001
+        assert len(buffer) == 0
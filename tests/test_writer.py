@@ -0,0 +1,149 @@
+import asyncio
+import pytest
+from typing import Callable, List
+from redis.exceptions import WatchError
+from watdo.database import Database
+from watdo.models import Profile, Task
+from watdo.indexes import CategoryIndex, StatsIndex
+from watdo.writer import ProfileTransaction, ProfileWriter
+
+loop = asyncio.new_event_loop()
+MakeTask = Callable[..., Task]
+
+
+class TestProfileWriter:
+    def test_operations_run_in_order_and_flush_together(self, profile: Profile) -> None:
+        writer = ProfileWriter()
+        applied: List[int] = []
+
+        async def operation(i: int) -> int:
+            async def apply(transaction: ProfileTransaction) -> int:
+                await asyncio.sleep(0.001 * (5 - i))
+                applied.append(i)
+                return i
+
+            return await writer.run(profile, apply)
+
+        async def main() -> List[int]:
+            return await asyncio.gather(*(operation(i) for i in range(5)))
+
+        assert loop.run_until_complete(main()) == [0, 1, 2, 3, 4]
+        assert applied == [0, 1, 2, 3, 4]
+        assert writer.operations == 5
+        assert writer.flushes == 1
+        assert len(writer) == 0
+
+    def test_failed_operation_does_not_fail_the_others(self, profile: Profile) -> None:
+        writer = ProfileWriter()
+
+        async def fail(transaction: ProfileTransaction) -> None:
+            transaction.batch.delete("should-not-be-flushed")
+            raise ValueError("invalid")
+
+        async def succeed(transaction: ProfileTransaction) -> str:
+            return "ok"
+
+        async def main() -> None:
+            failed = loop.create_task(writer.run(profile, fail))
+            assert await writer.run(profile, succeed) == "ok"
+
+            with pytest.raises(ValueError):
+                await failed
+
+        loop.run_until_complete(main())
+
+        assert writer.operations == 1
+
+    def test_drain_waits_for_queued_operations(self, profile: Profile) -> None:
+        writer = ProfileWriter()
+        applied: List[str] = []
+
+        async def slow(transaction: ProfileTransaction) -> None:
+            await asyncio.sleep(0.01)
+            applied.append("slow")
+
+        async def stuck(transaction: ProfileTransaction) -> None:
+            await asyncio.sleep(60)
+
+        async def main() -> None:
+            queued = loop.create_task(writer.run(profile, slow))
+            await asyncio.sleep(0)
+
+            assert await writer.drain() == 0
+            assert applied == ["slow"]
+            await queued
+
+            loop.create_task(writer.run(profile, stuck))
+            await asyncio.sleep(0)
+
+            assert await writer.drain(timeout=0.01) == 1
+            assert len(writer) == 0
+
+        loop.run_until_complete(main())
+
+
+class TestProfileConflicts:
+    def test_writers_of_other_processes_do_not_interleave(
+        self, db: Database, profile: Profile, make_task: MakeTask
+    ) -> None:
+        # One writer per process, sharing nothing but Redis
+        writers = [ProfileWriter() for _ in range(2)]
+
+        async def move(writer: ProfileWriter, category: str) -> None:
+            async def apply(transaction: ProfileTransaction) -> None:
+                stored = await transaction.get_stored(f"{0:032}")
+                # Long enough for the other writer to read the same version
+                await asyncio.sleep(0.05)
+                transaction.replace(stored, make_task(category=category))
+
+            await writer.run(profile, apply)
+
+        async def main() -> None:
+            await writers[0].save(make_task(category="home"))
+            await asyncio.gather(move(writers[0], "work"), move(writers[1], "gym"))
+
+        loop.run_until_complete(main())
+
+        async def members(category: str) -> List[str]:
+            key = CategoryIndex.key(profile.uuid.value, category)
+            return sorted(await db.smembers(key))
+
+        categories = {
+            c: loop.run_until_complete(members(c)) for c in ("home", "work", "gym")
+        }
+        stats = loop.run_until_complete(
+            StatsIndex().get_categories(db, profile.uuid.value)
+        )
+
+        # The task moved twice, not once from each writer's stale read
+        assert sum(w.conflicts for w in writers) == 1
+        assert sum(len(uuids) for uuids in categories.values()) == 1
+        assert sum(stats.values()) == 1
+        assert {c: n for c, n in stats.items() if n} == {
+            c: len(uuids) for c, uuids in categories.items() if uuids
+        }
+
+    def test_conflicting_writes_fail_after_the_last_attempt(
+        self, db: Database, profile: Profile, make_task: MakeTask
+    ) -> None:
+        key = f"task_records:profile.{profile.uuid.value}"
+        writer = ProfileWriter(max_attempts=2)
+        attempts = 0
+
+        async def contended_save(transaction: ProfileTransaction) -> None:
+            nonlocal attempts
+            attempts += 1
+            await transaction.save(make_task(category="home"))
+            # Another process writes the profile before every flush
+            await db._conn.hset(key, "b" * 32, "{}")
+
+        async def main() -> None:
+            with pytest.raises(WatchError):
+                await writer.run(profile, contended_save)
+
+        loop.run_until_complete(main())
+
+        assert attempts == 2
+        assert writer.conflicts == 1
+        assert writer.operations == 0
+        assert list(loop.run_until_complete(db.hgetall(key))) == ["b" * 32]
@@ -1,7 +1,10 @@
 import asyncio
-from watdo.discord import Bot
+from watdo.discord import Bot, ShardedBot
 from watdo.database import Database
+from watdo.migrations import migrate
+from watdo.due_parser import due_parser
 from watdo.environ import DISCORD_TOKEN
+from watdo.cluster import worker_shards
 from watdo._main_runner import async_main_runner
 
 bot: Bot
@@ -11,9 +14,24 @@ async def async_main(loop: asyncio.AbstractEventLoop) -> int:
     global bot
 
     db = Database()
-    bot = Bot(loop=loop, database=db)
-
-    await bot.start(DISCORD_TOKEN)
+    shards = worker_shards()
+
+    if shards is None:
+        bot = Bot(loop=loop, database=db)
+        await migrate(db)
+    else:
+        # Started by the cluster launcher, which migrated already
+        shard_ids, shard_count = shards
+        bot = ShardedBot(
+            loop=loop, database=db, shard_ids=shard_ids, shard_count=shard_count
+        )
+
+    try:
+        await bot.start(DISCORD_TOKEN)
+    finally:
+        # Stop producing background work before it gets drained
+        await bot.close()
+        due_parser.shutdown()
 
     return 0
 
@@ -1,11 +1,14 @@
 import os
 import sys
+import signal
 import asyncio
 import logging
 import threading
 from types import TracebackType
 from typing import Callable, Coroutine, Any, Dict, Type, Optional
 from watdo.logging import get_logger
+from watdo.background import background
+from watdo.loop_monitor import loop_monitor
 
 
 def excepthook(
@@ -59,4 +62,40 @@ def async_main_runner(
             args.exc_traceback,
         )
 
-        return runner.run(func(loop))
+        return runner.run(_run_and_drain(func, loop))
+
+
+async def _run_and_drain(
+    func: Callable[[asyncio.AbstractEventLoop], Coroutine[Any, Any, int]],
+    loop: asyncio.AbstractEventLoop,
+) -> int:
+    logger = get_logger("async_main_runner")
+    main_task = asyncio.current_task()
+    terminated = False
+
+    def terminate() -> None:
+        nonlocal terminated
+        terminated = True
+
+        if main_task is not None:
+            main_task.cancel()
+
+    if os.name != "nt":
+        loop.add_signal_handler(signal.SIGTERM, terminate)
+
+    loop_monitor.start()
+
+    try:
+        return await func(loop)
+    except asyncio.CancelledError:
+        if not terminated:
+            raise
+
+        logger.info("Received SIGTERM, shutting down...")
+        return 0
+    finally:
+        cancelled = await background.drain()
+        await loop_monitor.stop()
+
+        if cancelled:
+            logger.warning(f"Cancelled {cancelled} background task(s) on shutdown")
@@ -0,0 +1,156 @@
+import time
+import asyncio
+import functools
+from dataclasses import dataclass
+from collections import defaultdict
+from typing import Any, Coroutine, DefaultDict, Dict, List, Optional, Set
+from watdo.logging import get_logger
+
+
+@dataclass(kw_only=True)
+class CategoryLimits:
+    concurrency: int = 16
+    max_pending: int = 1000
+    # Failures of log sends are only counted, logging them would send more logs
+    log_failures: bool = True
+
+
+@dataclass(kw_only=True)
+class CategoryMetrics:
+    submitted: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    dropped: int = 0
+
+    @property
+    def pending(self) -> int:
+        return self.submitted - self.completed - self.failed - self.cancelled
+
+
+class BackgroundTasks:
+    """Fire-and-forget coroutines that are tracked per category.
+
+    At most `concurrency` tasks of a category run at once and the rest wait
+    for a slot. `submit` waits while a category has `max_pending` tasks,
+    `spawn` can't wait and drops the coroutine instead. `drain` waits for
+    everything still pending on shutdown.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, CategoryLimits]] = None) -> None:
+        self.limits = limits or {}
+        self.metrics: DefaultDict[str, CategoryMetrics] = defaultdict(CategoryMetrics)
+        self._tasks: Set["asyncio.Task[Any]"] = set()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._waiters: DefaultDict[str, List["asyncio.Future[None]"]] = defaultdict(
+            list
+        )
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def _get_limits(self, category: str) -> CategoryLimits:
+        return self.limits.get(category) or self.limits.setdefault(
+            category, CategoryLimits()
+        )
+
+    def is_full(self, category: str) -> bool:
+        return self.metrics[category].pending >= self._get_limits(category).max_pending
+
+    async def _run(self, category: str, coro: Coroutine[Any, Any, Any]) -> Any:
+        if category not in self._semaphores:
+            limit = self._get_limits(category).concurrency
+            self._semaphores[category] = asyncio.Semaphore(limit)
+
+        async with self._semaphores[category]:
+            metrics = self.metrics[category]
+            metrics.running += 1
+
+            try:
+                return await coro
+            finally:
+                metrics.running -= 1
+
+    def _on_done(self, category: str, task: "asyncio.Task[Any]") -> None:
+        self._tasks.discard(task)
+        metrics = self.metrics[category]
+
+        if task.cancelled():
+            metrics.cancelled += 1
+        elif (error := task.exception()) is not None:
+            metrics.failed += 1
+
+            if self._get_limits(category).log_failures:
+                get_logger(f"BackgroundTasks.{category}").exception(
+                    error, exc_info=error
+                )
+        else:
+            metrics.completed += 1
+
+        # Waiters check the limit again once they wake up
+        for waiter in self._waiters.pop(category, []):
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _start(
+        self, category: str, coro: Coroutine[Any, Any, Any]
+    ) -> "asyncio.Task[Any]":
+        task = asyncio.create_task(self._run(category, coro))
+        task.add_done_callback(functools.partial(self._on_done, category))
+        self._tasks.add(task)
+        self.metrics[category].submitted += 1
+        return task
+
+    def spawn(
+        self, coro: Coroutine[Any, Any, Any], *, category: str = "default"
+    ) -> Optional["asyncio.Task[Any]"]:
+        if self.is_full(category):
+            coro.close()
+            self.metrics[category].dropped += 1
+            return None
+
+        return self._start(category, coro)
+
+    async def submit(
+        self, coro: Coroutine[Any, Any, Any], *, category: str = "default"
+    ) -> "asyncio.Task[Any]":
+        try:
+            while self.is_full(category):
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters[category].append(waiter)
+                await waiter
+        except BaseException:
+            coro.close()
+            raise
+
+        return self._start(category, coro)
+
+    async def drain(self, *, timeout: float = 10) -> int:
+        """Wait for pending tasks and cancel what's left after `timeout`.
+
+        Returns the number of cancelled tasks.
+        """
+        deadline = time.monotonic() + timeout
+
+        # Tasks may spawn more tasks while draining
+        while self._tasks and (remaining := deadline - time.monotonic()) > 0:
+            await asyncio.wait(set(self._tasks), timeout=remaining)
+
+        tasks = list(self._tasks)
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return len(tasks)
+
+
+background = BackgroundTasks(
+    {
+        "database": CategoryLimits(concurrency=8),
+        "reminder": CategoryLimits(concurrency=8, max_pending=100),
+        "discord": CategoryLimits(concurrency=16, max_pending=500),
+        "log": CategoryLimits(concurrency=2, max_pending=100, log_failures=False),
+    }
+)
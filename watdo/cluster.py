@@ -0,0 +1,235 @@
+import os
+import sys
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import discord
+from watdo.database import Database
+from watdo.migrations import migrate
+from watdo.environ import DISCORD_TOKEN
+from watdo.logging import get_logger
+from watdo._main_runner import async_main_runner
+
+# Read by the launcher
+CLUSTER_PROCESSES = int(os.getenv("CLUSTER_PROCESSES") or os.cpu_count() or 1)
+# The shards run on this host, like "0-7", all of them when not set. Other
+# hosts run the rest, so SHARD_COUNT is required with it
+CLUSTER_SHARDS = os.getenv("CLUSTER_SHARDS")
+# Asked to Discord when not set
+SHARD_COUNT = int(os.getenv("SHARD_COUNT") or 0)
+
+# Set by the launcher for the workers
+SHARD_IDS = os.getenv("SHARD_IDS")
+
+
+def parse_shards(value: str) -> List[int]:
+    """Parse shard IDs like "0-3,8"."""
+    shard_ids: List[int] = []
+
+    for part in value.split(","):
+        first, _, last = part.strip().partition("-")
+        shard_ids.extend(range(int(first), int(last or first) + 1))
+
+    return shard_ids
+
+
+def assign_shards(shard_ids: Sequence[int], processes: int) -> List[List[int]]:
+    """Split the shards into contiguous ranges, one per process."""
+    processes = max(1, min(processes, len(shard_ids)))
+    size, extra = divmod(len(shard_ids), processes)
+    ranges = []
+    start = 0
+
+    for index in range(processes):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(list(shard_ids[start:end]))
+        start = end
+
+    return ranges
+
+
+def worker_shards() -> Optional[Tuple[List[int], int]]:
+    """The shard IDs and shard count of this process when it's a worker."""
+    if not SHARD_IDS:
+        return None
+
+    return parse_shards(SHARD_IDS), SHARD_COUNT
+
+
+async def recommended_shard_count(token: str) -> int:
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+
+    try:
+        await http.static_login(token)
+        shard_count, _, _ = await http.get_bot_gateway()
+        return shard_count
+    finally:
+        await http.close()
+
+
+@dataclass(kw_only=True)
+class Worker:
+    index: int
+    shard_ids: List[int]
+    process: Optional[asyncio.subprocess.Process] = None
+    restarts: int = 0
+    started_at: Optional[float] = None
+
+    @property
+    def uptime(self) -> float:
+        if self.started_at is None:
+            return 0
+
+        return time.monotonic() - self.started_at
+
+
+class Supervisor:
+    """Runs `shard_ids` out of `shard_count` shards over worker processes.
+
+    Every worker runs `command` with `SHARD_IDS` and `SHARD_COUNT` set, and
+    the workers share state only through Redis, so the other shards can
+    run on other hosts. A worker that crashes is
+    restarted after a delay that doubles on every crash up to
+    `max_backoff`, and goes back to `min_backoff` once the worker ran for
+    `stable_after` seconds. A worker that exits cleanly isn't restarted.
+    """
+
+    def __init__(
+        self,
+        shard_ids: Sequence[int],
+        shard_count: int,
+        processes: int,
+        *,
+        command: Sequence[str] = (sys.executable, "run.py"),
+        min_backoff: float = 1,
+        max_backoff: float = 60,
+        stable_after: float = 60,
+    ) -> None:
+        self.shard_count = shard_count
+        self.command = command
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.workers = [
+            Worker(index=index, shard_ids=worker_shard_ids)
+            for index, worker_shard_ids in enumerate(
+                assign_shards(shard_ids, processes)
+            )
+        ]
+        self._stopped = asyncio.Event()
+
+    def worker_env(self, worker: Worker) -> Dict[str, str]:
+        env = dict(os.environ)
+        env["SHARD_IDS"] = ",".join(str(i) for i in worker.shard_ids)
+        env["SHARD_COUNT"] = str(self.shard_count)
+
+        # Slash commands are global, one process is enough to sync them
+        if 0 not in worker.shard_ids:
+            env["SYNC_SLASH_COMMANDS"] = "0"
+
+        metrics_port = int(os.getenv("METRICS_PORT") or 0)
+
+        if metrics_port:
+            env["METRICS_PORT"] = str(metrics_port + worker.index)
+
+        return env
+
+    async def run(self) -> None:
+        await asyncio.gather(*(self._supervise(w) for w in self.workers))
+
+    async def _supervise(self, worker: Worker) -> None:
+        logger = get_logger(f"Supervisor.worker{worker.index}")
+        backoff = self.min_backoff
+
+        while not self._stopped.is_set():
+            worker.process = await asyncio.create_subprocess_exec(
+                *self.command, env=self.worker_env(worker)
+            )
+            worker.started_at = time.monotonic()
+            logger.info(
+                f"Started worker {worker.index} (pid {worker.process.pid}) "
+                f"for shard(s) {worker.shard_ids}"
+            )
+            code = await worker.process.wait()
+
+            if self._stopped.is_set():
+                break
+
+            if code == 0:
+                logger.info(f"Worker {worker.index} exited")
+                break
+
+            if worker.uptime >= self.stable_after:
+                backoff = self.min_backoff
+
+            worker.restarts += 1
+            logger.warning(
+                f"Worker {worker.index} exited with code {code}, "
+                f"restarting in {backoff:.0f}s"
+            )
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+        worker.started_at = None
+
+    async def stop(self, *, timeout: float = 30) -> None:
+        """Ask the workers to shut down, and kill the ones that don't."""
+        self._stopped.set()
+        running = [
+            w.process
+            for w in self.workers
+            if w.process is not None and w.process.returncode is None
+        ]
+
+        for process in running:
+            process.terminate()
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(p.wait() for p in running)), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            for process in running:
+                if process.returncode is None:
+                    process.kill()
+
+            await asyncio.gather(*(p.wait() for p in running))
+
+
+async def async_main(loop: asyncio.AbstractEventLoop) -> int:
+    logger = get_logger("cluster")
+
+    # Hosts asking Discord on their own could get different counts and
+    # end up running overlapping shards
+    if CLUSTER_SHARDS and not SHARD_COUNT:
+        logger.error("SHARD_COUNT has to be set along with CLUSTER_SHARDS")
+        return 1
+
+    shard_count = SHARD_COUNT or await recommended_shard_count(DISCORD_TOKEN)
+
+    if CLUSTER_SHARDS:
+        shard_ids = parse_shards(CLUSTER_SHARDS)
+    else:
+        shard_ids = list(range(shard_count))
+
+    # Workers don't migrate, so that they don't race each other doing it
+    if 0 in shard_ids:
+        await migrate(Database())
+
+    supervisor = Supervisor(shard_ids, shard_count, CLUSTER_PROCESSES)
+    logger.info(
+        f"Running {len(shard_ids)} of {shard_count} shard(s) "
+        f"over {len(supervisor.workers)} process(es)"
+    )
+
+    try:
+        await supervisor.run()
+    finally:
+        await supervisor.stop()
+
+    return 0
+
+
+def main() -> int:
+    return async_main_runner(async_main)
@@ -1,10 +1,176 @@
-from typing import Dict, List, Optional, AsyncIterator
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    Any,
+    Dict,
+    List,
+    Set,
+    Tuple,
+    Optional,
+    Iterable,
+    Callable,
+    Iterator,
+    AsyncIterator,
+)
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
 from watdo.environ import REDIS_URL
+from watdo.tracing import tracer
+from watdo.metrics import metrics
+
+
+@contextmanager
+def _instrument(command: str, **attributes: Any) -> Iterator[None]:
+    started_at = time.perf_counter()
+
+    try:
+        with tracer.span("redis", command=command, **attributes):
+            yield
+    finally:
+        metrics.record_redis_call(command, time.perf_counter() - started_at)
+
+
+class TracedRedis(Redis):
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        with _instrument(str(args[0])):
+            return await super().execute_command(  # type: ignore[no-untyped-call]
+                *args, **options
+            )
+
+
+# Renews the lease of its owner or takes it when nobody holds it
+_HOLD_LEASE = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return redis.call("SET", KEYS[1], ARGV[1], "NX", "PX", ARGV[2]) and 1 or 0
+"""
+
+_RELEASE_LEASE = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+# Deletes a field of a hash only while it still has the given value
+_HDEL_IF_EQUAL = """
+if redis.call("HGET", KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call("HDEL", KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+class WriteBatch:
+    """Write commands sent to Redis together in a single MULTI/EXEC."""
+
+    def __init__(self, conn: Redis) -> None:
+        self._conn = conn
+        self._commands: List[Tuple[str, Tuple[Any, ...], Dict[str, Any]]] = []
+        self._callbacks: List[Callable[[], None]] = []
+        self._pipe: Optional[Pipeline] = None
+
+    async def watch(self, *names: str) -> None:
+        """Fail `execute` with `WatchError` if `names` change before it.
+
+        Reads made after this, from any connection, can be trusted by the
+        commands of the batch.
+        """
+        self._pipe = self._conn.pipeline(transaction=True)
+        await self._pipe.watch(*names)
+
+    async def reset(self) -> None:
+        """Stop watching and drop the queued commands and callbacks."""
+        if self._pipe is not None:
+            await self._pipe.reset()  # type: ignore[no-untyped-call]
+            self._pipe = None
+
+        self._commands.clear()
+        self._callbacks.clear()
+
+    def on_execute(self, callback: Callable[[], None]) -> None:
+        self._callbacks.append(callback)
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def _queue(self, command: str, *args: Any, **kwargs: Any) -> None:
+        self._commands.append((command, args, kwargs))
+
+    def merge(self, other: "WriteBatch") -> None:
+        """Queue the commands and callbacks of `other` after the ones of this batch."""
+        self._commands.extend(other._commands)
+        self._callbacks.extend(other._callbacks)
+
+    def delete(self, *names: str) -> None:
+        self._queue("delete", *names)
+
+    def hset(self, name: str, *, key: str, value: str) -> None:
+        self._queue("hset", name, key=key, value=value)
+
+    def hdel(self, name: str, *keys: str) -> None:
+        self._queue("hdel", name, *keys)
+
+    def hdel_if_equal(self, name: str, key: str, value: str) -> None:
+        self._queue("eval", _HDEL_IF_EQUAL, 1, name, key, value)
+
+    def sadd(self, name: str, *values: str) -> None:
+        self._queue("sadd", name, *values)
+
+    def srem(self, name: str, *values: str) -> None:
+        self._queue("srem", name, *values)
+
+    def hincrby(self, name: str, key: str, amount: int) -> None:
+        self._queue("hincrby", name, key, amount)
+
+    def zadd(self, name: str, mapping: Dict[str, float]) -> None:
+        self._queue("zadd", name, mapping)
+
+    def zrem(self, name: str, *values: str) -> None:
+        self._queue("zrem", name, *values)
+
+    async def execute(self) -> None:
+        if not self._commands:
+            await self.reset()
+            return
+
+        pipe, self._pipe = self._pipe, None
+
+        if pipe is None:
+            pipe = self._conn.pipeline(transaction=True)
+        else:
+            pipe.multi()  # type: ignore[no-untyped-call]
+
+        for command, args, kwargs in self._commands:
+            getattr(pipe, command)(*args, **kwargs)
+
+        # Resets the pipeline, even when a watched key changed
+        with _instrument("MULTI", size=len(self._commands)):
+            await pipe.execute()
+
+        self._commands.clear()
+
+        for callback in self._callbacks:
+            callback()
+
+        self._callbacks.clear()
 
 
 class Database:
-    _conn = Redis.from_url(REDIS_URL)
+    _conn: Redis = TracedRedis.from_url(REDIS_URL)
+
+    def create_batch(self) -> WriteBatch:
+        return WriteBatch(self._conn)
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[WriteBatch]:
+        batch = self.create_batch()
+        yield batch
+        await batch.execute()
+
+    async def ping(self) -> bool:
+        return bool(await self._conn.ping())
 
     async def iter_keys(self, match: str) -> AsyncIterator[str]:
         async for key in self._conn.scan_iter(match=match):
@@ -50,6 +216,19 @@ class Database:
         data = data.decode() if isinstance(data, bytes) else data
         return data
 
+    async def hmget(self, name: str, keys: Iterable[str]) -> List[Optional[str]]:
+        keys = list(keys)
+
+        if not keys:
+            return []
+
+        data = await self._conn.hmget(name, keys)
+        return [d.decode() if isinstance(d, bytes) else d for d in data]
+
+    async def hkeys(self, name: str) -> List[str]:
+        data = await self._conn.hkeys(name)
+        return [d.decode() if isinstance(d, bytes) else d for d in data]
+
     async def hset(self, name: str, *, key: str, value: str) -> None:
         await self._conn.hset(name, key=key, value=value)
 
@@ -57,6 +236,61 @@ class Database:
         deleted_count = await self._conn.hdel(name, *keys)
         return deleted_count
 
+    async def smembers(self, name: str) -> Set[str]:
+        data = await self._conn.smembers(name)
+        return {d.decode() if isinstance(d, bytes) else d for d in data}
+
+    async def zcount(self, name: str, min: float | str, max: float | str) -> int:
+        return await self._conn.zcount(name, min, max)
+
+    async def smembers_many(self, names: Iterable[str]) -> List[Set[str]]:
+        pipe = self._conn.pipeline(transaction=False)
+
+        for name in names:
+            pipe.smembers(name)
+
+        with _instrument("PIPELINE", size=len(pipe)):
+            results = await pipe.execute()
+
+        return [
+            {d.decode() if isinstance(d, bytes) else d for d in data}
+            for data in results
+        ]
+
+    async def srem(self, name: str, *values: str) -> int:
+        return await self._conn.srem(name, *values)
+
+    async def zrangebyscore_many(
+        self, names: Iterable[str], min: float | str, max: float | str
+    ) -> List[List[str]]:
+        pipe = self._conn.pipeline(transaction=False)
+
+        for name in names:
+            pipe.zrangebyscore(name, min, max)
+
+        with _instrument("PIPELINE", size=len(pipe)):
+            results = await pipe.execute()
+
+        return [
+            [d.decode() if isinstance(d, bytes) else d for d in data]
+            for data in results
+        ]
+
+    async def sinter(self, names: Iterable[str]) -> Set[str]:
+        data = await self._conn.sinter(list(names))
+        return {d.decode() if isinstance(d, bytes) else d for d in data}
+
+    async def delete(self, *names: str) -> None:
+        await self._conn.delete(*names)
+
+    async def hold_lease(self, key: str, owner: str, *, ttl: float) -> bool:
+        held = await self._conn.eval(_HOLD_LEASE, 1, key, owner, int(ttl * 1000))
+        return bool(held)
+
+    async def release_lease(self, key: str, owner: str) -> bool:
+        released = await self._conn.eval(_RELEASE_LEASE, 1, key, owner)
+        return bool(released)
+
     def _parse_shortcuts(self, command_str: Optional[str]) -> Optional[List[str]]:
         if command_str is None:
             return None
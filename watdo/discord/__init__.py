@@ -1,34 +1,94 @@
+import io
 import os
+import json
+import time
 import glob
+import gc
+import signal
+import hashlib
 import asyncio
+import functools
+import importlib
 import logging
-from typing import cast, Any, List
+from typing import cast, Any, Iterable, List, Optional
 import discord
 from discord.ext import commands as dc
 from watdo import dt
 from watdo.errors import CancelCommand
 from watdo.environ import IS_DEV, SYNC_SLASH_COMMANDS
 from watdo.logging import get_logger
+from watdo.background import background
+from watdo.tracing import tracer
+from watdo.metrics import metrics
+from watdo.profiling import PROFILE_SECONDS, Capture, profiler
+from watdo.memory import Usage, measure
+from watdo.models import Profile, Task
 from watdo.reminder import Reminder
+from watdo.services import ServiceRegistry
+from watdo.write_behind import write_behind
+from watdo.writer import profile_writer
 from watdo.database import Database
+from watdo.lease import Lease
+from watdo.due_parser import due_parser
+from watdo.indexes import task_indexes
 from watdo.discord.cogs import BaseCog
-from watdo.discord.embeds import ErrorEmbed
+from watdo.discord.edits import EditCoalescer
+from watdo.discord.autocomplete import CompletionsCache
+from watdo.discord.dispatch import Priority, Dispatcher, dispatcher
+from watdo.discord.embeds import PagedEmbed
+from watdo.discord.error_reports import ErrorReporter
+from watdo.discord.metrics_server import METRICS_PORT, MetricsServer
+from watdo.discord.runtime import RuntimeProfile, UserCache, get_runtime_profile
 
 
 class Bot(dc.Bot):
-    def __init__(self, *, loop: asyncio.AbstractEventLoop, database: Database) -> None:
+    def __init__(
+        self,
+        *,
+        loop: asyncio.AbstractEventLoop,
+        database: Database,
+        runtime: Optional[RuntimeProfile] = None,
+        **options: Any,
+    ) -> None:
+        runtime = runtime or get_runtime_profile()
         super().__init__(
             loop=loop,
             command_prefix="$" if IS_DEV else "watdo ",
             help_command=None,
-            intents=discord.Intents.all(),
+            intents=runtime.intents,
+            member_cache_flags=runtime.member_cache_flags,
+            chunk_guilds_at_startup=runtime.chunk_guilds_at_startup,
+            max_messages=runtime.max_messages,
+            **options,
+        )
+        self.runtime = runtime
+        self.user_cache = UserCache(
+            super().get_user, self.fetch_user, max_users=runtime.max_users
         )
         self.db = database
+        self.edit_coalescer = EditCoalescer(loop)
+        self.completions = CompletionsCache(database)
+        task_indexes.add_listener(self.completions.invalidate)
         self.color = discord.Colour.from_rgb(191, 155, 231)
+        self.created_at = time.perf_counter()
+        self.ready_after: Optional[float] = None
+        self.first_command_time: Optional[float] = None
+        self.services = ServiceRegistry()
+        # Only one process sends reminders, even when several run
+        self.services.register(
+            Reminder(database, self, lease=Lease(database, "reminder"))
+        )
+        self.services.register(write_behind)
+        self.error_reporter = ErrorReporter(self._send_log)
+        self.services.register(self.error_reporter)
+        self.gateway_connected = False
+        self.metrics_server = MetricsServer(self) if METRICS_PORT else None
+        self.before_invoke(self._before_command)
+        self.after_invoke(self._after_command)
 
         for name in dir(self):
             if name.startswith("_on_") and name.endswith("_event"):
-                self._add_event(name.lstrip("_").rstrip("_event"))
+                self._add_event(name.removeprefix("_").removesuffix("_event"))
 
     def _add_event(self, event_name: str) -> None:
         event = getattr(self, f"_{event_name}_event")
@@ -55,6 +115,14 @@ class Bot(dc.Bot):
                 path = path.rstrip(".py").replace("/", ".").replace("\\", ".")
                 await self.load_extension(path)
 
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
+
+        if os.name != "nt":
+            loop = asyncio.get_running_loop()
+            loop.add_signal_handler(signal.SIGUSR1, self._on_profile_signal, "sample")
+            loop.add_signal_handler(signal.SIGUSR2, self._on_profile_signal, "memory")
+
         # Ensure docstring for all commands
         for cog in self.cogs.values():
             for command in cog.get_commands():
@@ -78,6 +146,12 @@ class Bot(dc.Bot):
             message.content = c
             await self.on_message(message)
 
+    async def invoke(self, ctx: dc.Context[Any], /) -> None:
+        name = ctx.command.qualified_name if ctx.command else ctx.invoked_with
+
+        with tracer.span("command", command=name):
+            await super().invoke(ctx)
+
     async def process_command_shortcuts(self, message: discord.Message) -> bool:
         command = await self.db.get_command_shortcut(
             str(message.author.id),
@@ -87,7 +161,7 @@ class Bot(dc.Bot):
         if command is None:
             return False
 
-        self.loop.create_task(self._process_commands(command, message))
+        background.spawn(self._process_commands(command, message), category="commands")
         return True
 
     async def on_message(self, message: discord.Message) -> None:
@@ -111,29 +185,136 @@ class Bot(dc.Bot):
             get_logger("Bot.on_message").exception(error)
             raise error
 
+    async def warm_up(self) -> None:
+        """Load what the first commands would otherwise pay for."""
+        logger = get_logger("Bot.warm_up")
+        started_at = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        channel_ids = (
+            c.id for c in self.get_all_channels() if isinstance(c, discord.TextChannel)
+        )
+        _, _, profiles = await asyncio.gather(
+            due_parser.warm_up(),
+            loop.run_in_executor(None, importlib.import_module, "recurrent"),
+            self.completions.warm_up(channel_ids),
+        )
+        logger.debug(
+            f"Warmed up in {time.perf_counter() - started_at:.2f}s, "
+            f"completions of {profiles} profile(s) cached"
+        )
+
     async def _on_ready_event(self) -> None:
         logger = get_logger("Bot.on_ready")
-        logger.info("watdo is ready!!")
 
-        Reminder(self.loop, self.db, self).start()
+        if self.ready_after is None:
+            self.ready_after = time.perf_counter() - self.created_at
+            logger.info(
+                f"watdo is ready!! (took {self.ready_after:.2f}s, "
+                f"{self.runtime.name} profile, {len(self.guilds)} guild(s))"
+            )
+            background.spawn(self.warm_up(), category="startup")
+        else:
+            logger.info("watdo is ready!!")
+
+        self.gateway_connected = True
+
+        # on_ready fires again after reconnects, starting is a no-op then
+        self.services.start()
+        self.services.resume()
 
         logger.debug(f"Timezone: {dt.local_tz()}")
 
         if SYNC_SLASH_COMMANDS:
-            logger.debug("Syncing slash commands...")
-
             if IS_DEV:
                 dev_server = cast(discord.Guild, self.get_guild(975234089353351178))
                 self.tree.copy_global_to(guild=dev_server)
-                synced_commands = await self.tree.sync(guild=dev_server)
+                await self.sync_app_commands(guild=dev_server)
             else:
-                synced_commands = await self.tree.sync()
+                await self.sync_app_commands()
+
+    async def _on_disconnect_event(self) -> None:
+        # Reminders can't be sent without a gateway connection
+        self.gateway_connected = False
+        self.services.pause()
+
+    async def _on_resumed_event(self) -> None:
+        self.gateway_connected = True
+        self.services.resume()
 
-            logger.debug(f"Synced {len(synced_commands)} slash command(s)")
+    async def close(self) -> None:
+        # Background work and writes still need the HTTP session and Redis
+        await self.services.stop()
+        cancelled = await background.drain()
+        await write_behind.flush()
+        cancelled += await profile_writer.drain()
+
+        if cancelled:
+            get_logger("Bot.close").warning(
+                f"Cancelled {cancelled} background task(s) and write(s) on shutdown"
+            )
+
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+
+        task_indexes.remove_listener(self.completions.invalidate)
+        await super().close()
+
+    @staticmethod
+    def app_commands_hash(
+        tree: discord.app_commands.CommandTree[Any],
+        *,
+        guild: Optional[discord.abc.Snowflake] = None,
+    ) -> str:
+        payload = sorted(
+            (c.to_dict(tree) for c in tree.get_commands(guild=guild)),
+            key=lambda c: (c["type"], c["name"]),
+        )
+        data = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    async def sync_app_commands(
+        self, *, guild: Optional[discord.abc.Snowflake] = None
+    ) -> None:
+        """Sync the app commands unless they didn't change since the last sync."""
+        logger = get_logger("Bot.on_ready")
+        scope = "global" if guild is None else guild.id
+        key = f"app_commands_hash:{self.application_id}.{scope}"
+        commands_hash = self.app_commands_hash(self.tree, guild=guild)
+
+        if await self.db.get(key) == commands_hash:
+            logger.debug("Slash commands are up to date")
+            return
+
+        logger.debug("Syncing slash commands...")
+        synced_commands = await self.tree.sync(guild=guild)
+        await self.db.set(key, commands_hash)
+        logger.debug(f"Synced {len(synced_commands)} slash command(s)")
+
+    # Invoke hooks run in the task of the command, unlike events
+    async def _before_command(self, ctx: dc.Context["Bot"]) -> None:
+        if ctx.command is not None:
+            metrics.start_command(id(ctx), ctx.command.qualified_name)
+
+    async def _after_command(self, ctx: dc.Context["Bot"]) -> None:
+        seconds = metrics.finish_command(id(ctx))
+
+        if seconds is None or ctx.command_failed or self.first_command_time is not None:
+            return
+
+        self.first_command_time = seconds
+        get_logger("Bot.after_command").info(
+            f"First command `{ctx.command}` took {seconds * 1000:.0f}ms"
+        )
 
     async def _on_command_error_event(
         self, ctx: dc.Context["Bot"], error: dc.CommandError
     ) -> None:
+        # Failed slash commands don't run the after invoke hook
+        metrics.finish_command(id(ctx))
+
+        if ctx.command is not None and not isinstance(error, CancelCommand):
+            metrics.count_error(ctx.command.qualified_name)
+
         if isinstance(error, dc.MissingRequiredArgument) and ctx.command is not None:
             params = BaseCog.parse_params(ctx.command)
             await BaseCog.send(ctx, f"{ctx.prefix}{ctx.invoked_with} {params}")
@@ -145,17 +326,187 @@ class Bot(dc.Bot):
             await BaseCog.send(ctx, f"**{type(error).__name__}:** {error}")
 
     def log(self, record: logging.LogRecord) -> None:
-        channel = cast(discord.TextChannel, self.get_channel(1086519345972260894))
-        self.loop.create_task(BaseCog.send(channel, embed=ErrorEmbed(record)))
+        # Called from the logging thread
+        self.loop.call_soon_threadsafe(self.error_reporter.add, record)
+
+    @property
+    def sees_every_guild(self) -> bool:
+        """Whether this process receives the events of every guild."""
+        return True
+
+    def get_user(self, id: int, /) -> Optional[discord.User]:
+        return self.user_cache.get(id)
+
+    async def resolve_user(self, user_id: int) -> Optional[discord.User]:
+        """Get a user, fetching it when it isn't cached."""
+        try:
+            return await self.user_cache.resolve(user_id)
+        except discord.HTTPException as error:
+            get_logger("Bot.resolve_user").warning(
+                f"Couldn't fetch user {user_id}: {error}"
+            )
+            return None
+
+    async def resolve_users(self, user_ids: Iterable[int]) -> None:
+        """Cache users so that embeds built right after can show them.
+
+        The user cache limits how many of them are fetched at once.
+        """
+        await asyncio.gather(*(self.resolve_user(i) for i in set(user_ids)))
+
+    def memory_usage(self, *, deep: bool = False) -> List[Usage]:
+        """Memory held by discord.py caches, paginators, waiters and our caches.
+
+        With `deep`, live model objects are found and the sizes are estimated
+        by walking every referenced object, which blocks the loop for a while.
+        """
+        guilds = list(self.guilds)
+        # Members are only listed for the deep walk, there can be millions
+        members = [m for guild in guilds for m in guild.members] if deep else []
+        channels = [c for guild in guilds for c in guild.channels]
+        users = list(self.users)
+        messages = list(self.cached_messages)
+        paginators = list(PagedEmbed.running)
+        waiters = [
+            future
+            for listeners in getattr(self, "_listeners", {}).values()
+            for future, _ in listeners
+        ]
+        usages = [
+            Usage(name="guilds", count=len(guilds), roots=list(guilds)),
+            Usage(name="channels", count=len(channels), roots=list(channels)),
+            Usage(
+                name="members",
+                count=sum(guild.member_count or 0 for guild in guilds),
+                roots=list(members),
+            ),
+            Usage(name="users", count=len(users), roots=list(users)),
+            Usage(
+                name="user_cache", count=len(self.user_cache), roots=[self.user_cache]
+            ),
+            Usage(name="messages", count=len(messages), roots=list(messages)),
+            Usage(name="paginators", count=len(paginators), roots=list(paginators)),
+            Usage(name="waiters", count=len(waiters), roots=list(waiters)),
+            Usage(name="due_parser", count=len(due_parser), roots=[due_parser]),
+            Usage(
+                name="completions",
+                count=len(self.completions),
+                roots=[self.completions],
+            ),
+            Usage(name="write_behind", count=len(write_behind), roots=[write_behind]),
+            Usage(name="traces", count=len(tracer), roots=[tracer]),
+            Usage(
+                name="error_reports",
+                count=len(self.error_reporter),
+                roots=[self.error_reporter],
+            ),
+            Usage(name="send_queue", count=dispatcher.depth, roots=[dispatcher]),
+            Usage(name="background", count=len(background), roots=[background]),
+            Usage(name="metrics", count=len(metrics.commands), roots=[metrics]),
+        ]
+
+        if deep:
+            models: List[object] = [
+                o for o in gc.get_objects() if isinstance(o, (Task, Profile))
+            ]
+            usages.append(Usage(name="models", count=len(models), roots=models))
+            exclude = [self, self._connection, self.loop, self.http, self.db, self.tree]
+            measure(usages, exclude=exclude)
+
+        return usages
+
+    def get_log_channel(self) -> Optional[discord.TextChannel]:
+        return cast(
+            Optional[discord.TextChannel], self.get_channel(1086519345972260894)
+        )
+
+    def _send_log(self, embed: discord.Embed) -> None:
+        channel = self.get_log_channel()
+
+        if channel is None:
+            return
+
+        background.spawn(
+            BaseCog.send(channel, embed=embed, priority=Priority.LOG),
+            category="log",
+        )
+
+    async def capture_profile(self, mode: str, seconds: float) -> Capture:
+        """Profile the bot and upload the result to the log channel."""
+        capture = await profiler.capture(mode, seconds)
+        channel = self.get_log_channel()
+
+        if channel is None:
+            get_logger("Bot.capture_profile").warning(
+                f"No log channel to upload the {mode} profile to"
+            )
+            return capture
+
+        prefix = time.strftime("%Y%m%d-%H%M%S")
+        files = [
+            discord.File(io.BytesIO(data), filename=f"{prefix}-{name}")
+            for name, data in capture.files.items()
+        ]
+        await BaseCog.send(
+            channel,
+            f"**{mode}** profile of {seconds}s: {capture.summary}",
+            files=files,
+            priority=Priority.LOG,
+        )
+        return capture
+
+    def _on_profile_signal(self, mode: str) -> None:
+        logger = get_logger("Bot.on_profile_signal")
+
+        if profiler.is_busy:
+            logger.warning(f"Not starting a {mode} profile, one is already running")
+            return
+
+        logger.info(f"Capturing a {mode} profile for {PROFILE_SECONDS}s...")
+        background.spawn(
+            self.capture_profile(mode, PROFILE_SECONDS), category="profiling"
+        )
 
     async def remove_reaction(
         self,
         message: discord.Message,
         *,
         reaction: str,
-        user: discord.User,
+        user: discord.abc.Snowflake,
     ) -> None:
         try:
-            await message.remove_reaction(reaction, user)
+            await dispatcher.submit(
+                Dispatcher.channel_key(message),
+                Priority.EDIT,
+                functools.partial(message.remove_reaction, reaction, user),
+            )
         except discord.HTTPException:
             pass
+
+
+class ShardedBot(Bot, dc.AutoShardedBot):
+    """Runs `shard_ids` out of `shard_count` shards, the rest run elsewhere."""
+
+    def __init__(
+        self,
+        *,
+        loop: asyncio.AbstractEventLoop,
+        database: Database,
+        shard_ids: List[int],
+        shard_count: int,
+        runtime: Optional[RuntimeProfile] = None,
+    ) -> None:
+        super().__init__(
+            loop=loop,
+            database=database,
+            runtime=runtime,
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+        )
+
+    @property
+    def sees_every_guild(self) -> bool:
+        if self.shard_ids is None:
+            return True
+
+        return len(self.shard_ids) >= (self.shard_count or 1)
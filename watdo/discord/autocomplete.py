@@ -0,0 +1,131 @@
+import time
+import bisect
+import asyncio
+import itertools
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Tuple
+from watdo.database import Database
+from watdo.indexes import TitleIndex, stats_index
+
+
+class PrefixIndex:
+    """Sorted array of strings searchable by case-insensitive prefix."""
+
+    def __init__(self, values: Iterable[str]) -> None:
+        self._entries = sorted((v.casefold(), v) for v in set(values))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def search(self, prefix: str, *, limit: int = 25) -> List[str]:
+        prefix = prefix.casefold()
+        index = bisect.bisect_left(self._entries, (prefix, ""))
+        res: List[str] = []
+
+        for key, value in self._entries[index : index + limit]:
+            if not key.startswith(prefix):
+                break
+
+            res.append(value)
+
+        return res
+
+
+@dataclass(kw_only=True)
+class ProfileCompletions:
+    titles: PrefixIndex
+    categories: PrefixIndex
+    expires_at: float
+
+
+class CompletionsCache:
+    """Per-profile prefix indexes of task titles and categories.
+
+    Autocomplete callbacks have a few seconds to answer, so they are served
+    from memory. An entry is built from the title and stats indexes, dropped
+    whenever a task of the profile is written, and expires after `ttl`
+    seconds to catch writes made by other processes.
+    """
+
+    def __init__(
+        self, database: Database, *, ttl: float = 60, max_profiles: int = 1000
+    ) -> None:
+        self.db = database
+        self.ttl = ttl
+        self.max_profiles = max_profiles
+        self.hits = 0
+        self.misses = 0
+        self._invalidations = 0
+        self._profiles: OrderedDict[str, ProfileCompletions] = OrderedDict()
+        self._channels: OrderedDict[int, Tuple[Optional[str], float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def invalidate(self, profile_id: str) -> None:
+        self._invalidations += 1
+        self._profiles.pop(profile_id, None)
+
+    def _put(self, cache: "OrderedDict[Any, Any]", key: Any, value: Any) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+
+        while len(cache) > self.max_profiles:
+            cache.popitem(last=False)
+
+    async def _get_profile_id(self, channel_id: int) -> Optional[str]:
+        cached = self._channels.get(channel_id)
+
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+
+        profile_id = await self.db.get(f"profile:channel.{channel_id}")
+        self._put(self._channels, channel_id, (profile_id, time.monotonic() + self.ttl))
+        return profile_id
+
+    async def warm_up(self, channel_ids: Iterable[int], *, concurrency: int = 8) -> int:
+        """Cache the completions of the profiles of up to `max_profiles` channels.
+
+        Returns the number of cached profiles.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def warm_up(channel_id: int) -> None:
+            async with semaphore:
+                await self.get(channel_id)
+
+        channel_ids = itertools.islice(channel_ids, self.max_profiles)
+        await asyncio.gather(*(warm_up(c) for c in channel_ids))
+        return len(self._profiles)
+
+    async def get(self, channel_id: int) -> Optional[ProfileCompletions]:
+        profile_id = await self._get_profile_id(channel_id)
+
+        if profile_id is None:
+            return None
+
+        completions = self._profiles.get(profile_id)
+
+        if completions is not None and completions.expires_at > time.monotonic():
+            self.hits += 1
+            self._profiles.move_to_end(profile_id)
+            return completions
+
+        self.misses += 1
+        invalidations = self._invalidations
+        titles, categories = await asyncio.gather(
+            self.db.hkeys(TitleIndex.key(profile_id)),
+            stats_index.get_categories(self.db, profile_id),
+        )
+        completions = ProfileCompletions(
+            titles=PrefixIndex(titles),
+            categories=PrefixIndex(categories),
+            expires_at=time.monotonic() + self.ttl,
+        )
+
+        # Don't cache what may have been read before a concurrent write
+        if invalidations == self._invalidations:
+            self._put(self._profiles, profile_id, completions)
+
+        return completions
@@ -1,10 +1,13 @@
 import time
 import asyncio
+import functools
 from uuid import uuid4
 from dataclasses import dataclass
 from typing import (
     TYPE_CHECKING,
     Sequence,
+    Iterable,
+    Iterator,
     Any,
     List,
     Optional,
@@ -14,12 +17,16 @@ from typing import (
     Mapping,
 )
 import discord
+from discord import app_commands
 from discord.ext import commands as dc
 from watdo.models import Profile, Task, ScheduledTask
 from watdo.errors import CancelCommand
 from watdo.database import Database
+from watdo.indexes import search_index
+from watdo.background import background
 from watdo.safe_data import UTCOffset
 from watdo.discord.embeds import ProfileEmbed
+from watdo.discord.dispatch import Priority, Dispatcher, dispatcher
 
 if TYPE_CHECKING:
     from watdo.discord import Bot
@@ -42,27 +49,70 @@ class BaseCog(dc.Cog):
         messageable: discord.abc.Messageable,
         content: Any = None,
         *args: Any,
+        priority: Priority = Priority.COMMAND,
         **kwargs: Any,
     ) -> discord.Message:
-        if content is None:
-            return await messageable.send(*args, **kwargs)
+        if content is not None:
+            args = (str(content)[:2000], *args)
 
-        return await messageable.send(str(content)[:2000], *args, **kwargs)
+        return await dispatcher.submit(
+            Dispatcher.channel_key(messageable),
+            priority,
+            functools.partial(messageable.send, *args, **kwargs),
+        )
 
     async def task_from_title(self, ctx: dc.Context["Bot"], title: str) -> Task:
         profile = await self.get_profile(ctx)
         task = await Task.from_title(self.db, profile, title=title)
 
         if task is None:
-            await self.send(ctx, f'Task "{title}" not found ❌')
+            await self.send(ctx, await self.task_not_found_message(profile, title))
             raise CancelCommand()
 
         return task
 
-    @staticmethod
-    def tasks_to_text(tasks: Sequence[Task], *, no_category: bool = False) -> str:
-        res = []
+    async def task_not_found_message(self, profile: Profile, title: str) -> str:
+        message = f'Task "{title}" not found ❌'
+        tasks = await search_index.fuzzy_titles(self.db, profile, title)
+
+        if tasks:
+            titles = ", ".join(f'"{t.title.value}"' for t in tasks)
+            message += f"\nDid you mean {titles}?"
+
+        return message
+
+    async def autocomplete_titles(
+        self, interaction: discord.Interaction, current: str
+    ) -> List[app_commands.Choice[str]]:
+        completions = await self.bot.completions.get(interaction.channel_id or 0)
+
+        if completions is None:
+            return []
+
+        return [
+            app_commands.Choice(name=title, value=title)
+            for title in completions.titles.search(current)
+            if len(title) <= 100
+        ]
+
+    async def autocomplete_categories(
+        self, interaction: discord.Interaction, current: str
+    ) -> List[app_commands.Choice[str]]:
+        completions = await self.bot.completions.get(interaction.channel_id or 0)
+
+        if completions is None:
+            return []
 
+        return [
+            app_commands.Choice(name=category, value=category)
+            for category in completions.categories.search(current)
+            if category
+        ]
+
+    @staticmethod
+    def iter_tasks_text(
+        tasks: Iterable[Task], *, no_category: bool = False
+    ) -> Iterator[str]:
         for i, t in enumerate(tasks):
             task_type = "📝"
             status = ""
@@ -82,13 +132,57 @@ class BaseCog(dc.Cog):
                 f"{status}{'📌 ' if t.importance.value else ''}"
                 f'{task_type}{"" if no_category else f" [{t.category.value}]"}'
             )
-            res.append(f"{i + 1}. {p} {t.title.value}")
+            yield f"{i + 1}. {p} {t.title.value}"
+
+    @staticmethod
+    def chunk_lines(lines: Iterable[str], *, limit: int = 2000) -> Iterator[str]:
+        """Group lines into chunks of at most `limit` characters.
+
+        Lines are never split unless a single line is longer than `limit`.
+        """
+        chunk: List[str] = []
+        size = 0
+
+        for line in lines:
+            while len(line) > limit:
+                if chunk:
+                    yield "\n".join(chunk)
+                    chunk, size = [], 0
+
+                yield line[:limit]
+                line = line[limit:]
 
-        return "\n".join(res)
+            added = len(line) + (1 if chunk else 0)
+
+            if size + added > limit:
+                yield "\n".join(chunk)
+                chunk, size, added = [], 0, len(line)
+
+            chunk.append(line)
+            size += added
+
+        if chunk:
+            yield "\n".join(chunk)
+
+    @staticmethod
+    async def send_chunks(
+        messageable: discord.abc.Messageable,
+        chunks: Iterable[str],
+        *,
+        empty_message: str,
+    ) -> None:
+        is_empty = True
+
+        for chunk in chunks:
+            is_empty = False
+            await BaseCog.send(messageable, chunk)
+
+        if is_empty:
+            await BaseCog.send(messageable, empty_message)
 
     @staticmethod
     def parse_params_list(
-        command: dc.Command[Any, Any, Any]
+        command: dc.Command[Any, Any, Any],
     ) -> List[ParsedCommandParam]:
         params = []
 
@@ -134,13 +228,17 @@ class BaseCog(dc.Cog):
         params = [p.value for p in BaseCog.parse_params_list(command)]
         return " ".join(params)
 
-    async def add_reactions(
-        self, message: discord.Message, emojis: Sequence[str]
-    ) -> None:
+    @staticmethod
+    async def add_reactions(message: discord.Message, emojis: Sequence[str]) -> None:
         tasks = []
+        key = Dispatcher.channel_key(message)
 
         for emoji in emojis:
-            tasks.append(message.add_reaction(emoji))
+            tasks.append(
+                dispatcher.submit(
+                    key, Priority.EDIT, functools.partial(message.add_reaction, emoji)
+                )
+            )
 
         await asyncio.gather(*tasks)
 
@@ -160,7 +258,7 @@ class BaseCog(dc.Cog):
             choices.append(f"- {emoji}   {text}")
 
         c = "\n".join(choices)
-        self.bot.loop.create_task(message.edit(content=f"{message.content}\n{c}"))
+        self.bot.edit_coalescer.edit(message, content=f"{message.content}\n{c}")
 
     async def wait_for_choice(
         self,
@@ -172,22 +270,22 @@ class BaseCog(dc.Cog):
     ) -> str:
         emojis = tuple(mapping.keys())
 
-        def check(reaction: discord.Reaction, user: discord.User) -> bool:
-            if user.id == ctx.author.id:
-                if reaction.message.id == message.id:
-                    if str(reaction) in emojis:
+        def check(payload: discord.RawReactionActionEvent) -> bool:
+            if payload.user_id == ctx.author.id:
+                if payload.message_id == message.id:
+                    if str(payload.emoji) in emojis:
                         return True
 
             return False
 
         self._edit_choices(message, mapping)
-        self.bot.loop.create_task(self.add_reactions(message, emojis))
+        background.spawn(self.add_reactions(message, emojis), category="discord")
 
         try:
-            reaction, user = await self.bot.wait_for(
-                "reaction_add", check=check, timeout=60
+            payload = await self.bot.wait_for(
+                "raw_reaction_add", check=check, timeout=60
             )
-            reaction = str(reaction)
+            reaction = str(payload.emoji)
             self._edit_choices(message, mapping, choice=reaction)
             return reaction
         except asyncio.TimeoutError:
@@ -199,21 +297,21 @@ class BaseCog(dc.Cog):
     ) -> bool:
         buttons = ("✅", "❌")
 
-        def check(reaction: discord.Reaction, user: discord.User) -> bool:
-            if user.id == ctx.author.id:
-                if reaction.message.id == message.id:
-                    if str(reaction) in buttons:
+        def check(payload: discord.RawReactionActionEvent) -> bool:
+            if payload.user_id == ctx.author.id:
+                if payload.message_id == message.id:
+                    if str(payload.emoji) in buttons:
                         return True
 
             return False
 
-        self.bot.loop.create_task(self.add_reactions(message, buttons))
+        background.spawn(self.add_reactions(message, buttons), category="discord")
 
         try:
-            reaction, user = await self.bot.wait_for(
-                "reaction_add", check=check, timeout=60
+            payload = await self.bot.wait_for(
+                "raw_reaction_add", check=check, timeout=60
             )
-            reaction = str(reaction)
+            reaction = str(payload.emoji)
         except asyncio.TimeoutError:
             return False
 
@@ -333,8 +431,10 @@ class BaseCog(dc.Cog):
                 created_by=ctx.author.id,
                 channel_id=ctx.channel.id,
             )
-            self.bot.loop.create_task(profile.save())
-            self.bot.loop.create_task(profile.add_channel(ctx.channel.id))
+            await background.submit(profile.save(), category="database")
+            await background.submit(
+                profile.add_channel(ctx.channel.id), category="database"
+            )
             await BaseCog.send(
                 ctx, "New profile created ✅", embed=ProfileEmbed(self.bot, profile)
             )
@@ -0,0 +1,113 @@
+from typing import Iterator, Optional, Tuple
+from discord.ext import commands as dc
+from watdo.metrics import Histogram, metrics, process_rss
+from watdo.memory import format_usages
+from watdo.due_parser import due_parser
+from watdo.profiling import profiler
+from watdo.discord import Bot
+from watdo.discord.cogs import BaseCog
+from watdo.discord.embeds import iter_fields_embeds
+
+
+def _hit_ratio(hits: int, misses: int) -> str:
+    total = hits + misses
+
+    if not total:
+        return "no lookups"
+
+    return f"{hits / total:.0%} of {total}"
+
+
+def _quantiles(histogram: Histogram, *, unit: str = "s", scale: float = 1) -> str:
+    def s(seconds: Optional[float]) -> str:
+        return "-" if seconds is None else f"{seconds * scale:.1f}{unit}"
+
+    return (
+        f"p50 {s(histogram.quantile(0.5))}, p95 {s(histogram.quantile(0.95))}, "
+        f"p99 {s(histogram.quantile(0.99))}"
+    )
+
+
+class Admin(BaseCog, description="Commands for the owner of the bot."):
+    def iter_stats_fields(self) -> Iterator[Tuple[str, str]]:
+        for chunk in self.chunk_lines(metrics.command_rows(), limit=1000):
+            yield "Commands (ms)", f"```\n{chunk}\n```"
+
+        yield "Redis", (
+            f"{metrics.redis.rate():.1f} calls/s in the last minute, "
+            f"{metrics.redis.total} in total"
+        )
+        yield "Caches", (
+            f"Due parser: {_hit_ratio(due_parser.hits, due_parser.misses)}\n"
+            "Completions: "
+            f"{_hit_ratio(self.bot.completions.hits, self.bot.completions.misses)}"
+        )
+        yield "Reminder lag", (
+            f"{_quantiles(metrics.reminder_lag)} "
+            f"({metrics.reminder_lag.count} reminder(s))"
+        )
+        yield "Event loop lag", (
+            f"{_quantiles(metrics.loop_lag, unit='ms', scale=1000)}, "
+            f"blocked {metrics.loop_stalls} time(s)"
+        )
+        yield "Services", f"```\n{self.bot.services.report()}\n```"
+        yield self.memory_field(deep=False)
+
+    def memory_field(self, *, deep: bool) -> Tuple[str, str]:
+        rss = process_rss()
+        memory = "\n".join(format_usages(self.bot.memory_usage(deep=deep)))
+        return (
+            "Memory" if rss is None else f"Memory ({rss / 1024 / 1024:.0f}MiB RSS)",
+            f"```\n{memory}\n```",
+        )
+
+    @dc.command(hidden=True)
+    @dc.is_owner()
+    async def stats(self, ctx: dc.Context[Bot], section: Optional[str] = None) -> None:
+        """Show latencies, Redis load, cache hit ratios, reminder lag and memory.
+
+        `stats memory` shows the memory with the size of every subsystem
+        instead, estimated by walking the heap, which blocks the bot a while.
+        """
+        if section not in (None, "memory"):
+            await BaseCog.send(ctx, "Section should be `memory` or nothing ❌")
+            return
+
+        if section == "memory":
+            fields = iter([self.memory_field(deep=True)])
+        else:
+            fields = self.iter_stats_fields()
+
+        for embed in iter_fields_embeds(self.bot, "STATS", fields):
+            await BaseCog.send(ctx, embed=embed)
+
+    @dc.command(hidden=True)
+    @dc.is_owner()
+    async def profile(
+        self, ctx: dc.Context[Bot], mode: str = "sample", seconds: float = 10
+    ) -> None:
+        """Profile the bot for a while and upload the result to the log channel.
+
+        Modes are `cpu` for cProfile, `sample` for stack sampling and `memory`
+        for tracemalloc.
+        """
+        if mode not in profiler.modes:
+            modes = ", ".join(f"`{m}`" for m in profiler.modes)
+            await BaseCog.send(ctx, f"Mode should be one of {modes} ❌")
+            return
+
+        if not 0 < seconds <= 300:
+            await BaseCog.send(ctx, "Profile for 300 seconds at most ❌")
+            return
+
+        if profiler.is_busy:
+            await BaseCog.send(ctx, "A profile is already running ❌")
+            return
+
+        await BaseCog.send(ctx, f"Capturing a **{mode}** profile for {seconds}s...")
+        capture = await self.bot.capture_profile(mode, seconds)
+        await BaseCog.send(ctx, f"{capture.summary}, uploaded to the log channel ✅")
+
+
+async def setup(bot: Bot) -> None:
+    await bot.add_cog(Admin(bot, bot.db))
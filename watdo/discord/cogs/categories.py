@@ -1,9 +1,11 @@
-from collections import defaultdict
+import asyncio
+from typing import Iterator, Tuple
 from discord.ext import commands as dc
 from watdo.models import Task
+from watdo.indexes import stats_index
 from watdo.discord import Bot
 from watdo.discord.cogs import BaseCog
-from watdo.discord.embeds import Embed
+from watdo.discord.embeds import iter_fields_embeds
 
 
 class Categories(BaseCog):
@@ -13,22 +15,23 @@ class Categories(BaseCog):
     async def clist(self, ctx: dc.Context[Bot]) -> None:
         """Show your tasks by category."""
         profile = await self.get_profile(ctx)
-        tasks_coll = await Task.get_tasks_of_profile(self.db, profile)
-        categories = defaultdict(list)
+        stats = await stats_index.get(self.db, profile)
+        categories = await asyncio.gather(
+            *(
+                Task.get_tasks_of_profile(self.db, profile, category=category)
+                for category in stats.categories
+            )
+        )
 
-        for task in tasks_coll:
-            categories[task.category.value].append(task)
+        def fields() -> Iterator[Tuple[str, str]]:
+            for category, tasks in zip(stats.categories, categories):
+                lines = self.iter_tasks_text(tasks, no_category=True)
 
-        embed = Embed(self.bot, "TASKS")
+                for index, chunk in enumerate(self.chunk_lines(lines, limit=1024)):
+                    yield (category if index == 0 else f"{category} (cont.)", chunk)
 
-        for category, tasks in categories.items():
-            embed.add_field(
-                name=category,
-                value=self.tasks_to_text(tasks, no_category=True)[:1024],
-                inline=False,
-            )
-
-        await BaseCog.send(ctx, embed=embed)
+        for embed in iter_fields_embeds(self.bot, "TASKS", fields()):
+            await BaseCog.send(ctx, embed=embed)
 
     @dc.hybrid_command(aliases=["rc"])  # type: ignore[arg-type]
     async def rename_category(
@@ -37,39 +40,35 @@ class Categories(BaseCog):
         """Rename a category."""
         new_name = new_name.strip()
         profile = await self.get_profile(ctx)
-        tasks = await Task.get_tasks_of_profile(self.db, profile, category=old_name)
+        tasks = await Task.rename_category(self.db, profile, old_name, new_name)
 
         if len(tasks) == 0:
             await BaseCog.send(ctx, f'Category "{old_name}" not found ❌')
             return
 
-        for task in tasks:
-            task.category.set(new_name)
-            self.bot.loop.create_task(task.save())
-
         await BaseCog.send(
-            ctx, f'Category "{old_name}" has been renamed to "{new_name}" ✅'
+            ctx,
+            f'Category "{old_name}" has been renamed to "{new_name}" ✅ '
+            f"({len(tasks)} task(s))",
         )
 
-    async def _delete_category_task(
-        self, ctx: dc.Context[Bot], uid: str, task: Task
-    ) -> None:
-        await task.delete()
-        await BaseCog.send(ctx, f'Task "{task.title.value}" has been removed ✅')
-
     @dc.hybrid_command(aliases=["dc"])  # type: ignore[arg-type]
     async def delete_category(self, ctx: dc.Context[Bot], name: str) -> None:
         """Delete a category."""
-        uid = str(ctx.author.id)
         profile = await self.get_profile(ctx)
-        tasks = await Task.get_tasks_of_profile(self.db, profile, category=name)
+        tasks = await Task.delete_category(self.db, profile, name)
 
         if len(tasks) == 0:
             await BaseCog.send(ctx, f'Category "{name}" not found ❌')
             return
 
-        for task in tasks:
-            self.bot.loop.create_task(self._delete_category_task(ctx, uid, task))
+        await BaseCog.send(
+            ctx,
+            f'Category "{name}" has been deleted ✅ ({len(tasks)} task(s) removed)',
+        )
+
+    rename_category.autocomplete("old_name")(BaseCog.autocomplete_categories)
+    delete_category.autocomplete("name")(BaseCog.autocomplete_categories)
 
 
 async def setup(bot: Bot) -> None:
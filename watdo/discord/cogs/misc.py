@@ -10,7 +10,7 @@ class Miscellaneous(BaseCog):
         embed = Embed(self.bot, "Command Help")
         command = self.bot.get_command(command_name)
 
-        if command is None:
+        if command is None or command.hidden:
             await BaseCog.send(ctx, f'Command "{command_name}" not found ❌')
             return
 
@@ -43,7 +43,7 @@ class Miscellaneous(BaseCog):
         )
 
         for cog in self.bot.cogs.values():
-            commands = cog.get_commands()
+            commands = [c for c in cog.get_commands() if not c.hidden]
 
             if not commands:
                 continue
@@ -1,15 +1,16 @@
 import time
 from uuid import uuid4
-from typing import Dict, Optional, Tuple, Sequence, Callable, Awaitable
-import recurrent
-import dateparser
+from typing import Optional, Tuple, Sequence, Callable, Awaitable
 import discord
 from discord.ext import commands as dc
-from watdo import dt
-from watdo.errors import CancelCommand
+from watdo.errors import CancelCommand, TitleTaken
 from watdo.models import Profile, Task, ScheduledTask, DueT
 from watdo.safe_data import Timestamp
 from watdo.collections import TasksCollection
+from watdo.indexes import stats_index, search_index
+from watdo.due_parser import Due, due_parser
+from watdo.background import background
+from watdo.tracing import tracer
 from watdo.discord import Bot
 from watdo.discord.cogs import BaseCog
 from watdo.discord.embeds import Embed, TaskEmbed, PagedEmbed
@@ -20,55 +21,20 @@ class Tasks(BaseCog):
     async def summary(self, ctx: dc.Context[Bot]) -> None:
         """Show the summary of all your tasks."""
         profile = await self.get_profile(ctx)
-        tasks = await Task.get_tasks_of_profile(self.db, profile)
+        stats = await stats_index.get(self.db, profile)
 
         embed = Embed(self.bot, "TASKS SUMMARY")
-
-        total = 0
-        is_important = 0
-        overdue = 0
-        recurring = 0
-        one_time = 0
-        done = 0
-        max_categ_len = 0
-        categories: Dict[str, int] = {}
-
-        for task in tasks:
-            total += 1
-
-            if task.importance.value:
-                is_important += 1
-
-            if isinstance(task, ScheduledTask):
-                if task.is_overdue:
-                    overdue += 1
-
-            if isinstance(task, ScheduledTask) and task.is_recurring:
-                recurring += 1
-            else:
-                one_time += 1
-
-            if task.is_done:
-                done += 1
-
-            if len(task.category.value) > max_categ_len:
-                max_categ_len = len(task.category.value)
-
-            try:
-                categories[task.category.value] += 1
-            except KeyError:
-                categories[task.category.value] = 1
-
-        embed.add_field(name="Total", value=total)
-        embed.add_field(name="Important", value=is_important)
-        embed.add_field(name="Overdue", value=overdue)
-        embed.add_field(name="Recurring", value=recurring)
-        embed.add_field(name="One-Time", value=one_time)
-        embed.add_field(name="Done", value=done)
-
-        if categories:
+        embed.add_field(name="Total", value=stats.total)
+        embed.add_field(name="Important", value=stats.important)
+        embed.add_field(name="Overdue", value=stats.overdue)
+        embed.add_field(name="Recurring", value=stats.recurring)
+        embed.add_field(name="One-Time", value=stats.one_time)
+        embed.add_field(name="Done", value=stats.done)
+
+        if stats.categories:
+            max_categ_len = max(len(k) for k in stats.categories)
             c = "\n".join(
-                f"{k.ljust(max_categ_len)}  {v}" for k, v in categories.items()
+                f"{k.ljust(max_categ_len)}  {v}" for k, v in stats.categories.items()
             )
             embed.add_field(
                 name="Categories", value=f"```\n{c[:1000]}\n```", inline=False
@@ -85,19 +51,23 @@ class Tasks(BaseCog):
         is_simple: bool = False,
     ) -> None:
         async def embeds_getter() -> Tuple[discord.Embed, ...]:
-            return tuple(
-                TaskEmbed(self.bot, task, is_simple=is_simple)
-                for task in await tasks_getter()
-            )
+            tasks = await tasks_getter()
+
+            if not is_simple:
+                await self.bot.resolve_users(t.created_by.value for t in tasks)
+
+            with tracer.span("render", count=len(tasks)):
+                return tuple(
+                    TaskEmbed(self.bot, task, is_simple=is_simple) for task in tasks
+                )
 
         if as_text:
             tasks = await tasks_getter()
 
-            if not tasks:
-                await BaseCog.send(ctx, "No tasks.")
-                return
+            with tracer.span("render", count=len(tasks)):
+                chunks = list(self.chunk_lines(self.iter_tasks_text(tasks)))
 
-            await BaseCog.send(ctx, self.tasks_to_text(tasks))
+            await self.send_chunks(ctx, chunks, empty_message="No tasks.")
             return
 
         paged_embed = PagedEmbed(ctx, embeds_getter)
@@ -122,37 +92,81 @@ class Tasks(BaseCog):
         profile = await self.get_profile(ctx)
         await self._send_tasks(ctx, tasks_getter, as_text=as_text)
 
-    def _parse_due(self, ctx: dc.Context[Bot], due: str, utc_offset: float) -> DueT:
-        tz = dt.utc_offset_to_tz(utc_offset)
-        date = dateparser.parse(
-            due,
-            settings={
-                "RETURN_AS_TIMEZONE_AWARE": True,
-                "TIMEZONE": tz.tzname(dt.date_now(utc_offset)) or "",
-            },
-        )
+    @dc.hybrid_command()  # type: ignore[arg-type]
+    async def search(
+        self,
+        ctx: dc.Context[Bot],
+        query: str,
+        as_text: bool = False,
+    ) -> None:
+        """Search your tasks by title, category and description."""
 
-        if date is not None:
-            return date.timestamp()  # type: ignore[return-value]
+        async def tasks_getter() -> Sequence[Task]:
+            return await search_index.search(self.db, profile, query)
 
-        rr: Optional[str | dt.datetime] = recurrent.parse(
-            due,
-            now=dt.date_now(utc_offset),
-        )
+        profile = await self.get_profile(ctx)
+        await self._send_tasks(ctx, tasks_getter, as_text=as_text)
 
-        if isinstance(rr, str):
-            if "DTSTART:" not in rr:
-                date_now = dt.date_now(utc_offset)
-                d = date_now.strftime("%Y%m%dT%H%M%S")
-                rr = f"DTSTART:{d}\n{rr}"
+    async def _parse_due(
+        self, ctx: dc.Context[Bot], due: str, utc_offset: float
+    ) -> Due:
+        res = await due_parser.parse(due, utc_offset)
 
-            return rr  # type: ignore[return-value]
+        if res is None:
+            background.spawn(
+                BaseCog.send(ctx, f"Failed to parse `{due}`"), category="discord"
+            )
+            raise CancelCommand()
+
+        return res
+
+    @staticmethod
+    def _scheduled(
+        task: Task, due: DueT, *, has_reminder: bool, is_auto_done: bool
+    ) -> ScheduledTask[DueT]:
+        return ScheduledTask(
+            task.db,
+            profile=task.profile,
+            profile_id=task.profile_id.value,
+            last_done=task.last_done.value if task.last_done else None,
+            uuid=task.uuid.value,
+            created_at=task.created_at.value,
+            created_by=task.created_by.value,
+            channel_id=task.channel_id.value,
+            title=task.title.value,
+            category=task.category.value,
+            importance=task.importance.value,
+            energy=task.energy.value,
+            description=task.description.value if task.description else None,
+            due=due,
+            has_reminder=has_reminder,
+            is_auto_done=is_auto_done,
+        )
 
-        if isinstance(rr, dt.datetime_type):
-            return rr.timestamp()  # type: ignore[return-value]
+    async def _schedule(
+        self,
+        ctx: dc.Context[Bot],
+        task: Task,
+        due: str,
+        *,
+        has_reminder: bool,
+        is_auto_done: bool,
+    ) -> ScheduledTask[str] | ScheduledTask[float]:
+        """Make `task` due at the parsed `due`."""
+        res = await self._parse_due(ctx, due, task.profile.utc_offset.value)
+        scheduled: ScheduledTask[str] | ScheduledTask[float]
+
+        if isinstance(res, str):
+            scheduled = self._scheduled(
+                task, res, has_reminder=has_reminder, is_auto_done=is_auto_done
+            )
+        else:
+            scheduled = self._scheduled(
+                task, res, has_reminder=has_reminder, is_auto_done=is_auto_done
+            )
 
-        self.bot.loop.create_task(BaseCog.send(ctx, f"Failed to parse `{due}`"))
-        raise CancelCommand()
+        scheduled.next_reminder = Timestamp(scheduled.due_date.timestamp())
+        return scheduled
 
     async def _update_task(
         self,
@@ -169,54 +183,36 @@ class Tasks(BaseCog):
         has_reminder: bool,
         is_auto_done: bool,
     ) -> None:
-        if due is None:
-            task = Task(
-                # Copy from existing task
-                existing_task.db,
-                profile=existing_task.profile,
-                profile_id=existing_task.profile_id.value,
-                last_done=existing_task.last_done.value
-                if existing_task.last_done
-                else None,
-                uuid=existing_task.uuid.value,
-                created_at=existing_task.created_at.value,
-                created_by=existing_task.created_by.value,
-                channel_id=ctx.channel.id,
-                #
-                # From user input
-                title=title,
-                category=category,
-                importance=importance,
-                energy=energy,
-                description=description,
-            )
-        else:
-            task = ScheduledTask(
-                # Copy from existing task
-                existing_task.db,
-                profile=existing_task.profile,
-                profile_id=existing_task.profile_id.value,
-                last_done=existing_task.last_done.value
-                if existing_task.last_done
-                else None,
-                uuid=existing_task.uuid.value,
-                created_at=existing_task.created_at.value,
-                created_by=existing_task.created_by.value,
-                channel_id=ctx.channel.id,
-                #
-                # From user input
-                title=title,
-                category=category,
-                importance=importance,
-                energy=energy,
-                due=self._parse_due(ctx, due, profile.utc_offset.value),
-                description=description,
+        task = Task(
+            # Copy from existing task
+            existing_task.db,
+            profile=existing_task.profile,
+            profile_id=existing_task.profile_id.value,
+            last_done=existing_task.last_done.value
+            if existing_task.last_done
+            else None,
+            uuid=existing_task.uuid.value,
+            created_at=existing_task.created_at.value,
+            created_by=existing_task.created_by.value,
+            channel_id=ctx.channel.id,
+            #
+            # From user input
+            title=title,
+            category=category,
+            importance=importance,
+            energy=energy,
+            description=description,
+        )
+
+        if due is not None:
+            task = await self._schedule(
+                ctx,
+                task,
+                due,
                 has_reminder=has_reminder,
                 is_auto_done=is_auto_done,
             )
 
-            task.next_reminder = Timestamp(task.due_date.timestamp())
-
         await task.save()
         await BaseCog.send(ctx, "Task updated ✅", embed=TaskEmbed(self.bot, task))
 
@@ -234,50 +230,39 @@ class Tasks(BaseCog):
         has_reminder: bool,
         is_auto_done: bool,
     ) -> None:
-        if due is None:
-            task = Task(
-                self.db,
-                profile=profile,
-                profile_id=profile.uuid.value,
-                last_done=None,
-                uuid=uuid4().hex,
-                created_at=time.time(),
-                created_by=ctx.author.id,
-                channel_id=ctx.channel.id,
-                #
-                # From user input
-                title=title,
-                category=category,
-                importance=importance,
-                energy=energy,
-                description=description,
-            )
-        else:
-            task = ScheduledTask(
-                self.db,
-                profile=profile,
-                profile_id=profile.uuid.value,
-                last_done=None,
-                uuid=uuid4().hex,
-                created_at=time.time(),
-                created_by=ctx.author.id,
-                channel_id=ctx.channel.id,
-                #
-                # From user input
-                title=title,
-                category=category,
-                importance=importance,
-                energy=energy,
-                due=self._parse_due(ctx, due, profile.utc_offset.value),
-                description=description,
+        task = Task(
+            self.db,
+            profile=profile,
+            profile_id=profile.uuid.value,
+            last_done=None,
+            uuid=uuid4().hex,
+            created_at=time.time(),
+            created_by=ctx.author.id,
+            channel_id=ctx.channel.id,
+            #
+            # From user input
+            title=title,
+            category=category,
+            importance=importance,
+            energy=energy,
+            description=description,
+        )
+
+        if due is not None:
+            task = await self._schedule(
+                ctx,
+                task,
+                due,
                 has_reminder=has_reminder,
                 is_auto_done=is_auto_done,
             )
 
-            task.next_reminder = Timestamp(task.due_date.timestamp())
-
-        await task.save()
-        await BaseCog.send(ctx, "Task added ✅", embed=TaskEmbed(self.bot, task))
+        try:
+            await task.save()
+        except TitleTaken as error:
+            await BaseCog.send(ctx, f"{error} ❌")
+        else:
+            await BaseCog.send(ctx, "Task added ✅", embed=TaskEmbed(self.bot, task))
 
     @dc.hybrid_command()  # type: ignore[arg-type]
     async def todo(
@@ -386,7 +371,7 @@ class Tasks(BaseCog):
         task = await Task.from_title(self.db, profile, title=title)
 
         if task is None:
-            await BaseCog.send(ctx, f'Task "{title}" not found ❌')
+            await BaseCog.send(ctx, await self.task_not_found_message(profile, title))
             return None, None
 
         message = await BaseCog.send(
@@ -432,6 +417,13 @@ class Tasks(BaseCog):
         description = task.description.escaped if task.description else " "
         await BaseCog.send(ctx, f"```\n{description}\n```")
 
+    list.autocomplete("category")(BaseCog.autocomplete_categories)
+    do_priority.autocomplete("category")(BaseCog.autocomplete_categories)
+    do_dailies.autocomplete("category")(BaseCog.autocomplete_categories)
+    done.autocomplete("title")(BaseCog.autocomplete_titles)
+    cancel.autocomplete("title")(BaseCog.autocomplete_titles)
+    showdesc.autocomplete("title")(BaseCog.autocomplete_titles)
+
 
 async def setup(bot: Bot) -> None:
     await bot.add_cog(Tasks(bot, bot.db))
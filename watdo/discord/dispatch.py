@@ -0,0 +1,143 @@
+import time
+import heapq
+import asyncio
+import itertools
+from enum import IntEnum
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_Job = Tuple[
+    "Priority",
+    int,
+    float,
+    Callable[[], Awaitable[Any]],
+    "asyncio.Future[Any]",
+]
+
+
+class Priority(IntEnum):
+    """Outbound request classes, lower value is served first."""
+
+    REMINDER = 0
+    COMMAND = 1
+    LOG = 2
+    EDIT = 3
+
+
+@dataclass(kw_only=True)
+class PriorityMetrics:
+    submitted: int = 0
+    sent: int = 0
+    failed: int = 0
+    total_wait: float = 0
+    max_wait: float = 0
+
+    @property
+    def average_wait(self) -> float:
+        done = self.sent + self.failed
+
+        if done == 0:
+            return 0
+
+        return self.total_wait / done
+
+
+class Dispatcher:
+    """Per-channel priority queues for outbound Discord requests.
+
+    Each channel runs at most `concurrency` requests at a time. When a
+    channel is rate limited the requests waiting behind it are picked by
+    priority instead of arrival order, so reminders never wait behind
+    paginator edits.
+    """
+
+    def __init__(self, *, concurrency: int = 2) -> None:
+        self.concurrency = concurrency
+        self.metrics = {priority: PriorityMetrics() for priority in Priority}
+        self._queues: Dict[int, List[_Job]] = {}
+        self._active: Dict[int, int] = {}
+        self._counter = itertools.count()
+
+    @staticmethod
+    def channel_key(messageable: Any) -> int:
+        channel = getattr(messageable, "channel", messageable)
+        return int(getattr(channel, "id", id(channel)))
+
+    @property
+    def depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def depth_by_priority(self) -> Dict[Priority, int]:
+        res = {priority: 0 for priority in Priority}
+
+        for queue in self._queues.values():
+            for job in queue:
+                res[job[0]] += 1
+
+        return res
+
+    async def submit(
+        self,
+        key: int,
+        priority: Priority,
+        func: Callable[[], Awaitable[T]],
+    ) -> T:
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        job: _Job = (priority, next(self._counter), time.perf_counter(), func, future)
+
+        heapq.heappush(self._queues.setdefault(key, []), job)
+        self.metrics[priority].submitted += 1
+        self._pump(key)
+
+        return await future
+
+    def _pump(self, key: int) -> None:
+        queue = self._queues.get(key)
+
+        while queue and self._active.get(key, 0) < self.concurrency:
+            job = heapq.heappop(queue)
+            self._active[key] = self._active.get(key, 0) + 1
+            asyncio.get_running_loop().create_task(self._run(key, job))
+
+        if not queue and not self._active.get(key):
+            self._queues.pop(key, None)
+            self._active.pop(key, None)
+
+    async def _run(self, key: int, job: _Job) -> None:
+        priority, _, queued_at, func, future = job
+        metrics = self.metrics[priority]
+        wait = time.perf_counter() - queued_at
+
+        metrics.total_wait += wait
+        metrics.max_wait = max(metrics.max_wait, wait)
+
+        try:
+            if future.done():
+                # The submitter gave up while waiting in the queue
+                metrics.failed += 1
+                return
+
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                metrics.failed += 1
+                future.cancel()
+                raise
+            except Exception as error:
+                metrics.failed += 1
+
+                if not future.done():
+                    future.set_exception(error)
+            else:
+                metrics.sent += 1
+
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._active[key] -= 1
+            self._pump(key)
+
+
+dispatcher = Dispatcher()
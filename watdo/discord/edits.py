@@ -0,0 +1,47 @@
+import asyncio
+import functools
+from typing import Any, Dict
+import discord
+from watdo.logging import get_logger
+from watdo.discord.dispatch import Priority, Dispatcher, dispatcher
+
+
+class EditCoalescer:
+    """Serializes edits per message, keeping only the latest pending one.
+
+    While an edit of a message is in flight, newer edits overwrite each
+    other and only the last one gets sent once the previous edit completes.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.coalesced_count = 0
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._workers: Dict[int, asyncio.Task[None]] = {}
+
+    def edit(self, message: discord.Message, **kwargs: Any) -> None:
+        if message.id in self._pending:
+            self.coalesced_count += 1
+
+        self._pending[message.id] = kwargs
+
+        if message.id not in self._workers:
+            self._workers[message.id] = self.loop.create_task(self._flush(message))
+
+    async def _flush(self, message: discord.Message) -> None:
+        try:
+            while (kwargs := self._pending.pop(message.id, None)) is not None:
+                try:
+                    await dispatcher.submit(
+                        Dispatcher.channel_key(message),
+                        Priority.EDIT,
+                        functools.partial(message.edit, **kwargs),
+                    )
+                except discord.NotFound:
+                    self._pending.pop(message.id, None)
+                except discord.HTTPException as error:
+                    get_logger("EditCoalescer").warning(
+                        f"Failed to edit message {message.id}: {error}"
+                    )
+        finally:
+            del self._workers[message.id]
@@ -1,14 +1,27 @@
 import math
 import logging
 import asyncio
-from typing import TYPE_CHECKING, cast, Any, Tuple, Callable, Awaitable
+from typing import (
+    TYPE_CHECKING,
+    cast,
+    Any,
+    Tuple,
+    Callable,
+    Awaitable,
+    Iterable,
+    Iterator,
+    Sequence,
+    Set,
+)
 import discord
 from discord.ext import commands as dc
 from watdo import dt
 from watdo.models import Profile, Task, ScheduledTask
+from watdo.background import background
 
 if TYPE_CHECKING:
     from watdo.discord import Bot
+    from watdo.discord.error_reports import ErrorGroup
 
 
 class Embed(discord.Embed):
@@ -19,6 +32,27 @@ class Embed(discord.Embed):
         super().__init__(title=title, **kwargs)
 
 
+def iter_fields_embeds(
+    bot: "Bot", title: str, fields: Iterable[Tuple[str, str]]
+) -> Iterator[Embed]:
+    """Spread fields over as many embeds as needed to fit Discord's limits."""
+    embed = Embed(bot, title)
+    size = len(title)
+
+    for name, value in fields:
+        field_size = len(name) + len(value)
+
+        if len(embed.fields) == 25 or size + field_size > 6000:
+            yield embed
+            embed = Embed(bot, title)
+            size = len(title)
+
+        embed.add_field(name=name, value=value, inline=False)
+        size += field_size
+
+    yield embed
+
+
 class ErrorEmbed(discord.Embed):
     def __init__(self, record: logging.LogRecord, **kwargs: Any) -> None:
         super().__init__(
@@ -34,6 +68,40 @@ class ErrorEmbed(discord.Embed):
         self.set_footer(text=record.asctime)
 
 
+class ErrorDigestEmbed(discord.Embed):
+    max_groups = 10
+
+    def __init__(self, groups: Sequence["ErrorGroup"], **kwargs: Any) -> None:
+        total = sum(g.pending for g in groups)
+        description = f"**{total}** record(s) since the last report"
+
+        if len(groups) > self.max_groups:
+            description += f", {len(groups) - self.max_groups} more group(s) not shown"
+
+        super().__init__(
+            title="ERROR DIGEST",
+            description=description,
+            color=discord.Colour.from_rgb(255, 8, 8),
+            **kwargs,
+        )
+
+        for group in groups[: self.max_groups]:
+            exc_type = f" {group.exc_type}" if group.exc_type else ""
+            message = group.message.splitlines()[-1] if group.message else ""
+            name = f"{group.pending}x {group.levelname}{exc_type} in {group.name}"
+            self.add_field(
+                name=name[:256],
+                value=(
+                    f"`{group.pathname}` at line **{group.lineno}**\n"
+                    f"First seen <t:{int(group.first_seen)}:R>, "
+                    f"last seen <t:{int(group.last_seen)}:R>, "
+                    f"{group.total} in total\n"
+                    f"```{message[:200]}```"
+                ),
+                inline=False,
+            )
+
+
 class ProfileEmbed(Embed):
     def __init__(self, bot: "Bot", profile: Profile) -> None:
         super().__init__(
@@ -124,6 +192,9 @@ class TaskEmbed(Embed):
 
 
 class PagedEmbed:
+    # Paginators still waiting for reactions, they hold their embeds until then
+    running: Set["PagedEmbed"] = set()
+
     def __init__(
         self,
         ctx: dc.Context["Bot"],
@@ -172,7 +243,7 @@ class PagedEmbed:
         except ZeroDivisionError:
             return 0
 
-    def _process_reaction(self, reaction: str, user: discord.User) -> None:
+    def _process_reaction(self, reaction: str, user: discord.abc.Snowflake) -> None:
         embeds = self.embeds
 
         if len(embeds) == 0:
@@ -206,33 +277,40 @@ class PagedEmbed:
                 + self.embeds_len
             ]
 
-        self.ctx.bot.loop.create_task(
-            self.message.edit(embeds=embeds or [self.empty_message])
+        self.ctx.bot.edit_coalescer.edit(
+            self.message, embeds=embeds or [self.empty_message]
         )
-        self.ctx.bot.loop.create_task(
+        background.spawn(
             self.ctx.bot.remove_reaction(
                 self.message,
                 reaction=reaction,
                 user=user,
-            )
+            ),
+            category="discord",
         )
 
     async def _start_loop(self) -> None:
-        def check(reaction: discord.Reaction, user: discord.User) -> bool:
-            return (user.id == self.ctx.author.id) and (
-                reaction.message.id == self.message.id
+        # Raw events don't need the message to still be in the message cache
+        def check(payload: discord.RawReactionActionEvent) -> bool:
+            return (payload.user_id == self.ctx.author.id) and (
+                payload.message_id == self.message.id
             )
 
-        while True:
-            try:
-                reaction, user = await self.ctx.bot.wait_for(
-                    "reaction_add", check=check, timeout=self.timeout
+        try:
+            while True:
+                try:
+                    payload = await self.ctx.bot.wait_for(
+                        "raw_reaction_add", check=check, timeout=self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+                await self.update_embeds()
+                self._process_reaction(
+                    str(payload.emoji), discord.Object(id=payload.user_id)
                 )
-            except asyncio.TimeoutError:
-                break
-
-            await self.update_embeds()
-            self._process_reaction(str(reaction), user)
+        finally:
+            PagedEmbed.running.discard(self)
 
     async def send(self) -> discord.Message:
         from watdo.discord.cogs import BaseCog
@@ -244,8 +322,11 @@ class PagedEmbed:
             or [self.empty_message],
         )
 
-        for emoji in self._controls.values():
-            self.ctx.bot.loop.create_task(self.message.add_reaction(emoji))
+        background.spawn(
+            BaseCog.add_reactions(self.message, tuple(self._controls.values())),
+            category="discord",
+        )
 
+        PagedEmbed.running.add(self)
         self.ctx.bot.loop.create_task(self._start_loop())
         return self.message
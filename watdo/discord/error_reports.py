@@ -0,0 +1,150 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import discord
+from watdo.services import Service
+from watdo.discord.embeds import ErrorDigestEmbed, ErrorEmbed
+
+# Logger name, module path, line number and exception type
+Fingerprint = Tuple[str, str, int, Optional[str]]
+
+
+@dataclass(kw_only=True)
+class ErrorGroup:
+    """Records of the same fingerprint."""
+
+    name: str
+    levelname: str
+    pathname: str
+    lineno: int
+    exc_type: Optional[str]
+    # Message of the first record, the repeats are likely the same error
+    message: str
+    first_seen: float
+    last_seen: float
+    total: int = 0
+    # Records not reported yet
+    pending: int = 0
+
+    @classmethod
+    def from_record(cls, record: logging.LogRecord) -> "ErrorGroup":
+        return cls(
+            name=record.name,
+            levelname=record.levelname,
+            pathname=record.pathname,
+            lineno=record.lineno,
+            exc_type=getattr(record, "exc_type", None),
+            message=record.getMessage(),
+            first_seen=record.created,
+            last_seen=record.created,
+        )
+
+
+class ErrorReporter(Service):
+    """Reports warnings and errors to the log channel without flooding it.
+
+    The first record of a fingerprint is sent right away, its repeats are
+    counted and sent in a digest every `interval` seconds. At most
+    `max_messages` are sent per `per` seconds, with the last one kept for
+    digests. Records over the budget are only counted and end up in a later
+    digest. Groups that stay quiet for `forget_after` seconds are dropped so
+    that they get reported right away again.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[discord.Embed], None],
+        *,
+        interval: float = 60,
+        max_messages: int = 20,
+        per: float = 3600,
+        forget_after: float = 3600,
+    ) -> None:
+        super().__init__("error_reporter")
+        self.send = send
+        self.interval = interval
+        self.max_messages = max_messages
+        self.per = per
+        self.forget_after = forget_after
+        self.records = 0
+        self.sent = 0
+        self._groups: Dict[Fingerprint, ErrorGroup] = {}
+        self._sent_at: Deque[float] = deque()
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    @staticmethod
+    def fingerprint(record: logging.LogRecord) -> Fingerprint:
+        return (
+            record.name,
+            record.pathname,
+            record.lineno,
+            getattr(record, "exc_type", None),
+        )
+
+    def _take_budget(self, *, reserve: int = 0) -> bool:
+        now = time.monotonic()
+
+        while self._sent_at and self._sent_at[0] <= now - self.per:
+            self._sent_at.popleft()
+
+        if len(self._sent_at) >= self.max_messages - reserve:
+            return False
+
+        self._sent_at.append(now)
+        self.sent += 1
+        return True
+
+    def add(self, record: logging.LogRecord) -> None:
+        self.records += 1
+        key = self.fingerprint(record)
+        group = self._groups.get(key)
+
+        if group is None:
+            group = self._groups[key] = ErrorGroup.from_record(record)
+            is_new = True
+        else:
+            is_new = False
+
+        group.total += 1
+        group.last_seen = record.created
+
+        if is_new and not self.is_paused and self._take_budget(reserve=1):
+            self.send(ErrorEmbed(record))
+        else:
+            group.pending += 1
+
+    def send_digest(self) -> int:
+        """Send the records not reported yet and return their count."""
+        now = time.time()
+        groups = [g for g in self._groups.values() if g.pending]
+
+        for key, group in list(self._groups.items()):
+            if not group.pending and group.last_seen <= now - self.forget_after:
+                del self._groups[key]
+
+        if not groups or not self._take_budget():
+            return 0
+
+        groups.sort(key=lambda g: g.pending, reverse=True)
+        self.send(ErrorDigestEmbed(groups))
+        count = 0
+
+        for group in groups:
+            count += group.pending
+            group.pending = 0
+
+        return count
+
+    def report(self) -> List[ErrorGroup]:
+        return sorted(self._groups.values(), key=lambda g: g.total, reverse=True)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.checkpoint()
+            self.send_digest()
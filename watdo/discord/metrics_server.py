@@ -0,0 +1,212 @@
+import os
+import math
+import asyncio
+from typing import TYPE_CHECKING, Dict, Optional
+from aiohttp import web
+from watdo.logging import get_logger
+from watdo.metrics import Exposition, metrics, process_rss
+from watdo.tracing import tracer
+from watdo.background import background
+from watdo.due_parser import due_parser
+from watdo.write_behind import write_behind
+from watdo.discord.dispatch import dispatcher
+
+if TYPE_CHECKING:
+    from watdo.discord import Bot
+
+# The server only runs when a port is set
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0)
+METRICS_HOST = os.getenv("METRICS_HOST") or "127.0.0.1"
+
+
+class MetricsServer:
+    """Serves `/metrics` for Prometheus and `/healthz` for health checks."""
+
+    def __init__(
+        self, bot: "Bot", *, port: int = METRICS_PORT, host: str = METRICS_HOST
+    ) -> None:
+        self.bot = bot
+        self.port = port
+        self.host = host
+        self._runner: Optional[web.AppRunner] = None
+
+    async def render(self) -> str:
+        exposition = Exposition()
+        commands = list(metrics.iter_commands())
+
+        for name, stats in commands:
+            exposition.add_summary(
+                "command_duration_seconds",
+                stats.latency,
+                "Time to run a command.",
+                labels={"command": name},
+            )
+
+        for name, stats in commands:
+            exposition.add(
+                "command_errors_total",
+                stats.errors,
+                "Commands that failed.",
+                kind="counter",
+                labels={"command": name},
+            )
+
+        for name, stats in commands:
+            exposition.add(
+                "command_redis_calls_total",
+                stats.redis_calls,
+                "Redis calls made by commands.",
+                kind="counter",
+                labels={"command": name},
+            )
+
+        for command, latency in sorted(metrics.redis_commands.items()):
+            exposition.add_summary(
+                "redis_command_duration_seconds",
+                latency,
+                "Time of Redis commands, a pipeline counts as one.",
+                labels={"command": command},
+            )
+
+        exposition.add_summary(
+            "event_loop_lag_seconds",
+            metrics.loop_lag,
+            "How much later than scheduled the event loop runs a callback.",
+        )
+        exposition.add(
+            "event_loop_stalls_total",
+            metrics.loop_stalls,
+            "Times the event loop was blocked for longer than the threshold.",
+            kind="counter",
+        )
+
+        if math.isfinite(self.bot.latency):
+            exposition.add(
+                "gateway_latency_seconds",
+                self.bot.latency,
+                "Latency of gateway heartbeats.",
+            )
+
+        exposition.add(
+            "reminder_queue_depth",
+            background.metrics["reminder"].pending,
+            "Due reminders waiting to be sent.",
+        )
+        exposition.add_summary(
+            "reminder_lag_seconds",
+            metrics.reminder_lag,
+            "Time between when a reminder was due and when it got sent.",
+        )
+
+        for priority, depth in dispatcher.depth_by_priority().items():
+            exposition.add(
+                "send_queue_depth",
+                depth,
+                "Outbound Discord requests waiting to be sent.",
+                labels={"priority": priority.name.lower()},
+            )
+
+        for category, category_metrics in sorted(background.metrics.items()):
+            exposition.add(
+                "background_tasks_pending",
+                category_metrics.pending,
+                "Background tasks not done yet.",
+                labels={"category": category},
+            )
+
+        caches = {
+            "due_parser": (len(due_parser), due_parser.hits, due_parser.misses),
+            "completions": (
+                len(self.bot.completions),
+                self.bot.completions.hits,
+                self.bot.completions.misses,
+            ),
+            "users": (
+                len(self.bot.user_cache),
+                self.bot.user_cache.hits,
+                self.bot.user_cache.misses,
+            ),
+        }
+
+        for cache, (size, _, _) in caches.items():
+            exposition.add(
+                "cache_entries", size, "Entries in a cache.", labels={"cache": cache}
+            )
+
+        for cache, (_, hits, _) in caches.items():
+            exposition.add(
+                "cache_hits_total",
+                hits,
+                "Lookups found in a cache.",
+                kind="counter",
+                labels={"cache": cache},
+            )
+
+        for cache, (_, _, misses) in caches.items():
+            exposition.add(
+                "cache_misses_total",
+                misses,
+                "Lookups not found in a cache.",
+                kind="counter",
+                labels={"cache": cache},
+            )
+
+        exposition.add(
+            "write_behind_pending", len(write_behind), "Buffered task updates."
+        )
+        exposition.add("traces", len(tracer), "Traces in the ring buffer.")
+
+        for usage in self.bot.memory_usage():
+            exposition.add(
+                "memory_objects",
+                usage.count,
+                "Objects held by a subsystem, like guild members or paginators.",
+                labels={"subsystem": usage.name},
+            )
+
+        rss = process_rss()
+
+        if rss is not None:
+            exposition.add(
+                "process_resident_memory_bytes", rss, "Resident memory of the bot."
+            )
+
+        return str(exposition)
+
+    async def check_health(self) -> Dict[str, bool]:
+        try:
+            redis = await asyncio.wait_for(self.bot.db.ping(), timeout=1)
+        except Exception:
+            redis = False
+
+        return {"gateway": self.bot.gateway_connected, "redis": redis}
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=await self.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    async def handle_healthz(self, request: web.Request) -> web.Response:
+        health = await self.check_health()
+        return web.json_response(health, status=200 if all(health.values()) else 503)
+
+    async def start(self) -> None:
+        if self._runner is not None:
+            return
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.router.add_get("/healthz", self.handle_healthz)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        get_logger("MetricsServer.start").info(
+            f"Serving metrics on http://{self.host}:{self.port}/metrics"
+        )
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
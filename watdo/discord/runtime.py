@@ -0,0 +1,161 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+import discord
+
+
+@dataclass(frozen=True, kw_only=True)
+class RuntimeProfile:
+    """What the bot receives from the gateway and how much of it is cached."""
+
+    name: str
+    intents: discord.Intents
+    member_cache_flags: discord.MemberCacheFlags
+    chunk_guilds_at_startup: bool
+    # None disables the message cache
+    max_messages: Optional[int]
+    # Users kept alive after discord.py's weak user cache would drop them
+    max_users: int
+
+
+def _lean_intents() -> discord.Intents:
+    # Commands, DMs and reaction controls, without member or presence events
+    return discord.Intents(
+        guilds=True,
+        guild_messages=True,
+        dm_messages=True,
+        message_content=True,
+        guild_reactions=True,
+        dm_reactions=True,
+    )
+
+
+RUNTIME_PROFILES: Dict[str, Callable[[], RuntimeProfile]] = {
+    "full": lambda: RuntimeProfile(
+        name="full",
+        intents=discord.Intents.all(),
+        member_cache_flags=discord.MemberCacheFlags.all(),
+        chunk_guilds_at_startup=True,
+        max_messages=1000,
+        max_users=1000,
+    ),
+    "lean": lambda: RuntimeProfile(
+        name="lean",
+        intents=_lean_intents(),
+        member_cache_flags=discord.MemberCacheFlags.none(),
+        chunk_guilds_at_startup=False,
+        max_messages=int(os.getenv("MAX_MESSAGES") or 100) or None,
+        max_users=int(os.getenv("MAX_USERS") or 5000),
+    ),
+}
+
+RUNTIME_PROFILE = os.getenv("RUNTIME_PROFILE") or "full"
+
+
+def get_runtime_profile(name: str = RUNTIME_PROFILE) -> RuntimeProfile:
+    try:
+        return RUNTIME_PROFILES[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown runtime profile {name!r}, expected one of {tuple(RUNTIME_PROFILES)}"
+        ) from None
+
+
+class UserCache:
+    """Recently used users, fetched from the API when they aren't cached.
+
+    Without the members intent, discord.py only keeps users alive while a
+    message or member references them. Users looked up here are kept in an
+    LRU of `max_users` entries, and users that don't exist are remembered
+    for `missing_ttl` seconds so that reminders don't fetch them every time.
+    Concurrent lookups of the same user share one fetch, and at most
+    `max_fetches` users are fetched at once.
+    """
+
+    def __init__(
+        self,
+        lookup: Callable[[int], Optional[discord.User]],
+        fetch: Callable[[int], Awaitable[discord.User]],
+        *,
+        max_users: int = 1000,
+        missing_ttl: float = 60 * 60,
+        max_fetches: int = 4,
+    ) -> None:
+        self.lookup = lookup
+        self.fetch = fetch
+        self.max_users = max_users
+        self.missing_ttl = missing_ttl
+        self.hits = 0
+        self.misses = 0
+        self._users: OrderedDict[int, discord.User] = OrderedDict()
+        self._missing: OrderedDict[int, float] = OrderedDict()
+        self._fetching: Dict[int, "asyncio.Future[Optional[discord.User]]"] = {}
+        self._fetches = asyncio.Semaphore(max_fetches)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def _put(self, user: discord.User) -> None:
+        self._users[user.id] = user
+        self._users.move_to_end(user.id)
+
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def get(self, user_id: int) -> Optional[discord.User]:
+        user = self._users.get(user_id)
+
+        if user is not None:
+            self._users.move_to_end(user_id)
+            return user
+
+        user = self.lookup(user_id)
+
+        if user is not None:
+            self._put(user)
+
+        return user
+
+    async def resolve(self, user_id: int) -> Optional[discord.User]:
+        user = self.get(user_id)
+
+        if user is not None:
+            self.hits += 1
+            return user
+
+        missing_until = self._missing.get(user_id)
+
+        if missing_until is not None and missing_until > time.monotonic():
+            self.hits += 1
+            return None
+
+        self.misses += 1
+        fetching = self._fetching.get(user_id)
+
+        if fetching is None:
+            fetching = asyncio.ensure_future(self._fetch(user_id))
+            self._fetching[user_id] = fetching
+            fetching.add_done_callback(lambda _: self._fetching.pop(user_id, None))
+
+        # A cancelled caller doesn't cancel the fetch for the others
+        return await asyncio.shield(fetching)
+
+    async def _fetch(self, user_id: int) -> Optional[discord.User]:
+        async with self._fetches:
+            try:
+                user = await self.fetch(user_id)
+            except discord.NotFound:
+                self._missing[user_id] = time.monotonic() + self.missing_ttl
+                self._missing.move_to_end(user_id)
+
+                while len(self._missing) > self.max_users:
+                    self._missing.popitem(last=False)
+
+                return None
+
+        self._missing.pop(user_id, None)
+        self._put(user)
+        return user
@@ -0,0 +1,242 @@
+import re
+import asyncio
+import datetime
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+from watdo import dt
+from watdo.logging import get_logger
+
+# A parsed due is either a timestamp or an RRULE string with DTSTART
+Due = float | str
+
+_TIME = r"(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>am|pm)?"
+_UNITS = {
+    "min": "minutes",
+    "mins": "minutes",
+    "minute": "minutes",
+    "minutes": "minutes",
+    "h": "hours",
+    "hr": "hours",
+    "hrs": "hours",
+    "hour": "hours",
+    "hours": "hours",
+    "day": "days",
+    "days": "days",
+    "week": "weeks",
+    "weeks": "weeks",
+}
+_TIMES_OF_DAY = {"morning": 9, "noon": 12, "afternoon": 13, "evening": 18, "night": 21}
+
+_RELATIVE_RE = re.compile(r"in (?P<amount>\d+|an?) (?P<unit>[a-z]+)")
+_DAY_RE = re.compile(rf"(?P<day>today|tomorrow)(?: at {_TIME})?")
+_ISO_RE = re.compile(
+    r"(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})"
+    r"(?:[ t](?P<hour>\d{2}):(?P<minute>\d{2})(?::(?P<second>\d{2}))?)?"
+)
+_DAILY_RE = re.compile(
+    rf"(?:every day|daily)(?: at {_TIME})?|every (?P<time_of_day>{'|'.join(_TIMES_OF_DAY)})"
+)
+
+
+def _to_hour(hour: int, meridiem: Optional[str]) -> Optional[int]:
+    if meridiem is None:
+        return hour if hour < 24 else None
+
+    if not 1 <= hour <= 12:
+        return None
+
+    return hour % 12 + (12 if meridiem == "pm" else 0)
+
+
+def _with_dtstart(rrule: str, now: datetime.datetime) -> str:
+    if "DTSTART:" in rrule:
+        return rrule
+
+    return f"DTSTART:{now.strftime('%Y%m%dT%H%M%S')}\n{rrule}"
+
+
+def parse_fast(text: str, now: datetime.datetime) -> Optional[Due]:
+    """Parse the most common due formats without dateparser or recurrent.
+
+    Returns None when `text` is not one of the supported formats.
+    """
+    if match := _RELATIVE_RE.fullmatch(text):
+        unit = _UNITS.get(match["unit"])
+
+        if unit is None:
+            return None
+
+        amount = 1 if match["amount"] in ("a", "an") else int(match["amount"])
+        return (now + datetime.timedelta(**{unit: amount})).timestamp()
+
+    if match := _DAY_RE.fullmatch(text):
+        date = now + datetime.timedelta(days=1 if match["day"] == "tomorrow" else 0)
+
+        if match["hour"] is not None:
+            hour = _to_hour(int(match["hour"]), match["meridiem"])
+            minute = int(match["minute"] or 0)
+
+            if hour is None or minute > 59:
+                return None
+
+            date = date.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+        return date.timestamp()
+
+    if match := _ISO_RE.fullmatch(text):
+        try:
+            date = datetime.datetime(
+                int(match["year"]),
+                int(match["month"]),
+                int(match["day"]),
+                int(match["hour"] or 0),
+                int(match["minute"] or 0),
+                int(match["second"] or 0),
+                tzinfo=now.tzinfo,
+            )
+        except ValueError:
+            return None
+
+        return date.timestamp()
+
+    if match := _DAILY_RE.fullmatch(text):
+        if match["time_of_day"] is not None:
+            daily_hour: Optional[int] = _TIMES_OF_DAY[match["time_of_day"]]
+            minute = 0
+        elif match["hour"] is not None:
+            daily_hour = _to_hour(int(match["hour"]), match["meridiem"])
+            minute = int(match["minute"] or 0)
+        else:
+            return _with_dtstart("RRULE:INTERVAL=1;FREQ=DAILY", now)
+
+        if daily_hour is None or minute > 59:
+            return None
+
+        return _with_dtstart(
+            f"RRULE:BYHOUR={daily_hour};BYMINUTE={minute};INTERVAL=1;FREQ=DAILY", now
+        )
+
+    return None
+
+
+def parse_slow(text: str, utc_offset: float) -> Optional[Due]:
+    """Parse `text` with dateparser, then recurrent.
+
+    This is slow and meant to run in a worker process.
+    """
+    import dateparser
+    import recurrent
+
+    tz = dt.utc_offset_to_tz(utc_offset)
+    now = dt.date_now(utc_offset)
+    date = dateparser.parse(
+        text,
+        settings={
+            "RETURN_AS_TIMEZONE_AWARE": True,
+            "TIMEZONE": tz.tzname(now) or "",
+        },
+    )
+
+    if date is not None:
+        return date.timestamp()
+
+    rr: Optional[str | datetime.datetime] = recurrent.parse(text, now=now)
+
+    if isinstance(rr, str):
+        return _with_dtstart(rr, now)
+
+    if isinstance(rr, datetime.datetime):
+        if rr.tzinfo is None:
+            rr = rr.replace(tzinfo=tz)
+
+        return rr.timestamp()
+
+    return None
+
+
+class DueParser:
+    """Parses task due dates without blocking the event loop.
+
+    Common formats are handled by compiled regexes, everything else goes
+    to dateparser and recurrent in a worker process. Results are cached
+    per (normalized text, UTC offset, minute).
+    """
+
+    def __init__(self, *, cache_size: int = 1024, max_workers: int = 1) -> None:
+        self.cache_size = cache_size
+        self.max_workers = max_workers
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[Tuple[str, float, int], Optional[Due]] = OrderedDict()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+        return self._executor
+
+    async def _parse_slow(self, text: str, utc_offset: float) -> Optional[Due]:
+        loop = asyncio.get_running_loop()
+
+        try:
+            return await loop.run_in_executor(
+                self.executor, parse_slow, text, utc_offset
+            )
+        except BrokenProcessPool:
+            # A worker died, e.g. killed for its memory, and took the pool with it
+            get_logger("DueParser.parse").warning("Restarting the broken process pool")
+            self.shutdown()
+
+        return await loop.run_in_executor(self.executor, parse_slow, text, utc_offset)
+
+    async def parse(self, text: str, utc_offset: float) -> Optional[Due]:
+        text = " ".join(text.lower().split())
+        now = dt.date_now(utc_offset)
+        key = (text, utc_offset, int(now.timestamp() // 60))
+
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        self.misses += 1
+        res = parse_fast(text, now)
+
+        if res is None:
+            res = await self._parse_slow(text, utc_offset)
+
+        self._cache[key] = res
+
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return res
+
+    async def warm_up(self) -> None:
+        """Start the workers and load dateparser and recurrent in them."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self.executor, parse_slow, "next friday", 0)
+                for _ in range(self.max_workers)
+            )
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+due_parser = DueParser()
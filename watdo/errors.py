@@ -17,3 +17,11 @@ class CustomException(Exception):
 class InvalidData(CustomException):
     def __init__(self, cls: "Type[SafeData[Any]]", message: str, *args: object) -> None:
         super().__init__(f"{cls.__name__} {message}", *args)
+
+
+class ProfilerBusy(CustomException):
+    pass
+
+
+class TitleTaken(CustomException):
+    pass
@@ -0,0 +1,406 @@
+import re
+import time
+import asyncio
+import functools
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from collections import Counter
+from typing import Dict, List, Set, Optional, Callable
+from watdo import dt
+from watdo.database import Database, WriteBatch
+from watdo.models import Profile, Task, ScheduledTask
+
+
+class TaskIndex(ABC):
+    """A Redis structure derived from the task records of a profile.
+
+    Indexes are updated in the same transaction as the record they are
+    derived from: the stored version of a task gets removed before the new
+    version gets added.
+    """
+
+    @abstractmethod
+    def add(self, batch: WriteBatch, task: Task) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove(self, batch: WriteBatch, task: Task) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def clear(self, db: Database, batch: WriteBatch, profile_id: str) -> None:
+        raise NotImplementedError
+
+    @staticmethod
+    def keys_key(profile_id: str) -> str:
+        """Set of the per-value keys the indexes of a profile wrote to."""
+        return f"task_index_keys:profile.{profile_id}"
+
+    @classmethod
+    async def _clear_keys(
+        cls, db: Database, batch: WriteBatch, profile_id: str, prefix: str
+    ) -> None:
+        keys_key = cls.keys_key(profile_id)
+        keys = [k for k in await db.smembers(keys_key) if k.startswith(prefix)]
+
+        if keys:
+            batch.delete(*keys)
+            batch.srem(keys_key, *keys)
+
+
+class CategoryIndex(TaskIndex):
+    """Set of task UUIDs per category."""
+
+    @staticmethod
+    def key(profile_id: str, category: str) -> str:
+        return f"task_category:profile.{profile_id}.{category}"
+
+    def add(self, batch: WriteBatch, task: Task) -> None:
+        profile_id = task.profile_id.value
+        key = self.key(profile_id, task.category.value)
+        batch.sadd(key, task.uuid.value)
+        batch.sadd(self.keys_key(profile_id), key)
+
+    def remove(self, batch: WriteBatch, task: Task) -> None:
+        key = self.key(task.profile_id.value, task.category.value)
+        batch.srem(key, task.uuid.value)
+
+    async def clear(self, db: Database, batch: WriteBatch, profile_id: str) -> None:
+        await self._clear_keys(db, batch, profile_id, self.key(profile_id, ""))
+
+
+class TitleIndex(TaskIndex):
+    """Hash of task titles to task UUIDs."""
+
+    @staticmethod
+    def key(profile_id: str) -> str:
+        return f"task_titles:profile.{profile_id}"
+
+    def add(self, batch: WriteBatch, task: Task) -> None:
+        key = self.key(task.profile_id.value)
+        batch.hset(key, key=task.title.value, value=task.uuid.value)
+
+    def remove(self, batch: WriteBatch, task: Task) -> None:
+        # The title may belong to another task by the time this runs
+        batch.hdel_if_equal(
+            self.key(task.profile_id.value), task.title.value, task.uuid.value
+        )
+
+    async def clear(self, db: Database, batch: WriteBatch, profile_id: str) -> None:
+        batch.delete(self.key(profile_id))
+
+
+def tokenize(text: str) -> Set[str]:
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def trigrams(text: str) -> Set[str]:
+    res: Set[str] = set()
+
+    for word in tokenize(text):
+        padded = f"  {word} "
+        res.update(padded[i : i + 3] for i in range(len(padded) - 2))
+
+    return res
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0
+
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+class SearchIndex(TaskIndex):
+    """Inverted index of terms and title trigrams to task UUIDs.
+
+    Terms come from the title, category and description of a task and are
+    matched exactly, while title trigrams power fuzzy title matching.
+    """
+
+    min_similarity = 0.3
+
+    @staticmethod
+    def term_key(profile_id: str, term: str) -> str:
+        return f"task_terms:profile.{profile_id}.{term}"
+
+    @staticmethod
+    def trigram_key(profile_id: str, trigram: str) -> str:
+        return f"task_trigrams:profile.{profile_id}.{trigram}"
+
+    @staticmethod
+    def _terms(task: Task) -> Set[str]:
+        terms = tokenize(task.title.value) | tokenize(task.category.value)
+
+        if task.description is not None:
+            terms |= tokenize(task.description.value)
+
+        return terms
+
+    def add(self, batch: WriteBatch, task: Task) -> None:
+        profile_id = task.profile_id.value
+        keys = [self.term_key(profile_id, term) for term in self._terms(task)]
+        keys.extend(self.trigram_key(profile_id, t) for t in trigrams(task.title.value))
+
+        for key in keys:
+            batch.sadd(key, task.uuid.value)
+
+        if keys:
+            batch.sadd(self.keys_key(profile_id), *keys)
+
+    def remove(self, batch: WriteBatch, task: Task) -> None:
+        profile_id = task.profile_id.value
+
+        for term in self._terms(task):
+            batch.srem(self.term_key(profile_id, term), task.uuid.value)
+
+        for trigram in trigrams(task.title.value):
+            batch.srem(self.trigram_key(profile_id, trigram), task.uuid.value)
+
+    async def clear(self, db: Database, batch: WriteBatch, profile_id: str) -> None:
+        await self._clear_keys(db, batch, profile_id, self.term_key(profile_id, ""))
+        await self._clear_keys(db, batch, profile_id, self.trigram_key(profile_id, ""))
+
+    async def fuzzy_titles(
+        self, db: Database, profile: Profile, title: str, *, limit: int = 3
+    ) -> List[Task]:
+        """Tasks whose title looks like `title`, most similar first."""
+        profile_id = profile.uuid.value
+        query = trigrams(title)
+        overlaps: Counter[str] = Counter()
+
+        for uuids in await db.smembers_many(
+            self.trigram_key(profile_id, t) for t in query
+        ):
+            overlaps.update(uuids)
+
+        # Only the best candidates by shared trigrams get fetched and scored
+        candidates = [uuid for uuid, _ in overlaps.most_common(limit * 5)]
+        scored = []
+
+        for task in await Task.from_uuids(db, profile, candidates):
+            score = similarity(query, trigrams(task.title.value))
+
+            if score >= self.min_similarity:
+                scored.append((score, task))
+
+        scored.sort(key=lambda s: s[0], reverse=True)
+        return [task for _, task in scored[:limit]]
+
+    async def search(self, db: Database, profile: Profile, query: str) -> List[Task]:
+        """Tasks containing every term of `query`, or fuzzy title matches."""
+        profile_id = profile.uuid.value
+        terms = tokenize(query)
+
+        if not terms:
+            return []
+
+        uuids = await db.sinter(self.term_key(profile_id, t) for t in terms)
+
+        if not uuids:
+            return await self.fuzzy_titles(db, profile, query, limit=10)
+
+        tasks = await Task.from_uuids(db, profile, uuids)
+        tasks.sort(key=lambda t: t.created_at.value, reverse=True)
+        return tasks
+
+
+@dataclass(kw_only=True)
+class TaskStats:
+    total: int = 0
+    important: int = 0
+    overdue: int = 0
+    recurring: int = 0
+    one_time: int = 0
+    done: int = 0
+    categories: Dict[str, int] = field(default_factory=dict)
+
+
+class StatsIndex(TaskIndex):
+    """Hash of per-profile counters, updated as deltas on every write."""
+
+    @staticmethod
+    def key(profile_id: str) -> str:
+        return f"task_stats:profile.{profile_id}"
+
+    @staticmethod
+    def _fields(task: Task) -> List[str]:
+        fields = ["total", f"category.{task.category.value}"]
+
+        if task.importance.value:
+            fields.append("important")
+
+        if isinstance(task, ScheduledTask) and task.is_recurring:
+            fields.append("recurring")
+        else:
+            fields.append("one_time")
+
+        if task.is_done:
+            fields.append("done")
+
+        return fields
+
+    def add(self, batch: WriteBatch, task: Task) -> None:
+        for name in self._fields(task):
+            batch.hincrby(self.key(task.profile_id.value), name, 1)
+
+    def remove(self, batch: WriteBatch, task: Task) -> None:
+        for name in self._fields(task):
+            batch.hincrby(self.key(task.profile_id.value), name, -1)
+
+    async def clear(self, db: Database, batch: WriteBatch, profile_id: str) -> None:
+        batch.delete(self.key(profile_id))
+
+    @staticmethod
+    def _parse(counters: Dict[str, str]) -> TaskStats:
+        stats = TaskStats()
+
+        for name, value in counters.items():
+            if name.startswith("category."):
+                if int(value) > 0:
+                    stats.categories[name.removeprefix("category.")] = int(value)
+            else:
+                setattr(stats, name, int(value))
+
+        stats.categories = dict(sorted(stats.categories.items()))
+        return stats
+
+    async def get(self, db: Database, profile: Profile) -> TaskStats:
+        profile_id = profile.uuid.value
+        counters, overdue = await asyncio.gather(
+            db.hgetall(self.key(profile_id)),
+            due_index.count_overdue(db, profile_id),
+        )
+        stats = self._parse(counters)
+        stats.overdue = overdue
+        return stats
+
+    async def get_categories(self, db: Database, profile_id: str) -> Dict[str, int]:
+        return self._parse(await db.hgetall(self.key(profile_id))).categories
+
+
+class DueIndex(TaskIndex):
+    """Sorted set of scheduled task UUIDs scored by their due date."""
+
+    @staticmethod
+    def key(profile_id: str) -> str:
+        return f"task_due:profile.{profile_id}"
+
+    def add(self, batch: WriteBatch, task: Task) -> None:
+        if not isinstance(task, ScheduledTask):
+            return
+
+        due_date: Optional[dt.datetime] = task.due_date
+
+        # Recurrences that already ended have no due date
+        if due_date is None:
+            return
+
+        key = self.key(task.profile_id.value)
+        batch.zadd(key, {task.uuid.value: due_date.timestamp()})
+
+    def remove(self, batch: WriteBatch, task: Task) -> None:
+        if isinstance(task, ScheduledTask):
+            batch.zrem(self.key(task.profile_id.value), task.uuid.value)
+
+    async def clear(self, db: Database, batch: WriteBatch, profile_id: str) -> None:
+        batch.delete(self.key(profile_id))
+
+    async def count_overdue(self, db: Database, profile_id: str) -> int:
+        return await db.zcount(self.key(profile_id), "-inf", f"({time.time()}")
+
+
+class ReminderIndex(TaskIndex):
+    """Sorted set of scheduled task UUIDs scored by their next reminder.
+
+    The IDs of the profiles with reminders are kept in a set so that the
+    reminder finds them without scanning the keyspace.
+    """
+
+    profiles_key = "task_reminder_profiles"
+
+    @staticmethod
+    def key(profile_id: str) -> str:
+        return f"task_reminders:profile.{profile_id}"
+
+    def add(self, batch: WriteBatch, task: Task) -> None:
+        if not isinstance(task, ScheduledTask) or task.next_reminder is None:
+            return
+
+        profile_id = task.profile_id.value
+        batch.zadd(self.key(profile_id), {task.uuid.value: task.next_reminder.value})
+        batch.sadd(self.profiles_key, profile_id)
+
+    def remove(self, batch: WriteBatch, task: Task) -> None:
+        if isinstance(task, ScheduledTask):
+            batch.zrem(self.key(task.profile_id.value), task.uuid.value)
+
+    async def clear(self, db: Database, batch: WriteBatch, profile_id: str) -> None:
+        batch.delete(self.key(profile_id))
+
+    async def get_due(self, db: Database) -> Dict[str, List[str]]:
+        """UUIDs of the tasks to remind of by now, by profile ID."""
+        profile_ids = sorted(await db.smembers(self.profiles_key))
+        due = await db.zrangebyscore_many(
+            (self.key(p) for p in profile_ids), "-inf", time.time()
+        )
+        return {p: uuids for p, uuids in zip(profile_ids, due) if uuids}
+
+
+class TaskIndexes:
+    # Bump whenever an index is added or changed so that `migrate` rebuilds them
+    version = 6
+
+    def __init__(self, *indexes: TaskIndex) -> None:
+        self.indexes = indexes
+        self._listeners: List[Callable[[str], None]] = []
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Call `listener` with the profile ID after its tasks are written."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, batch: WriteBatch, task: Task) -> None:
+        for listener in self._listeners:
+            batch.on_execute(functools.partial(listener, task.profile_id.value))
+
+    def add(self, batch: WriteBatch, task: Task) -> None:
+        for index in self.indexes:
+            index.add(batch, task)
+
+        self._notify(batch, task)
+
+    def remove(self, batch: WriteBatch, task: Task) -> None:
+        for index in self.indexes:
+            index.remove(batch, task)
+
+        self._notify(batch, task)
+
+    async def rebuild(self, db: Database, profile: Profile) -> int:
+        tasks = await Task.get_tasks_of_profile(db, profile, buffered=False)
+        profile_id = profile.uuid.value
+
+        async with db.batch() as batch:
+            for index in self.indexes:
+                await index.clear(db, batch, profile_id)
+
+            # Oldest first so the newest task wins a duplicate title
+            for task in reversed(tasks.items):
+                self.add(batch, task)
+
+        return len(tasks)
+
+
+category_index = CategoryIndex()
+title_index = TitleIndex()
+search_index = SearchIndex()
+stats_index = StatsIndex()
+due_index = DueIndex()
+reminder_index = ReminderIndex()
+task_indexes = TaskIndexes(
+    category_index, title_index, search_index, stats_index, due_index, reminder_index
+)
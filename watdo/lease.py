@@ -0,0 +1,54 @@
+import os
+import time
+import uuid
+import socket
+from typing import Optional
+from watdo.database import Database
+
+
+class Lease:
+    """Makes a single process among many the leader of a job.
+
+    The leader holds a Redis key that expires after `ttl` seconds unless it
+    gets renewed, so another process takes over when the leader dies or
+    loses its connection. Expiry is measured from before each renewal was
+    sent, so a process stops seeing itself as the leader before Redis does.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        name: str,
+        *,
+        ttl: float = 15,
+        owner: Optional[str] = None,
+    ) -> None:
+        self.db = database
+        self.key = f"lease:{name}"
+        self.ttl = ttl
+        self.owner = (
+            owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self._expires_at = 0.0
+
+    @property
+    def is_held(self) -> bool:
+        return time.monotonic() < self._expires_at
+
+    async def hold(self) -> bool:
+        """Take the lease or renew it, returns whether this process holds it."""
+        sent_at = time.monotonic()
+        held = await self.db.hold_lease(self.key, self.owner, ttl=self.ttl)
+        self._expires_at = sent_at + self.ttl if held else 0
+        return held
+
+    async def keep(self) -> bool:
+        """Renew the lease once half of it is used, for long running work."""
+        if self._expires_at - time.monotonic() > self.ttl / 2:
+            return True
+
+        return await self.hold()
+
+    async def release(self) -> None:
+        self._expires_at = 0
+        await self.db.release_lease(self.key, self.owner)
@@ -1,29 +1,30 @@
 import os
+import sys
 import time
+import queue
+import atexit
 import logging
 import inspect
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from contextlib import contextmanager
-from typing import Optional, Union, Iterator, Dict
+from typing import cast, Optional, Union, Iterator, Dict, Tuple
 from watdo.environ import IS_DEV
+from watdo.tracing import tracer
 
 LOGGING_LEVEL = os.getenv("LOGGING_LEVEL") or logging.DEBUG
+LOG_FILE = "logs.txt"
 
 
 def get_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
     logger.setLevel(LOGGING_LEVEL)
 
-    if not logger.hasHandlers():
-        stream_handler = logging.StreamHandler()
-        stream_handler.setFormatter(stream_formatter)
-        logger.addHandler(stream_handler)
-
-        file_handler = logging.FileHandler("logs.txt")
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
-
-    for handler in logger.handlers:
-        handler.setLevel(LOGGING_LEVEL)
+    if queue_handler not in logger.handlers:
+        start_listener()
+        logger.addHandler(queue_handler)
+        # Parent loggers have the same handler, records would be emitted twice
+        logger.propagate = False
 
     return logger
 
@@ -36,49 +37,139 @@ def trace() -> None:
 
 class Formatter(logging.Formatter):
     def __init__(self, *, colored: bool = True) -> None:
+        super().__init__()
         self.colored = colored
         self.last_record: Optional[logging.LogRecord] = None
+        self._with_name = True
+        self._formatters: Dict[Tuple[str, bool], logging.Formatter] = {}
 
-    def format(self, record: logging.LogRecord) -> str:
-        if not IS_DEV and not self.colored:
-            if record.levelno > logging.INFO:
-                from watdo import bot
+    def _get_formatter(self, levelname: str, with_name: bool) -> logging.Formatter:
+        key = (levelname, with_name)
+        formatter = self._formatters.get(key)
 
-                try:
-                    bot.log(record)
-                except Exception:
-                    pass
+        if formatter is not None:
+            return formatter
 
-        space = " " * (len("CRITICAL") - len(record.levelname))
+        space = " " * (len("CRITICAL") - len(levelname))
 
         if self.colored:
-            formatter = logging.Formatter(
-                "\n\033[91m%(name)s\033[0m\n"
-                f"[\033[95m%(asctime)s\033[0m \033[93m%(levelname)s\033[0m{space}] %(message)s"
-            )
+            fmt = f"[\033[95m%(asctime)s\033[0m \033[93m%(levelname)s\033[0m{space}] %(message)s"
+
+            if with_name:
+                fmt = "\n\033[91m%(name)s\033[0m\n" + fmt
         else:
-            formatter = logging.Formatter(
-                "\n%(name)s\n" f"[%(asctime)s %(levelname)s{space}] %(message)s"
-            )
+            fmt = f"[%(asctime)s %(levelname)s{space}] %(message)s"
+
+            if with_name:
+                fmt = "\n%(name)s\n" + fmt
+
+        formatter = self._formatters[key] = logging.Formatter(fmt)
+        return formatter
+
+    def format(self, record: logging.LogRecord) -> str:
+        # Rotating file handlers format a record twice, to check its size first
+        if record is not self.last_record:
+            last_name = None if self.last_record is None else self.last_record.name
+            self._with_name = record.name != last_name
+            self.last_record = record
+
+        return self._get_formatter(record.levelname, self._with_name).format(record)
 
-        if self.last_record is not None:
-            if record.name == self.last_record.name:
-                if self.colored:
-                    formatter = logging.Formatter(
-                        f"[\033[95m%(asctime)s\033[0m \033[93m%(levelname)s\033[0m{space}] %(message)s"
-                    )
-                else:
-                    formatter = logging.Formatter(
-                        f"[%(asctime)s %(levelname)s{space}] %(message)s"
-                    )
 
-        self.last_record = record
-        return formatter.format(record)
+class BotLogHandler(logging.Handler):
+    """Passes warnings and errors to the error reporter of the bot."""
+
+    def __init__(self) -> None:
+        super().__init__(logging.WARNING)
+        self.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        from watdo import bot
+
+        try:
+            # The embed needs the message and time set by formatting
+            self.format(record)
+            bot.log(record)
+        except Exception:
+            pass
+
+
+class StdoutHandler(logging.StreamHandler):  # type: ignore[type-arg]
+    """Writes to `sys.stdout` as it is when a record gets emitted."""
+
+    def __init__(self) -> None:
+        super().__init__(sys.stdout)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.stream = sys.stdout
+        super().emit(record)
+
+
+class LogQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The exception itself doesn't survive, error reports group by its type
+        exc_type = record.exc_info[0] if record.exc_info else None
+        record = super().prepare(record)
+        record.exc_type = None if exc_type is None else exc_type.__name__
+        # Already part of the message, like the traceback
+        record.stack_info = None
+        return record
 
 
 stream_formatter = Formatter()
 file_formatter = Formatter(colored=False)
 
+# Loggers only put records in the queue, a thread does the formatting and I/O
+log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+queue_handler = LogQueueHandler(log_queue)
+queue_handler.setLevel(LOGGING_LEVEL)
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def start_listener() -> None:
+    global _listener
+
+    with _listener_lock:
+        if _listener is not None:
+            return
+
+        stream_handler = StdoutHandler()
+        stream_handler.setFormatter(stream_formatter)
+
+        file_handler = RotatingFileHandler(
+            LOG_FILE, maxBytes=5_000_000, backupCount=3, encoding="utf-8", delay=True
+        )
+        file_handler.setFormatter(file_formatter)
+
+        handlers: Tuple[logging.Handler, ...] = (stream_handler, file_handler)
+
+        for handler in handlers:
+            handler.setLevel(LOGGING_LEVEL)
+
+        if not IS_DEV:
+            handlers += (BotLogHandler(),)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_listener)
+
+
+def stop_listener() -> None:
+    """Write the records left in the queue and stop the logging thread."""
+    global _listener
+
+    with _listener_lock:
+        if _listener is None:
+            return
+
+        _listener.stop()
+
+        for handler in _listener.handlers:
+            handler.close()
+
+        _listener = None
+
 
 @contextmanager
 def debug_wall_time(
@@ -93,18 +184,19 @@ def debug_wall_time(
     msg = block_name or logger.name
     logger.debug(f"Measuring wall clock time of {msg}...")
 
-    start_time = time.time()
+    start_ns = time.perf_counter_ns()
     res: Dict[str, float | None] = {
-        "start_time": start_time,
+        "start_time": time.time(),
         "end_time": None,
         "delta": None,
     }
-    yield res
 
-    end_time = time.time()
-    delta = end_time - start_time
+    with tracer.span(msg):
+        yield res
 
-    res["end_time"] = end_time
+    delta = (time.perf_counter_ns() - start_ns) / 1e9
+
+    res["end_time"] = cast(float, res["start_time"]) + delta
     res["delta"] = delta
 
     logger.debug(f"Wall clock time of {msg}: {round(delta, 2)}s")
@@ -129,10 +221,15 @@ def debug_cpu_time(
         "end_time": None,
         "delta": None,
     }
-    yield res
 
-    end_time = time.process_time()
-    delta = end_time - start_time
+    with tracer.span(msg) as span:
+        yield res
+
+        end_time = time.process_time()
+        delta = end_time - start_time
+
+        if span is not None:
+            span.attributes["cpu_time"] = delta
 
     res["end_time"] = end_time
     res["delta"] = delta
@@ -0,0 +1,115 @@
+import io
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from typing import List, Optional
+from watdo.logging import get_logger
+from watdo.metrics import metrics
+
+
+class LoopMonitor:
+    """Measures how late the event loop runs and reports when it's blocked.
+
+    A task sleeps `interval` seconds over and over and records how much
+    later than that it wakes up. A watchdog thread checks that the task
+    keeps waking up: when a callback or task step blocks the loop for more
+    than `threshold` seconds, the stacks of the loop thread and of the
+    running task are logged, once per stall.
+    """
+
+    def __init__(self, *, interval: float = 0.1, threshold: float = 0.25) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._beat = time.monotonic()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._thread = threading.Thread(
+            target=self._watch, name="LoopMonitor", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _sample(self) -> None:
+        while True:
+            started_at = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._beat = time.monotonic()
+            metrics.loop_lag.record(max(0, self._beat - started_at - self.interval))
+
+    def format_stacks(self) -> str:
+        """The stack of the loop thread and the coroutine stack of its task."""
+        lines: List[str] = []
+        frame = sys._current_frames().get(self._loop_thread_id or 0)
+
+        if frame is not None:
+            lines.append("Loop thread (most recent call last):\n")
+            lines.extend(traceback.format_stack(frame))
+
+        # Reading the running task of another thread's loop is only a dict lookup
+        task = None if self._loop is None else asyncio.current_task(self._loop)
+
+        if task is not None:
+            buffer = io.StringIO()
+            task.print_stack(file=buffer)
+            lines.append(buffer.getvalue())
+
+        return "".join(lines)
+
+    def _watch(self) -> None:
+        logger = get_logger("LoopMonitor")
+        reported_beat: Optional[float] = None
+
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+
+            if blocked < self.threshold:
+                if reported_beat is not None and beat != reported_beat:
+                    logger.info(
+                        f"Event loop ran again after {beat - reported_beat:.2f}s"
+                    )
+                    reported_beat = None
+
+                continue
+
+            if beat == reported_beat:
+                continue
+
+            reported_beat = beat
+            metrics.loop_stalls += 1
+            logger.warning(
+                f"Event loop blocked for over {blocked:.2f}s\n{self.format_stacks()}"
+            )
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,98 @@
+import gc
+import sys
+import types
+from dataclasses import dataclass, field
+from typing import AbstractSet, Iterable, List, Optional, Tuple
+
+# Shared by everything, their size isn't owned by any subsystem
+_SHARED_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.CodeType,
+    types.FrameType,
+)
+
+
+def deep_sizeof(
+    roots: Iterable[object],
+    *,
+    exclude: AbstractSet[int] = frozenset(),
+    limit: int = 200_000,
+) -> Tuple[int, bool]:
+    """Estimate the bytes of `roots` and the objects they reference.
+
+    Objects with an ID in `exclude` are neither counted nor followed.
+    Returns the size and whether `limit` objects were reached before all of
+    them got counted.
+    """
+    seen = set(exclude)
+    stack: List[object] = []
+    size = 0
+    count = 0
+
+    for root in roots:
+        if id(root) not in seen:
+            seen.add(id(root))
+            stack.append(root)
+
+    while stack:
+        obj = stack.pop()
+        size += sys.getsizeof(obj)
+        count += 1
+
+        if count >= limit:
+            return size, True
+
+        for ref in gc.get_referents(obj):
+            if id(ref) not in seen and not isinstance(ref, _SHARED_TYPES):
+                seen.add(id(ref))
+                stack.append(ref)
+
+    return size, False
+
+
+@dataclass(kw_only=True)
+class Usage:
+    """Memory held by a subsystem, `count` is in the unit of the subsystem."""
+
+    name: str
+    count: int
+    roots: List[object] = field(default_factory=list, repr=False)
+    size: Optional[int] = None
+    truncated: bool = False
+
+
+def measure(
+    usages: List[Usage], *, exclude: Iterable[object] = (), limit: int = 200_000
+) -> None:
+    """Set the sizes of `usages`.
+
+    The roots of a subsystem are not counted in the others, like the members
+    that guilds reference, and neither are the objects in `exclude`, like
+    the bot that almost everything references.
+    """
+    boundary = {id(obj) for obj in exclude}
+    boundary.update(id(root) for usage in usages for root in usage.roots)
+
+    for usage in usages:
+        own = {id(root) for root in usage.roots}
+        usage.size, usage.truncated = deep_sizeof(
+            usage.roots, exclude=boundary - own, limit=limit
+        )
+
+
+def format_usages(usages: Iterable[Usage]) -> List[str]:
+    rows = [f"{'subsystem':<18}{'count':>8}{'size':>10}"]
+
+    for usage in usages:
+        if usage.size is None:
+            size = "-"
+        else:
+            size = f"{'>' if usage.truncated else ''}{usage.size / 1024:.0f}K"
+
+        rows.append(f"{usage.name[:17]:<18}{usage.count:>8}{size:>10}")
+
+    return rows
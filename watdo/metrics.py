@@ -0,0 +1,293 @@
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+
+class Histogram:
+    """Counts of values in log-linear buckets, like HdrHistogram.
+
+    Values are recorded as whole microseconds. Every power of two is split
+    into `2 ** precision` buckets, so quantiles are within
+    `1 / 2 ** precision` of the recorded values while memory only grows
+    with the range of the values.
+    """
+
+    def __init__(self, *, precision: int = 5) -> None:
+        self.precision = precision
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+        # Bucket (shift, value >> shift) to count, ordered like the values
+        self._counts: Dict[Tuple[int, int], int] = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _bucket(self, value: int) -> Tuple[int, int]:
+        shift = max(0, value.bit_length() - self.precision - 1)
+        return shift, value >> shift
+
+    def record(self, seconds: float) -> None:
+        value = max(0, round(seconds * 1_000_000))
+        bucket = self._bucket(value)
+        self._counts[bucket] = self._counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The value in seconds that a `q` fraction of the values are under."""
+        if self.min is None or self.max is None:
+            return None
+
+        rank = q * self.count
+        seen = 0
+
+        for shift, mantissa in sorted(self._counts):
+            seen += self._counts[(shift, mantissa)]
+
+            if seen >= rank:
+                # The middle of the bucket
+                value = (mantissa << shift) + (1 << shift) // 2
+                return min(max(value, self.min), self.max) / 1_000_000
+
+        return self.max / 1_000_000
+
+    @property
+    def mean(self) -> Optional[float]:
+        if not self.count:
+            return None
+
+        return self.total / self.count / 1_000_000
+
+
+class RateCounter:
+    """Events per second over the last `window` seconds."""
+
+    def __init__(self, *, window: int = 60) -> None:
+        self.window = window
+        self.total = 0
+        self._buckets = [0] * window
+        self._seconds = [0] * window
+
+    def add(self, amount: int = 1) -> None:
+        second = int(time.monotonic())
+        i = second % self.window
+
+        if self._seconds[i] != second:
+            self._seconds[i] = second
+            self._buckets[i] = 0
+
+        self._buckets[i] += amount
+        self.total += amount
+
+    def rate(self) -> float:
+        now = int(time.monotonic())
+        count = sum(
+            n
+            for n, second in zip(self._buckets, self._seconds)
+            if now - self.window < second <= now
+        )
+        return count / self.window
+
+
+@dataclass(kw_only=True)
+class CommandStats:
+    latency: Histogram = field(default_factory=Histogram)
+    redis_calls: int = 0
+    errors: int = 0
+
+    @property
+    def calls(self) -> int:
+        return self.latency.count
+
+
+@dataclass(kw_only=True)
+class CommandCall:
+    name: str
+    started_at: float
+    redis_calls: int = 0
+
+
+# The command whose task makes the Redis calls
+_current_call: ContextVar[Optional[CommandCall]] = ContextVar(
+    "current_call", default=None
+)
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.commands: Dict[str, CommandStats] = {}
+        self.redis = RateCounter()
+        # Latency of Redis commands by name, pipelines are one command
+        self.redis_commands: Dict[str, Histogram] = {}
+        self.reminder_lag = Histogram()
+        self.loop_lag = Histogram()
+        # Times the event loop was blocked for longer than the threshold
+        self.loop_stalls = 0
+        # Started commands by context ID
+        self._calls: Dict[int, CommandCall] = {}
+
+    def record_redis_call(self, command: str, seconds: float) -> None:
+        latency = self.redis_commands.get(command)
+
+        if latency is None:
+            latency = self.redis_commands[command] = Histogram()
+
+        latency.record(seconds)
+        self.redis.add()
+        call = _current_call.get()
+
+        if call is not None:
+            call.redis_calls += 1
+
+    def start_command(self, ctx_id: int, name: str) -> None:
+        """Start timing a command, in the task that runs it."""
+        call = CommandCall(name=name, started_at=time.perf_counter())
+        self._calls[ctx_id] = call
+        _current_call.set(call)
+
+    def _get_stats(self, name: str) -> CommandStats:
+        stats = self.commands.get(name)
+
+        if stats is None:
+            stats = self.commands[name] = CommandStats()
+
+        return stats
+
+    def finish_command(self, ctx_id: int) -> Optional[float]:
+        """Stop timing a command and return how long it took."""
+        call = self._calls.pop(ctx_id, None)
+
+        if call is None:
+            return None
+
+        if _current_call.get() is call:
+            _current_call.set(None)
+
+        seconds = time.perf_counter() - call.started_at
+        stats = self._get_stats(call.name)
+        stats.latency.record(seconds)
+        stats.redis_calls += call.redis_calls
+        return seconds
+
+    def count_error(self, name: str) -> None:
+        self._get_stats(name).errors += 1
+
+    def iter_commands(self) -> Iterator[Tuple[str, CommandStats]]:
+        """Commands by the most time spent in them."""
+        yield from sorted(
+            self.commands.items(), key=lambda item: item[1].latency.total, reverse=True
+        )
+
+    def command_rows(self) -> List[str]:
+        def ms(seconds: Optional[float]) -> str:
+            return "-" if seconds is None else f"{seconds * 1000:.0f}"
+
+        rows = [
+            f"{'command':<18}{'calls':>6}{'err':>5}{'p50':>6}{'p95':>6}{'p99':>6}{'redis':>6}"
+        ]
+
+        for name, stats in self.iter_commands():
+            latency = stats.latency
+            redis = stats.redis_calls / stats.calls if stats.calls else 0
+            rows.append(
+                f"{name[:17]:<18}{stats.calls:>6}{stats.errors:>5}"
+                f"{ms(latency.quantile(0.5)):>6}{ms(latency.quantile(0.95)):>6}"
+                f"{ms(latency.quantile(0.99)):>6}{redis:>6.1f}"
+            )
+
+        return rows
+
+
+def process_rss() -> Optional[int]:
+    """Resident memory of the process in bytes, None when unknown."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # Peak instead of current resident memory, and in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Exposition:
+    """Metrics in the Prometheus text exposition format.
+
+    Samples of a metric have to be added one after another.
+    """
+
+    def __init__(self, prefix: str = "watdo_") -> None:
+        self.prefix = prefix
+        self._lines: List[str] = []
+        self._declared: Set[str] = set()
+
+    def __str__(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+    @staticmethod
+    def _labels(labels: Optional[Dict[str, str]]) -> str:
+        if not labels:
+            return ""
+
+        def escape(value: str) -> str:
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        pairs = ",".join(f'{k}="{escape(str(v))}"' for k, v in labels.items())
+        return f"{{{pairs}}}"
+
+    def _declare(self, name: str, kind: str, description: str) -> None:
+        if name not in self._declared:
+            self._declared.add(name)
+            self._lines.append(f"# HELP {name} {description}")
+            self._lines.append(f"# TYPE {name} {kind}")
+
+    def add(
+        self,
+        name: str,
+        value: float,
+        description: str,
+        *,
+        kind: str = "gauge",
+        labels: Optional[Dict[str, str]] = None,
+    ) -> None:
+        name = self.prefix + name
+        self._declare(name, kind, description)
+        self._lines.append(f"{name}{self._labels(labels)} {value}")
+
+    def add_summary(
+        self,
+        name: str,
+        histogram: Histogram,
+        description: str,
+        *,
+        labels: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Add the quantiles, sum and count of a histogram of seconds."""
+        name = self.prefix + name
+        self._declare(name, "summary", description)
+
+        for q in (0.5, 0.95, 0.99):
+            value = histogram.quantile(q)
+
+            if value is not None:
+                quantile_labels = {**(labels or {}), "quantile": str(q)}
+                self._lines.append(f"{name}{self._labels(quantile_labels)} {value}")
+
+        self._lines.append(
+            f"{name}_sum{self._labels(labels)} {histogram.total / 1_000_000}"
+        )
+        self._lines.append(f"{name}_count{self._labels(labels)} {histogram.count}")
+
+
+metrics = Metrics()
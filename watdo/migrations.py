@@ -0,0 +1,65 @@
+from watdo.database import Database
+from watdo.logging import get_logger
+from watdo.models import Profile, Task
+from watdo.indexes import TaskIndex, task_indexes
+
+
+async def migrate_task_lists(db: Database) -> int:
+    """Move tasks stored as a list of JSON strings into per-task records."""
+    logger = get_logger("migrate_task_lists")
+    migrated = 0
+
+    async for key in db.iter_keys("tasks:profile.*"):
+        profile_id = key.split(".")[1]
+        profile = await Profile.from_id(db, profile_id)
+
+        if profile is None:
+            logger.warning(f"Skipped {key}, profile not found.")
+            continue
+
+        tasks = [Task.from_json_str(db, profile, d) for d in await db.lrange(key)]
+
+        async with db.batch() as batch:
+            for task in tasks:
+                task.stage_save(batch)
+
+            batch.delete(key)
+
+        migrated += len(tasks)
+
+    if migrated:
+        logger.info(f"Migrated {migrated} task(s) to task records.")
+
+    return migrated
+
+
+async def track_index_keys(db: Database) -> None:
+    """Add the index keys written before they were tracked to their profile."""
+    for match in ("task_category:*", "task_terms:*", "task_trigrams:*"):
+        async with db.batch() as batch:
+            async for key in db.iter_keys(match):
+                batch.sadd(TaskIndex.keys_key(key.split(".")[1]), key)
+
+
+async def rebuild_task_indexes(db: Database) -> None:
+    version = str(task_indexes.version)
+
+    if await db.get("task_indexes_version") == version:
+        return
+
+    logger = get_logger("rebuild_task_indexes")
+    logger.info(f"Rebuilding task indexes to version {version}...")
+    await track_index_keys(db)
+
+    async for key in db.iter_keys("task_records:profile.*"):
+        profile = await Profile.from_id(db, key.split(".")[1])
+
+        if profile is not None:
+            await task_indexes.rebuild(db, profile)
+
+    await db.set("task_indexes_version", version)
+
+
+async def migrate(db: Database) -> None:
+    await migrate_task_lists(db)
+    await rebuild_task_indexes(db)
@@ -1,11 +1,23 @@
 import json
 import time
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, cast, Optional, Dict, Any, TypeVar, Generic
+from typing import (
+    TYPE_CHECKING,
+    cast,
+    Optional,
+    Dict,
+    Any,
+    List,
+    Iterable,
+    TypeVar,
+    Generic,
+)
 from dateutil import rrule
-import recurrent
 from watdo import dt
-from watdo.database import Database
+from watdo.database import Database, WriteBatch
+from watdo.tracing import tracer
+from watdo.writer import ProfileTransaction, profile_writer
+from watdo.write_behind import write_behind
 from watdo.safe_data import (
     SafeData,
     Boolean,
@@ -134,11 +146,49 @@ class Task(Model):
     async def from_title(
         db: Database, profile: Profile, title: str
     ) -> Optional["Task"]:
-        for task in await Task.get_tasks_of_profile(db, profile):
-            if task.title.value == title:
-                return task
+        from watdo.indexes import TitleIndex
+
+        uuid = await db.hget(TitleIndex.key(profile.uuid.value), title)
+
+        if uuid is None:
+            return None
+
+        return await Task.from_uuid(db, profile, uuid)
 
-        return None
+    @staticmethod
+    async def from_uuid(db: Database, profile: Profile, uuid: str) -> Optional["Task"]:
+        tasks = await Task.from_uuids(db, profile, [uuid])
+        return tasks[0] if tasks else None
+
+    @staticmethod
+    async def from_uuids(
+        db: Database, profile: Profile, uuids: Iterable[str], *, buffered: bool = True
+    ) -> List["Task"]:
+        profile_id = profile.uuid.value
+        tasks_data = await db.hmget(f"task_records:profile.{profile_id}", uuids)
+
+        with tracer.span("hydrate", count=len(tasks_data)):
+            return [
+                Task.from_json_str(db, profile, raw_data, buffered=buffered)
+                for raw_data in tasks_data
+                if raw_data is not None
+            ]
+
+    @staticmethod
+    def from_json_str(
+        db: Database, profile: Profile, raw_data: str, *, buffered: bool = True
+    ) -> "Task":
+        """Load a task with its `buffered` updates applied, or as stored."""
+        data = json.loads(raw_data)
+        Task._fix_data(data)
+
+        if buffered:
+            write_behind.apply(data)
+
+        if data.get("due") is None:
+            return Task(db, profile=profile, **data)
+
+        return ScheduledTask(db, profile=profile, **data)
 
     @staticmethod
     def _fix_data(data: Dict[str, Any]) -> bool:
@@ -162,36 +212,67 @@ class Task(Model):
         *,
         category: Optional[str] = None,
         ignore_done: bool = False,
+        buffered: bool = True,
     ) -> "TasksCollection":
         from watdo.collections import TasksCollection
+        from watdo.indexes import CategoryIndex
 
         profile_id = profile.uuid.value
-        tasks_data = await db.lrange(f"tasks:profile.{profile_id}")
-        tasks = []
 
-        for index, raw_data in enumerate(tasks_data):
-            data = json.loads(raw_data)
+        if category is None:
+            tasks_data = await db.hgetall(f"task_records:profile.{profile_id}")
 
-            should_save = Task._fix_data(data)
+            with tracer.span("hydrate", count=len(tasks_data)):
+                tasks = [
+                    Task.from_json_str(db, profile, raw_data, buffered=buffered)
+                    for raw_data in tasks_data.values()
+                ]
+        else:
+            uuids = await db.smembers(CategoryIndex.key(profile_id, category))
+            tasks = await Task.from_uuids(db, profile, uuids, buffered=buffered)
 
-            if data.get("due") is None:
-                task = Task(db, profile=profile, **data)
-            else:
-                task = ScheduledTask(db, profile=profile, **data)
+        if ignore_done:
+            tasks = [task for task in tasks if not task.is_done]
 
-            if should_save:
-                await db.lset(f"tasks:profile.{profile_id}", index, task.as_json_str())
+        # Newest first, like the order tasks were stored in before
+        tasks.sort(key=lambda t: t.created_at.value, reverse=True)
+        return TasksCollection(tasks)
 
-            if ignore_done and task.is_done:
-                continue
+    @staticmethod
+    async def rename_category(
+        db: Database, profile: Profile, old_name: str, new_name: str
+    ) -> "TasksCollection":
+        async def rename(transaction: ProfileTransaction) -> "TasksCollection":
+            tasks = await Task.get_tasks_of_profile(
+                db, profile, category=old_name, buffered=False
+            )
 
-            if category is not None:
-                if task.category.value != category:
-                    continue
+            for task in tasks:
+                stored = Task.from_json_str(
+                    db, profile, task.as_json_str(), buffered=False
+                )
+                task.category = TaskCategory(new_name)
+                transaction.replace(stored, task)
 
-            tasks.append(task)
+            return tasks
 
-        return TasksCollection(tasks)
+        return await profile_writer.run(profile, rename, barrier=True)
+
+    @staticmethod
+    async def delete_category(
+        db: Database, profile: Profile, name: str
+    ) -> "TasksCollection":
+        async def delete(transaction: ProfileTransaction) -> "TasksCollection":
+            tasks = await Task.get_tasks_of_profile(
+                db, profile, category=name, buffered=False
+            )
+
+            for task in tasks:
+                transaction.remove(task)
+
+            return tasks
+
+        return await profile_writer.run(profile, delete, barrier=True)
 
     def __init__(
         self,
@@ -250,23 +331,31 @@ class Task(Model):
 
         return dt.fromtimestamp(self.last_done.value, self._profile.utc_offset.value)
 
-    async def save(self) -> None:
-        tasks = await self.get_tasks_of_profile(self.db, self._profile)
+    def stage_save(self, batch: WriteBatch) -> None:
+        from watdo.indexes import task_indexes
+
         profile_id = self._profile.uuid.value
+        batch.hset(
+            f"task_records:profile.{profile_id}",
+            key=self.uuid.value,
+            value=self.as_json_str(),
+        )
+        task_indexes.add(batch, self)
 
-        for index, task in enumerate(tasks):
-            if task.uuid.value == self.uuid.value:
-                await self.db.lset(
-                    f"tasks:profile.{profile_id}", index, self.as_json_str()
-                )
-                break
-        else:
-            await self.db.lpush(f"tasks:profile.{profile_id}", self.as_json_str())
+    def stage_delete(self, batch: WriteBatch) -> None:
+        from watdo.indexes import task_indexes
 
-    async def delete(self) -> None:
         profile_id = self._profile.uuid.value
-        data = self.as_json_str()
-        await self.db.lrem(f"tasks:profile.{profile_id}", data)
+        batch.hdel(f"task_records:profile.{profile_id}", self.uuid.value)
+        task_indexes.remove(batch, self)
+
+    async def save(self) -> None:
+        """Save the task, replacing any other task with the same title."""
+        write_behind.discard(self)
+        await profile_writer.save(self)
+
+    async def delete(self) -> None:
+        await profile_writer.delete(self)
 
     async def done(self) -> None:
         if self.is_done:
@@ -364,6 +453,9 @@ class ScheduledTask(Task, Generic[DueT]):
 
     @property
     def rrulestr(self) -> str:
+        # Imported here since it's slow to import and only used for display
+        import recurrent
+
         return recurrent.format(
             str(self._rrule),
             now=dt.date_now(self._profile.utc_offset.value),
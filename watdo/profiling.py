@@ -0,0 +1,220 @@
+import io
+import os
+import sys
+import pstats
+import marshal
+import asyncio
+import cProfile
+import threading
+import tracemalloc
+from types import FrameType
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import cast, Any, Dict, List, Tuple
+from watdo.errors import ProfilerBusy
+
+# How long captures started by signals last
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS") or 30)
+
+# One stack of the loop thread, outermost frame first
+Stack = Tuple[str, ...]
+
+
+@dataclass(kw_only=True)
+class Capture:
+    mode: str
+    seconds: float
+    summary: str
+    # Attachments by file name
+    files: Dict[str, bytes] = field(default_factory=dict)
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+def _sample_stacks(
+    thread_id: int, stopped: threading.Event, interval: float, stacks: "Counter[Stack]"
+) -> None:
+    while not stopped.wait(interval):
+        frame = sys._current_frames().get(thread_id)
+        stack = []
+
+        while frame is not None:
+            stack.append(_frame_name(frame))
+            frame = frame.f_back
+
+        if stack:
+            stacks[tuple(reversed(stack))] += 1
+
+
+class Profiler:
+    """Profiles the event loop thread of the live bot for a window of time.
+
+    - `cpu` runs cProfile, which sees every call but slows the bot down.
+    - `sample` records the stack of the loop thread every `interval`
+      seconds from another thread, which costs the loop almost nothing.
+    - `memory` compares tracemalloc snapshots taken before and after.
+
+    Only one capture runs at a time.
+    """
+
+    modes = ("cpu", "sample", "memory")
+
+    def __init__(self, *, top: int = 40, interval: float = 0.005) -> None:
+        self.top = top
+        self.interval = interval
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_busy(self) -> bool:
+        return self._lock.locked()
+
+    async def capture(self, mode: str, seconds: float) -> Capture:
+        if mode not in self.modes:
+            raise ValueError(f"Unknown profiling mode {mode!r}")
+
+        if self.is_busy:
+            raise ProfilerBusy("A capture is already running")
+
+        async with self._lock:
+            if mode == "cpu":
+                return await self.profile_cpu(seconds)
+
+            if mode == "sample":
+                return await self.sample(seconds)
+
+            return await self.trace_memory(seconds)
+
+    async def profile_cpu(self, seconds: float) -> Capture:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+
+        report = io.StringIO()
+        stats = pstats.Stats(profiler, stream=report)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top)
+        stats_profile = stats.get_stats_profile()
+
+        return Capture(
+            mode="cpu",
+            seconds=seconds,
+            summary=(
+                f"{len(stats_profile.func_profiles)} function(s), "
+                f"{stats_profile.total_tt:.2f}s in profiled calls"
+            ),
+            files={
+                # Same format as `pstats.Stats.dump_stats`
+                "profile.pstats": marshal.dumps(cast(Any, stats).stats),
+                "profile.txt": report.getvalue().encode(),
+            },
+        )
+
+    async def sample(self, seconds: float) -> Capture:
+        stacks: "Counter[Stack]" = Counter()
+        stopped = threading.Event()
+        thread = threading.Thread(
+            target=_sample_stacks,
+            args=(threading.get_ident(), stopped, self.interval, stacks),
+            name="Profiler",
+            daemon=True,
+        )
+        thread.start()
+
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stopped.set()
+            await asyncio.to_thread(thread.join)
+
+        total = sum(stacks.values())
+        own: "Counter[str]" = Counter()
+        inclusive: "Counter[str]" = Counter()
+
+        for stack, count in stacks.items():
+            own[stack[-1]] += count
+
+            for name in set(stack):
+                inclusive[name] += count
+
+        def table(counter: "Counter[str]") -> List[str]:
+            return [
+                f"{count / total:>7.1%} {count:>7} {name}"
+                for name, count in counter.most_common(self.top)
+            ]
+
+        lines = [
+            f"{total} sample(s) every {self.interval * 1000:.0f}ms over {seconds}s",
+            "Samples in the event loop itself mean that the loop was idle.",
+            "",
+            "Own samples:",
+            *table(own),
+            "",
+            "Inclusive samples:",
+            *table(inclusive),
+        ]
+        # Folded stacks, the input format of flamegraph.pl and speedscope
+        folded = "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common()
+        )
+
+        return Capture(
+            mode="sample",
+            seconds=seconds,
+            summary=f"{total} sample(s) of the event loop thread",
+            files={
+                "samples.txt": "\n".join(lines).encode(),
+                "samples.folded": folded.encode(),
+            },
+        )
+
+    async def trace_memory(self, seconds: float) -> Capture:
+        # Only allocations made while tracing can be traced back
+        started = not tracemalloc.is_tracing()
+
+        if started:
+            tracemalloc.start(25)
+
+        # Snapshots and their comparisons walk every trace, off the loop
+        try:
+            before = await asyncio.to_thread(tracemalloc.take_snapshot)
+            await asyncio.sleep(seconds)
+            after = await asyncio.to_thread(tracemalloc.take_snapshot)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started:
+                tracemalloc.stop()
+
+        differences = await asyncio.to_thread(after.compare_to, before, "lineno")
+        growth = sum(stat.size_diff for stat in differences)
+        lines = [
+            f"Traced memory: {current / 1024:.0f}KiB, peak {peak / 1024:.0f}KiB",
+            f"Growth over {seconds}s: {growth / 1024:+.0f}KiB",
+            "",
+            f"Top {self.top} differences by line:",
+            *(str(stat) for stat in differences[: self.top]),
+            "",
+            "Allocation stack of the biggest growth:",
+        ]
+        by_traceback = await asyncio.to_thread(after.compare_to, before, "traceback")
+
+        if by_traceback:
+            lines.extend(by_traceback[0].traceback.format())
+
+        return Capture(
+            mode="memory",
+            seconds=seconds,
+            summary=f"{growth / 1024:+.0f}KiB over {seconds}s",
+            files={"memory.txt": "\n".join(lines).encode()},
+        )
+
+
+profiler = Profiler()
@@ -1,36 +1,48 @@
+import time
 import asyncio
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Optional
 from watdo import dt
 from watdo.models import Profile, Task, ScheduledTask
 from watdo.database import Database
+from watdo.lease import Lease
+from watdo.indexes import reminder_index
 from watdo.safe_data import Timestamp
+from watdo.services import Service
+from watdo.tracing import tracer
+from watdo.metrics import metrics
+from watdo.background import background
+from watdo.write_behind import write_behind
 from watdo.discord.cogs import BaseCog
 from watdo.discord.embeds import TaskEmbed
+from watdo.discord.dispatch import Priority
 
 if TYPE_CHECKING:
     from watdo.discord import Bot
 
 
-class Reminder:
+class Reminder(Service):
+    """Sends due reminders, from the process holding `lease` when there's one."""
+
     def __init__(
-        self,
-        loop: asyncio.AbstractEventLoop,
-        database: Database,
-        bot: "Bot",
+        self, database: Database, bot: "Bot", *, lease: Optional[Lease] = None
     ) -> None:
-        self.loop = loop
+        super().__init__("reminder")
         self.db = database
         self.bot = bot
+        self.lease = lease
 
     async def remind(self, task: ScheduledTask[str] | ScheduledTask[float]) -> None:
         if not task.is_done and task.has_reminder.value:
             channel_id = task.channel_id.value
-            user = self.bot.get_user(task.created_by.value)
-            channel: Any = (
-                self.bot.get_channel(channel_id)
-                or self.bot.get_user(channel_id)
-                or user
-            )
+            user = await self.bot.resolve_user(task.created_by.value)
+            channel: Any = self.bot.get_channel(channel_id)
+            channel = channel or self.bot.get_user(channel_id)
+
+            if channel is None and not self.bot.sees_every_guild:
+                # The channel may be in a guild of another process's shards
+                channel = self.bot.get_partial_messageable(channel_id)
+
+            channel = channel or user
 
             if channel is None:
                 return
@@ -38,51 +50,77 @@ class Reminder:
             content = f"⏰ **Reminder** {'@here' if user is None else user.mention}"
             embed = TaskEmbed(self.bot, task)
 
-            await BaseCog.send(channel, content, embed=embed)
+            await BaseCog.send(
+                channel, content, embed=embed, priority=Priority.REMINDER
+            )
 
-    async def _update_task(
+    def _advance(
         self,
         profile: Profile,
         task: ScheduledTask[str] | ScheduledTask[float],
     ) -> None:
+        """Move the next reminder of a due task past now.
+
+        Done before the reminder gets queued, so that the next sweeps don't
+        see the task as due while its reminder waits for a slot.
+        """
         utc_offset = profile.utc_offset.value
 
+        if task.next_reminder is not None:
+            metrics.reminder_lag.record(time.time() - task.next_reminder.value)
+
         if task.is_recurring:
             ts = task.rrule.after(dt.date_now(utc_offset)).timestamp()
             task.next_reminder = Timestamp(ts)
+            write_behind.update(task, next_reminder=ts)
         else:
             task.next_reminder = None
+            write_behind.update(task, next_reminder=None)
 
-        await task.save()
+    async def _send(self, task: ScheduledTask[str] | ScheduledTask[float]) -> None:
         await self.remind(task)
 
         if task.is_auto_done.value:
             await task.done()
 
-    async def _run(self) -> None:
-        while True:
-            async for key in self.db.iter_keys("tasks:profile.*"):
-                profile_id = key.split(".")[1]
-                profile = await Profile.from_id(self.db, profile_id)
+    async def sweep(self) -> None:
+        due = await reminder_index.get_due(self.db)
 
-                if profile is None:
-                    continue
+        for profile_id, uuids in due.items():
+            await self.checkpoint()
+
+            # Another process may have taken over while this one was paused
+            if self.lease is not None and not await self.lease.keep():
+                return
 
-                utc_offset = profile.utc_offset.value
+            profile = await Profile.from_id(self.db, profile_id)
 
-                for task_index, task in enumerate(
-                    await Task.get_tasks_of_profile(self.db, profile)
-                ):
-                    if not isinstance(task, ScheduledTask):
-                        continue
+            if profile is None:
+                await self.db.srem(reminder_index.profiles_key, profile_id)
+                continue
 
-                    if task.next_reminder is None:
-                        continue
+            utc_offset = profile.utc_offset.value
 
-                    if task.next_reminder.value <= dt.date_now(utc_offset).timestamp():
-                        self.bot.loop.create_task(self._update_task(profile, task))
+            # The index lags behind the buffered updates of advanced reminders
+            for task in await Task.from_uuids(self.db, profile, uuids):
+                if not isinstance(task, ScheduledTask):
+                    continue
 
-            await asyncio.sleep(1)
+                if task.next_reminder is None:
+                    continue
 
-    def start(self) -> None:
-        self.loop.create_task(self._run())
+                if task.next_reminder.value <= dt.date_now(utc_offset).timestamp():
+                    self._advance(profile, task)
+                    await background.submit(self._send(task), category="reminder")
+
+    async def run(self) -> None:
+        try:
+            while True:
+                if self.lease is None or await self.lease.hold():
+                    with tracer.span("reminder.sweep"):
+                        await self.sweep()
+
+                await asyncio.sleep(1)
+        finally:
+            if self.lease is not None and self.lease.is_held:
+                await self.lease.release()
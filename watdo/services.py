@@ -0,0 +1,164 @@
+import time
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from watdo.logging import get_logger
+
+
+class Service(ABC):
+    """A long running background job of the bot.
+
+    `run` should call `checkpoint` between units of work so that the
+    service stops doing work while it is paused.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+
+    @property
+    def is_paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    def pause(self) -> None:
+        self._resumed.clear()
+
+    def resume(self) -> None:
+        self._resumed.set()
+
+    async def checkpoint(self) -> None:
+        await self._resumed.wait()
+
+    @abstractmethod
+    async def run(self) -> None:
+        raise NotImplementedError
+
+
+@dataclass(kw_only=True)
+class ServiceStatus:
+    name: str
+    state: str = "stopped"
+    restarts: int = 0
+    started_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+    @property
+    def uptime(self) -> float:
+        if self.started_at is None:
+            return 0
+
+        return time.monotonic() - self.started_at
+
+
+class ServiceRegistry:
+    """Runs every registered service once and restarts it when it crashes.
+
+    A crashed service is restarted after a delay that doubles on every
+    crash up to `max_backoff`, and goes back to `min_backoff` once the
+    service ran for `stable_after` seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_backoff: float = 1,
+        max_backoff: float = 60,
+        stable_after: float = 60,
+    ) -> None:
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self._services: Dict[str, Service] = {}
+        self._statuses: Dict[str, ServiceStatus] = {}
+        self._tasks: Dict[str, "asyncio.Task[None]"] = {}
+
+    def __getitem__(self, name: str) -> Service:
+        return self._services[name]
+
+    def register(self, service: Service) -> None:
+        if service.name in self._services:
+            raise ValueError(f"Service {service.name!r} is already registered")
+
+        self._services[service.name] = service
+        self._statuses[service.name] = ServiceStatus(name=service.name)
+
+    def start(self) -> None:
+        """Start the services that are not running yet."""
+        for name, service in self._services.items():
+            if name not in self._tasks:
+                self._tasks[name] = asyncio.create_task(self._supervise(service))
+
+    async def _supervise(self, service: Service) -> None:
+        logger = get_logger(f"ServiceRegistry.{service.name}")
+        status = self._statuses[service.name]
+        backoff = self.min_backoff
+
+        while True:
+            status.state = "paused" if service.is_paused else "running"
+            status.started_at = time.monotonic()
+
+            try:
+                await service.run()
+            except Exception as error:
+                logger.exception(error)
+
+                if status.uptime >= self.stable_after:
+                    backoff = self.min_backoff
+
+                status.state = "backing off"
+                status.restarts += 1
+                status.last_error = repr(error)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+            else:
+                status.state = "stopped"
+                break
+            finally:
+                status.started_at = None
+
+        self._tasks.pop(service.name, None)
+
+    def pause(self) -> None:
+        for name, service in self._services.items():
+            service.pause()
+
+            if self._statuses[name].state == "running":
+                self._statuses[name].state = "paused"
+
+    def resume(self) -> None:
+        for name, service in self._services.items():
+            service.resume()
+
+            if self._statuses[name].state == "paused":
+                self._statuses[name].state = "running"
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        for status in self._statuses.values():
+            status.state = "stopped"
+            status.started_at = None
+
+    def status(self) -> List[ServiceStatus]:
+        return list(self._statuses.values())
+
+    def report(self) -> str:
+        lines = []
+
+        for s in self.status():
+            line = f"{s.name}: {s.state}, up {s.uptime:.0f}s, {s.restarts} restart(s)"
+
+            if s.last_error is not None:
+                line += f", last error: {s.last_error}"
+
+            lines.append(line)
+
+        return "\n".join(lines)
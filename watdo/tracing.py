@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import random
+import functools
+import itertools
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE") or 1)
+# Reminder sweeps and write-behind flushes run far more often than commands
+TRACE_BACKGROUND_SAMPLE_RATE = float(os.getenv("TRACE_BACKGROUND_SAMPLE_RATE") or 0.01)
+
+
+@dataclass(kw_only=True)
+class Span:
+    name: str
+    trace_id: int
+    span_id: int
+    parent_id: Optional[int]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ns(self) -> int:
+        if self.end_ns is None:
+            return time.perf_counter_ns() - self.start_ns
+
+        return self.end_ns - self.start_ns
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration_ns / 1_000_000
+
+    def as_json(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ns": self.duration_ns,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+@dataclass(kw_only=True)
+class Trace:
+    root: Span
+    spans: List[Span] = field(default_factory=list)
+    # Spans not kept because the trace had `max_spans` already
+    dropped: int = 0
+
+    def breakdown(self) -> Dict[str, float]:
+        """Milliseconds spent in the spans under the root, by span name.
+
+        Concurrent spans overlap, so the sum can be more than the root's.
+        """
+        res: Dict[str, float] = {}
+
+        for span in self.spans:
+            if span is not self.root:
+                res[span.name] = res.get(span.name, 0) + span.duration_ms
+
+        return res
+
+
+# The span that new spans are children of, it follows awaits and new tasks
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+# Spans under a root that was not sampled are not recorded either
+_UNSAMPLED = Span(name="unsampled", trace_id=0, span_id=0, parent_id=None, start_ns=0)
+
+
+class Tracer:
+    """Records spans of work and keeps the last `capacity` traces.
+
+    A span started outside of any other span is the root of a new trace.
+    Roots named in `foreground`, like commands, are recorded for a
+    `sample_rate` fraction of them into `traces`. Other roots are
+    background work, recorded for a `background_sample_rate` fraction into
+    `background_traces`, so that they can't evict the traces of commands.
+    Spans of a trace that are still running when its root ends are
+    recorded too.
+    """
+
+    def __init__(
+        self,
+        *,
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        background_sample_rate: float = TRACE_BACKGROUND_SAMPLE_RATE,
+        foreground: Iterable[str] = ("command",),
+        capacity: int = 256,
+        background_capacity: int = 64,
+        max_spans: int = 1000,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.background_sample_rate = background_sample_rate
+        self.foreground = frozenset(foreground)
+        self.max_spans = max_spans
+        self.traces: Deque[Trace] = deque(maxlen=capacity)
+        self.background_traces: Deque[Trace] = deque(maxlen=background_capacity)
+        self.roots = 0
+        self._ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self.traces) + len(self.background_traces)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Time the block as a child of the current span.
+
+        Yields None when the trace is not sampled.
+        """
+        parent = _current_span.get()
+
+        if parent is _UNSAMPLED:
+            yield None
+            return
+
+        is_foreground = name in self.foreground
+
+        if parent is None:
+            self.roots += 1
+
+            if is_foreground:
+                sample_rate = self.sample_rate
+            else:
+                sample_rate = self.background_sample_rate
+
+            if random.random() >= sample_rate:
+                token = _current_span.set(_UNSAMPLED)
+
+                try:
+                    yield None
+                finally:
+                    _current_span.reset(token)
+
+                return
+
+        span_id = next(self._ids)
+        span = Span(
+            name=name,
+            trace_id=span_id if parent is None else parent.trace_id,
+            span_id=span_id,
+            parent_id=None if parent is None else parent.span_id,
+            start_ns=time.perf_counter_ns(),
+            attributes=attributes,
+        )
+        trace = _current_trace.get() if parent is not None else None
+
+        if trace is None:
+            trace = Trace(root=span)
+
+        if len(trace.spans) < self.max_spans:
+            trace.spans.append(span)
+        else:
+            trace.dropped += 1
+
+        span_token = _current_span.set(span)
+        trace_token = _current_trace.set(trace)
+
+        try:
+            yield span
+        except BaseException as error:
+            span.error = repr(error)
+            raise
+        finally:
+            span.end_ns = time.perf_counter_ns()
+            _current_trace.reset(trace_token)
+            _current_span.reset(span_token)
+
+            if parent is None and is_foreground:
+                self.traces.append(trace)
+            elif parent is None:
+                self.background_traces.append(trace)
+
+    def traced(
+        self, name: str
+    ) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+        """Decorate a coroutine function to run it in a span."""
+
+        def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+            @functools.wraps(func)
+            async def wrapper(*args: Any, **kwargs: Any) -> T:
+                with self.span(name):
+                    return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def _all_traces(self) -> List[Trace]:
+        return [*self.traces, *self.background_traces]
+
+    def find(self, name: str) -> List[Trace]:
+        """Recorded traces with a root named `name`, slowest first."""
+        traces = [t for t in self._all_traces() if t.root.name == name]
+        traces.sort(key=lambda t: t.root.duration_ns, reverse=True)
+        return traces
+
+    def export_jsonl(self, file: TextIO) -> int:
+        """Write the spans of the recorded traces, one JSON per line.
+
+        Returns the number of spans written.
+        """
+        count = 0
+
+        for trace in self._all_traces():
+            for span in trace.spans:
+                file.write(json.dumps(span.as_json(), default=str) + "\n")
+                count += 1
+
+        return count
+
+
+tracer = Tracer()
@@ -0,0 +1,135 @@
+import json
+import asyncio
+import functools
+from typing import TYPE_CHECKING, Any, Dict, List
+from watdo.logging import get_logger
+from watdo.services import Service
+from watdo.writer import ProfileTransaction, profile_writer
+
+if TYPE_CHECKING:
+    from watdo.models import Profile, Task
+
+# Updated fields by task UUID
+Updates = Dict[str, Dict[str, Any]]
+
+
+class WriteBehindBuffer(Service):
+    """Buffers updates of task fields that don't need to be written right away.
+
+    Reads see buffered updates immediately since `Task.from_json_str`
+    applies them. Repeated updates of a task are merged, and the buffer is
+    written through the profile writer every `interval` seconds and when
+    the bot closes:
+
+    - A crash loses at most the updates of the last `interval` seconds.
+    - A failed flush keeps its updates for the next flush.
+    - Saving a whole task drops its buffered updates.
+    - Updates of deleted tasks are dropped.
+    """
+
+    fields = frozenset({"next_reminder", "channel_id"})
+
+    def __init__(self, *, interval: float = 1) -> None:
+        super().__init__("write_behind")
+        self.interval = interval
+        self.updates = 0
+        self.flushed = 0
+        self._profiles: Dict[str, "Profile"] = {}
+        self._pending: Dict[str, Updates] = {}
+
+    def __len__(self) -> int:
+        return sum(len(updates) for updates in self._pending.values())
+
+    def update(self, task: "Task", **fields: Any) -> None:
+        unknown = fields.keys() - self.fields
+
+        if unknown:
+            raise ValueError(f"Can't buffer updates of {', '.join(sorted(unknown))}")
+
+        profile_id = task.profile.uuid.value
+        self._profiles[profile_id] = task.profile
+        updates = self._pending.setdefault(profile_id, {})
+        updates.setdefault(task.uuid.value, {}).update(fields)
+        self.updates += 1
+
+    def apply(self, data: Dict[str, Any]) -> None:
+        """Apply the buffered updates of a task to its JSON data."""
+        fields = self._pending.get(data["profile_id"], {}).get(data["uuid"])
+
+        if fields:
+            data.update(fields)
+
+    def discard(self, task: "Task") -> None:
+        updates = self._pending.get(task.profile.uuid.value)
+
+        if updates is not None:
+            updates.pop(task.uuid.value, None)
+
+    def _requeue(self, profile_id: str, updates: Updates) -> None:
+        pending = self._pending.setdefault(profile_id, {})
+
+        # Updates made during the flush are newer
+        for uuid, fields in updates.items():
+            pending[uuid] = {**fields, **pending.get(uuid, {})}
+
+    async def _write(
+        self, profile_id: str, taken: List[Updates], transaction: ProfileTransaction
+    ) -> int:
+        from watdo.models import Task
+
+        # Applied again after a conflict, with the updates the last attempt took
+        for updates in taken:
+            self._requeue(profile_id, updates)
+
+        taken.clear()
+
+        # Taken only now so that saves applied before this get to drop theirs
+        updates = self._pending.pop(profile_id, {})
+        taken.append(updates)
+
+        stored_tasks = await transaction.get_stored_many(updates)
+
+        for stored in stored_tasks:
+            data = stored.as_json()
+            data.update(updates[stored.uuid.value])
+            raw_data = json.dumps(data)
+            task = Task.from_json_str(
+                transaction.db, transaction.profile, raw_data, buffered=False
+            )
+            transaction.replace(stored, task)
+
+        return len(stored_tasks)
+
+    async def flush(self) -> int:
+        """Write the buffered updates and return how many tasks got updated."""
+        count = 0
+
+        for profile_id in list(self._pending):
+            profile = self._profiles[profile_id]
+            taken: List[Updates] = []
+
+            try:
+                count += await profile_writer.run(
+                    profile, functools.partial(self._write, profile_id, taken)
+                )
+            except Exception as error:
+                get_logger("WriteBehindBuffer.flush").warning(
+                    f"Keeping updates of profile {profile_id}: {error!r}"
+                )
+
+                for updates in taken:
+                    self._requeue(profile_id, updates)
+
+            if profile_id not in self._pending:
+                self._profiles.pop(profile_id, None)
+
+        self.flushed += count
+        return count
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+
+write_behind = WriteBehindBuffer()
@@ -0,0 +1,348 @@
+import asyncio
+import time
+import functools
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+from redis.exceptions import WatchError
+from watdo.database import Database, WriteBatch
+from watdo.errors import TitleTaken
+
+if TYPE_CHECKING:
+    from watdo.models import Profile, Task
+
+T = TypeVar("T")
+
+
+@dataclass(kw_only=True)
+class PendingWrites:
+    """Writes of a profile applied in memory but not flushed to Redis yet."""
+
+    batch: WriteBatch
+    # Task JSON by UUID, None for deleted tasks
+    records: Dict[str, Optional[str]] = field(default_factory=dict)
+    # Task UUID by title, None for removed titles
+    titles: Dict[str, Optional[str]] = field(default_factory=dict)
+    # UUIDs of the tasks that are new in these writes
+    created: Set[str] = field(default_factory=set)
+    results: List[Tuple["asyncio.Future[Any]", Any]] = field(default_factory=list)
+
+
+class ProfileTransaction:
+    """The writes of one operation of a `ProfileWriter`.
+
+    Reads of records and titles see the writes staged before them, even the
+    ones that are not flushed yet.
+    """
+
+    def __init__(
+        self, pending: PendingWrites, db: Database, profile: "Profile"
+    ) -> None:
+        self.db = db
+        self.profile = profile
+        self.batch = db.create_batch()
+        self.records: Dict[str, Optional[str]] = {}
+        self.titles: Dict[str, Optional[str]] = {}
+        self.created: Set[str] = set()
+        self._pending = pending
+
+    def _get_staged(self, uuid: str) -> Tuple[bool, Optional[str]]:
+        for records in (self.records, self._pending.records):
+            if uuid in records:
+                return True, records[uuid]
+
+        return False, None
+
+    # Stored versions are read without buffered updates, those aren't indexed yet
+    async def get_stored(self, uuid: str) -> Optional["Task"]:
+        tasks = await self.get_stored_many([uuid])
+        return tasks[0] if tasks else None
+
+    async def get_stored_many(self, uuids: Iterable[str]) -> List["Task"]:
+        from watdo.models import Task
+
+        tasks = []
+        missing = []
+
+        for uuid in uuids:
+            is_staged, raw_data = self._get_staged(uuid)
+
+            if not is_staged:
+                missing.append(uuid)
+            elif raw_data is not None:
+                task = Task.from_json_str(
+                    self.db, self.profile, raw_data, buffered=False
+                )
+                tasks.append(task)
+
+        if missing:
+            tasks.extend(
+                await Task.from_uuids(self.db, self.profile, missing, buffered=False)
+            )
+
+        return tasks
+
+    async def get_title_owner(self, title: str) -> Optional[str]:
+        from watdo.indexes import TitleIndex
+
+        for titles in (self.titles, self._pending.titles):
+            if title in titles:
+                return titles[title]
+
+        return await self.db.hget(TitleIndex.key(self.profile.uuid.value), title)
+
+    def replace(self, stored: Optional["Task"], task: "Task") -> None:
+        """Stage `task` in place of its `stored` version without reading it."""
+        from watdo.indexes import task_indexes
+
+        if stored is not None:
+            task_indexes.remove(self.batch, stored)
+            self.titles[stored.title.value] = None
+        else:
+            self.created.add(task.uuid.value)
+
+        task.stage_save(self.batch)
+        self.records[task.uuid.value] = task.as_json_str()
+        self.titles[task.title.value] = task.uuid.value
+
+    def remove(self, stored: "Task") -> None:
+        stored.stage_delete(self.batch)
+        self.records[stored.uuid.value] = None
+        self.titles[stored.title.value] = None
+
+    async def save(self, task: "Task") -> None:
+        stored, owner = await asyncio.gather(
+            self.get_stored(task.uuid.value),
+            self.get_title_owner(task.title.value),
+        )
+
+        if owner is not None and owner != task.uuid.value:
+            duplicate = await self.get_stored(owner)
+
+            # Only concurrent `todo`s adding the same title replace each other
+            if duplicate is not None:
+                if stored is None and owner in self._pending.created:
+                    self.remove(duplicate)
+                else:
+                    raise TitleTaken(f'"{task.title.value}" is already used')
+
+        self.replace(stored, task)
+
+    async def delete(self, task: "Task") -> None:
+        stored = await self.get_stored(task.uuid.value)
+
+        if stored is not None:
+            self.remove(stored)
+
+
+@dataclass(kw_only=True)
+class Operation:
+    db: Database
+    profile: "Profile"
+    func: Callable[[ProfileTransaction], Awaitable[Any]]
+    future: "asyncio.Future[Any]"
+    barrier: bool
+
+
+class ProfileWriter:
+    """Applies the task writes of each profile one at a time, in order.
+
+    Every profile with pending operations has a worker that waits `linger`
+    seconds for operations to queue up, applies them in order and flushes
+    their writes in a single MULTI/EXEC. Callers get their result once the
+    flush is done.
+
+    Operations read the stored tasks they replace, so writers of other
+    processes must not interleave with them. Every batch WATCHes the task
+    records and titles of its profile before its first read, and when
+    another process wrote them before the flush, the operations of the
+    batch are applied again, up to `max_attempts` times.
+    """
+
+    def __init__(
+        self,
+        *,
+        linger: float = 0.002,
+        max_batch: int = 64,
+        max_attempts: int = 5,
+    ) -> None:
+        self.linger = linger
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.operations = 0
+        self.flushes = 0
+        self.conflicts = 0
+        self._mailboxes: Dict[str, Deque[Operation]] = {}
+        self._workers: Dict[str, "asyncio.Task[None]"] = {}
+
+    def __len__(self) -> int:
+        return sum(len(m) for m in self._mailboxes.values())
+
+    async def run(
+        self,
+        profile: "Profile",
+        func: Callable[[ProfileTransaction], Awaitable[T]],
+        *,
+        barrier: bool = False,
+    ) -> T:
+        """Apply `func` after the operations queued before it.
+
+        With `barrier`, `func` starts a new batch so that every read it
+        makes from Redis sees the writes queued before it.
+        """
+        profile_id = profile.uuid.value
+        future: "asyncio.Future[T]" = asyncio.get_running_loop().create_future()
+        operation = Operation(
+            db=profile.db, profile=profile, func=func, future=future, barrier=barrier
+        )
+        self._mailboxes.setdefault(profile_id, deque()).append(operation)
+
+        if profile_id not in self._workers:
+            self._workers[profile_id] = asyncio.create_task(self._work(profile_id))
+
+        return await future
+
+    async def drain(self, *, timeout: float = 10) -> int:
+        """Wait for the queued operations and cancel what's left after `timeout`.
+
+        Returns the number of cancelled workers.
+        """
+        deadline = time.monotonic() + timeout
+
+        while self._workers and (remaining := deadline - time.monotonic()) > 0:
+            await asyncio.wait(set(self._workers.values()), timeout=remaining)
+
+        workers = list(self._workers.values())
+
+        for worker in workers:
+            worker.cancel()
+
+        await asyncio.gather(*workers, return_exceptions=True)
+        return len(workers)
+
+    async def save(self, task: "Task") -> None:
+        await self.run(
+            task.profile, functools.partial(ProfileTransaction.save, task=task)
+        )
+
+    async def delete(self, task: "Task") -> None:
+        await self.run(
+            task.profile, functools.partial(ProfileTransaction.delete, task=task)
+        )
+
+    async def _flush(self, pending: PendingWrites, *, retry: bool) -> bool:
+        """Execute the batch and resolve the operations.
+
+        Returns False, resolving nothing, when a watched key changed and
+        the operations should be applied again.
+        """
+        if not pending.results:
+            return True
+
+        try:
+            await pending.batch.execute()
+            self.flushes += 1
+            self.operations += len(pending.results)
+        except Exception as error:
+            if retry and isinstance(error, WatchError):
+                self.conflicts += 1
+                return False
+
+            for future, _ in pending.results:
+                if not future.done():
+                    future.set_exception(error)
+        else:
+            for future, result in pending.results:
+                if not future.done():
+                    future.set_result(result)
+
+        return True
+
+    async def _apply(self, pending: PendingWrites, operation: Operation) -> None:
+        transaction = ProfileTransaction(pending, operation.db, operation.profile)
+
+        try:
+            result = await operation.func(transaction)
+        except Exception as error:
+            # Nothing the failed operation staged gets flushed
+            if not operation.future.done():
+                operation.future.set_exception(error)
+
+            return
+
+        pending.batch.merge(transaction.batch)
+        pending.records.update(transaction.records)
+        pending.titles.update(transaction.titles)
+        pending.created.update(transaction.created)
+        pending.results.append((operation.future, result))
+
+    def _take_batch(self, mailbox: Deque[Operation]) -> List[Operation]:
+        operations = [mailbox.popleft()]
+
+        # A barrier only ever starts a batch
+        while mailbox and len(operations) < self.max_batch:
+            if mailbox[0].barrier:
+                break
+
+            operations.append(mailbox.popleft())
+
+        return operations
+
+    async def _attempt(
+        self, profile_id: str, operations: List[Operation], *, retry: bool
+    ) -> bool:
+        from watdo.indexes import TitleIndex
+
+        pending = PendingWrites(batch=operations[0].db.create_batch())
+
+        try:
+            await pending.batch.watch(
+                f"task_records:profile.{profile_id}", TitleIndex.key(profile_id)
+            )
+
+            for operation in operations:
+                # Failed operations aren't applied again
+                if not operation.future.done():
+                    await self._apply(pending, operation)
+
+            return await self._flush(pending, retry=retry)
+        finally:
+            await pending.batch.reset()
+
+    async def _work(self, profile_id: str) -> None:
+        mailbox = self._mailboxes[profile_id]
+        operations: List[Operation] = []
+
+        try:
+            while mailbox:
+                await asyncio.sleep(self.linger)
+                operations = self._take_batch(mailbox)
+
+                for attempt in range(1, self.max_attempts + 1):
+                    retry = attempt < self.max_attempts
+
+                    if await self._attempt(profile_id, operations, retry=retry):
+                        break
+        finally:
+            del self._workers[profile_id]
+            del self._mailboxes[profile_id]
+
+            # Only left over when the worker got cancelled
+            for operation in [*operations, *mailbox]:
+                operation.future.cancel()
+
+
+profile_writer = ProfileWriter()